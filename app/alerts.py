@@ -0,0 +1,79 @@
+# alerts.py
+# Alert classification against WHO-like limits, as array functions so the
+# same code scores one reading or millions, plus the grouped 24h summary
+# behind the dashboard's batch mode.
+import numpy as np
+import pandas as pd
+
+WHO_LIKE = {"pm25": 15, "no2": 40, "o3": 100, "pm10": 45}
+DEFAULT_LIMIT = 35
+
+# index = alert level
+LEVELS = np.array(["Good", "Moderate", "Unhealthy", "No data"])
+LEVEL_COLORS = np.array(["green", "orange", "red", "grey"])
+GOOD, MODERATE, UNHEALTHY, NO_DATA = range(4)
+
+
+def limits_for(parameters) -> np.ndarray:
+    """WHO-like limit for each parameter name (DEFAULT_LIMIT when unknown)."""
+    return pd.Series(parameters, dtype=object).map(WHO_LIKE).fillna(DEFAULT_LIMIT).to_numpy(dtype="float64")
+
+
+def alert_levels(values, limits) -> np.ndarray:
+    """Alert level per reading: <= limit good, <= 2x limit moderate, else unhealthy.
+
+    ``limits`` is a scalar or an array broadcastable against ``values``;
+    NaN readings get NO_DATA.
+    """
+    v = np.asarray(values, dtype="float64")
+    lim = np.asarray(limits, dtype="float64")
+    return np.select([np.isnan(v), v <= lim, v <= 2 * lim], [NO_DATA, GOOD, MODERATE], UNHEALTHY).astype(np.int8)
+
+
+def classify(parameters, values) -> np.ndarray:
+    """Alert levels for parallel arrays of parameter names and values."""
+    return alert_levels(values, limits_for(parameters))
+
+
+def get_alert_message(param, value):
+    level = int(alert_levels(value, WHO_LIKE.get(param, DEFAULT_LIMIT)))
+    if level == NO_DATA:
+        return ("No data", "grey", "No recent measurement available.")
+    if level == GOOD:
+        return ("Good", "green", f"{param.upper()} = {value:.1f} µg/m³. Air quality is good.")
+    elif level == MODERATE:
+        return ("Moderate", "orange", f"{param.upper()} = {value:.1f} µg/m³. Sensitive groups should limit prolonged outdoor exertion.")
+    else:
+        return ("Unhealthy", "red", f"{param.upper()} = {value:.1f} µg/m³. Reduce outdoor activities; vulnerable people should stay indoors.")
+
+
+def summarize_24h(df: pd.DataFrame, keys=("city", "parameter"), time_col: str = "date_utc") -> pd.DataFrame:
+    """Latest value, 24h avg/max and alert status for every group in one pass.
+
+    The 24h window of each group ends at that group's own latest reading,
+    as on the single-city page. ``latest`` and ``latest_time`` come from
+    the newest reading that has a value (NaN/NaT when none in the window).
+    """
+    keys = list(keys)
+    cols = ["latest", "latest_time", "avg_24h", "max_24h", "n_24h", "status", "color"]
+    if df.empty:
+        return pd.DataFrame(columns=keys + cols)
+    df = df.sort_values(time_col, kind="stable")
+    grouped = df.groupby(keys, sort=False, observed=True)
+    last_ts = grouped[time_col].transform("max")
+    recent = df[df[time_col] >= last_ts - pd.Timedelta(hours=24)]
+    stats = recent.groupby(keys, sort=True, observed=True).agg(
+        avg_24h=("value", "mean"),
+        max_24h=("value", "max"),
+        n_24h=("value", "count"),
+    )
+    # both from the same row: "last" skips NaN values but not their timestamps
+    latest = recent.dropna(subset=["value"]).groupby(keys, sort=True, observed=True).agg(
+        latest=("value", "last"),
+        latest_time=(time_col, "last"),
+    )
+    out = latest.reindex(stats.index).join(stats).reset_index()
+    level = classify(out["parameter"], out["latest"]) if "parameter" in keys else alert_levels(out["latest"], DEFAULT_LIMIT)
+    out["status"] = LEVELS[level]
+    out["color"] = LEVEL_COLORS[level]
+    return out
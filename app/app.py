@@ -1,14 +1,17 @@
 # app.py
+import os
 import streamlit as st
-import requests
 import pandas as pd
-import altair as alt
-import plotly.express as px
-import pydeck as pdk
 from datetime import datetime, timedelta
-import folium
-from streamlit_folium import st_folium
-from dateutil import parser
+import perf
+from openaq_client import make_session
+from measurement_store import LOOKBACK, MeasurementStore
+from ingest_worker import IngestWorker, parse_pairs
+from alerts import WHO_LIKE, get_alert_message, summarize_24h
+from forecast import MODELS, forecast
+from map_layers import PYDECK_FILL_COLOR, folium_station_layer, pydeck_station_data
+from station_frame import compact, local_times, station_rows
+from station_index import StationIndex
 
 # ---------------------------
 # Page config & CSS
@@ -28,103 +31,166 @@ st.markdown('<div class="sub">Live ground-station data (OpenAQ). Choose chart &
 # ---------------------------
 # Helper: Fetch OpenAQ measurements
 # ---------------------------
-@st.cache_data(ttl=300)
+@st.cache_resource
+def openaq_session():
+    return make_session(pool_size=4)
+
+@st.cache_resource
+def measurement_store():
+    return MeasurementStore()
+
+@st.cache_resource
+def ingest_worker():
+    # one poller shared by every session; set INGEST_IN_APP=0 when
+    # ingest_worker.py runs as its own process
+    worker = IngestWorker(measurement_store(), parse_pairs(os.environ.get("INGEST_PAIRS", "")),
+                          session=openaq_session())
+    if os.environ.get("INGEST_IN_APP", "1") == "1":
+        worker.start()
+    return worker
+
+@st.cache_resource
+def station_index(city: str, parameter: str, limit: int):
+    # shared by every session; topped up by fetch_openaq on each rerun
+    return StationIndex(max_rows=limit)
+
 def fetch_openaq(city: str, parameter: str, limit: int = 200):
-    base = "https://api.openaq.org/v2/measurements"
-    params = {
-        "city": city,
-        "parameter": parameter,
-        "limit": limit,
-        "sort": "desc",
-        "order_by": "date"
-    }
-    try:
-        r = requests.get(base, params=params, timeout=15)
-        r.raise_for_status()
-        j = r.json()
-        results = j.get("results", [])
-        if not results:
-            return pd.DataFrame()
-        df = pd.DataFrame(results)
-        df['date_local'] = df['date'].apply(lambda x: parser.parse(x['local']))
-        def get_lat(row):
-            c = row.get('coordinates')
-            return c.get('latitude') if c else None
-        def get_lon(row):
-            c = row.get('coordinates')
-            return c.get('longitude') if c else None
-        df['lat'] = df.apply(get_lat, axis=1)
-        df['lon'] = df.apply(get_lon, axis=1)
-        df = df.sort_values('date_local')
-        return df
-    except Exception as e:
-        st.error(f"Error fetching OpenAQ: {e}")
-        return pd.DataFrame()
+    """StationIndex for the pair, with whatever the store gained since the last rerun appended."""
+    worker = ingest_worker()
+    worker.track(city, parameter, limit)
+    index = station_index(city, parameter, limit)
+    if index.empty and worker.store.latest_timestamp(city, parameter) is None:
+        # first request for this pair: wait for the initial sync, shared
+        # with any other session asking for the same pair
+        try:
+            with perf.stage("initial_sync"):
+                worker.refresh(city, parameter)
+        except Exception as e:
+            st.error(f"Error fetching OpenAQ: {e}")
+    # re-read the store's lookback window too: sync re-fetches it for late-reporting stations
+    since = None if index.empty else pd.Timestamp(index.last_ts, unit="ms", tz="UTC") - LOOKBACK
+    with perf.stage("store_read"):
+        new = compact(worker.store.read(city, parameter, since=since, limit=limit))
+    with perf.stage("index_append"):
+        perf.count("index_rows", index.append(*new))
+    return index
 
 # ---------------------------
 # Forecast + Alert helpers
 # ---------------------------
-def make_forecast(df: pd.DataFrame, hours_ahead: int = 6):
-    if df.empty:
-        return pd.DataFrame()
-    last_ts = df['date_local'].max()
-    last_val = df['value'].iloc[-1]
-    window = df['value'].dropna().tail(3)
-    rolling_val = float(window.mean()) if len(window)>0 else last_val
-    rows = []
-    for i in range(1, hours_ahead + 1):
-        t = last_ts + timedelta(hours=i)
-        rows.append({"date": t, "persistence": last_val, "rolling": rolling_val})
-    return pd.DataFrame(rows)
-
-WHO_LIKE = {"pm25": 15, "no2": 40, "o3": 100, "pm10": 45}
-def get_alert_message(param, value):
-    limit = WHO_LIKE.get(param, 35)
-    if pd.isna(value):
-        return ("No data", "grey", "No recent measurement available.")
-    if value <= limit:
-        return ("Good", "green", f"{param.upper()} = {value:.1f} µg/m³. Air quality is good.")
-    elif value <= 2*limit:
-        return ("Moderate", "orange", f"{param.upper()} = {value:.1f} µg/m³. Sensitive groups should limit prolonged outdoor exertion.")
-    else:
-        return ("Unhealthy", "red", f"{param.upper()} = {value:.1f} µg/m³. Reduce outdoor activities; vulnerable people should stay indoors.")
+def make_forecast(df: pd.DataFrame, hours_ahead: int = 6, models=("persistence", "rolling")):
+    # the selected city/pollutant is forecast as one series
+    return forecast(df, hours_ahead, models=models, keys=())
+
+# label, colour, Altair strokeDash, Plotly dash
+FORECAST_STYLES = {
+    "persistence": ("Persistence Forecast", "red", [5, 2], "dash"),
+    "rolling": ("Rolling Forecast", "orange", [2, 2], "dot"),
+    "ewm": ("EWM Forecast", "purple", [4, 4], "dashdot"),
+    "seasonal_naive": ("Seasonal Naive Forecast", "green", [8, 3], "longdash"),
+}
+
+# e.g. http://localhost:8000/tempo/tiles/{z}/{x}/{y}.png
+TEMPO_TILES_URL = os.environ.get("TEMPO_TILES_URL", "")
 
 # ---------------------------
 # Sidebar: user controls
 # ---------------------------
 st.sidebar.header("Query & Display Options")
+mode = st.sidebar.radio("Mode", ["Single city", "Batch (many cities)"])
 default_city = "Karachi"
 city = st.sidebar.text_input("City name (as listed in OpenAQ)", default_city)
 param = st.sidebar.selectbox("Pollutant", ["pm25", "no2", "o3", "pm10"])
 hours_forecast = st.sidebar.slider("Forecast horizon (hours)", 3, 24, 6)
-records = st.sidebar.slider("Fetch records (limit)", 50, 500, 200)
+forecast_models = st.sidebar.multiselect("Forecast models", list(MODELS), default=["persistence", "rolling"])
+records = st.sidebar.slider("Fetch records (limit)", 50, 10000, 200, step=50)
 chart_lib = st.sidebar.selectbox("Chart library", ["Altair", "Plotly"])
 map_lib = st.sidebar.selectbox("Map library", ["Folium", "Pydeck"])
 if st.sidebar.button("Fetch Data"):
     st.experimental_rerun()
+show_perf = st.sidebar.checkbox("Show performance panel", value=os.environ.get("PERF_PANEL") == "1",
+                                disabled=not perf.ENABLED)
+
+def perf_panel():
+    """Stage timings and counters of this server process (all sessions), in the sidebar."""
+    if not show_perf:
+        return
+    with st.sidebar.expander("⏱ Performance", expanded=True):
+        if st.button("Reset metrics"):
+            perf.reset()
+        rows = pd.DataFrame(perf.snapshot())
+        if not rows.empty:
+            if not perf.MEMORY:
+                rows = rows.drop(columns="peak_mb")  # only tracked with PERF_MEMORY=1
+            st.dataframe(rows.set_index("stage").round(2), use_container_width=True)
+        for name, value in perf.counters().items():
+            st.text(f"{name}: {value:,.0f}")
+
+# ---------------------------
+# Batch mode: every city x pollutant pair in one summary grid
+# ---------------------------
+@st.cache_data(ttl=30)
+def fetch_batch(pairs: tuple, limit: int):
+    worker = ingest_worker()
+    for c, p in pairs:
+        worker.track(c, p, limit)
+    missing = [pair for pair in pairs if worker.store.latest_timestamp(*pair) is None]
+    errors = {pair: e for pair, e in worker.refresh_many(missing).items() if isinstance(e, Exception)}
+    latest = [t for t in (worker.store.latest_timestamp(*pair) for pair in pairs) if t is not None]
+    if not latest:
+        return pd.DataFrame(), errors
+    # only rows that can fall inside some pair's 24h window
+    since = min(latest) - timedelta(hours=24)
+    return worker.store.read(pairs=list(pairs), since=since), errors
+
+if mode == "Batch (many cities)":
+    st.subheader("🗂 Batch summary (latest, 24h avg/max, alert)")
+    batch_cities = [c.strip() for c in st.sidebar.text_area("Cities (one per line or comma separated)", "Karachi\nLahore\nDelhi").replace(",", "\n").splitlines() if c.strip()]
+    batch_params = st.sidebar.multiselect("Pollutants", list(WHO_LIKE), default=list(WHO_LIKE))
+    pairs = tuple((c, p) for c in batch_cities for p in batch_params)
+    with perf.stage("batch_fetch"):
+        batch_df, batch_errors = fetch_batch(pairs, records)
+    for (c, p), e in batch_errors.items():
+        st.warning(f"{c}/{p}: {e}")
+    with perf.stage("batch_summary"):
+        summary = summarize_24h(batch_df)
+    if summary.empty:
+        st.info("No data found for the selected cities and pollutants.")
+    else:
+        status_grid = summary.pivot(index="city", columns="parameter", values="status")
+        css = "background-color: " + summary.pivot(index="city", columns="parameter", values="color").fillna("white") + "; color: white"
+        st.dataframe(status_grid.style.apply(lambda _: css, axis=None), use_container_width=True)
+        st.dataframe(summary.drop(columns=["color"]).round(1), use_container_width=True)
+    perf_panel()
+    st.stop()
 
 # ---------------------------
 # Fetch data
 # ---------------------------
-df = fetch_openaq(city, param, limit=records)
+with perf.stage("fetch"):
+    index = fetch_openaq(city, param, limit=records)
+# one consistent snapshot for every widget below
+with index.lock, perf.stage("windowing"):
+    readings, stations = index.readings, index.stations
+    stats_24 = index.stats(24)
+    window_48 = index.window(48)
+    latest_rows = index.latest_per_station()
 
 # ---------------------------
 # Top metrics + alert card
 # ---------------------------
 col_a, col_b, col_c, col_d = st.columns([1,1,1,1])
-if df.empty:
+if readings.empty:
     col_a.metric("Latest", "—")
     col_b.metric("24hr avg", "—")
     col_c.metric("24hr max", "—")
     col_d.info("No data found. Try different city or parameter.")
 else:
-    last_val = float(df['value'].iloc[-1])
-    last_ts = df['date_local'].max()
+    last_val = float(readings['value'].iat[-1])
     # 24hr window
-    window = df[df['date_local'] >= last_ts - timedelta(hours=24)]
-    avg_24 = window['value'].mean() if not window.empty else float('nan')
-    max_24 = window['value'].max() if not window.empty else float('nan')
-    col_a.metric("Latest", f"{last_val:.1f} {df['unit'].iloc[-1]}", delta=None)
+    avg_24 = stats_24['avg']
+    max_24 = stats_24['max']
+    col_a.metric("Latest", f"{last_val:.1f} {readings['unit'].iat[-1]}", delta=None)
     col_b.metric("24h avg", f"{avg_24:.1f}" if not pd.isna(avg_24) else "—")
     col_c.metric("24h max", f"{max_24:.1f}" if not pd.isna(max_24) else "—")
     # alert card
@@ -145,37 +211,45 @@ st.markdown("---")
 # ---------------------------
 st.subheader("📈 Time Series (observations) + Forecast")
 
-if not df.empty:
-    last_ts = df['date_local'].max()
-    window = df[df['date_local'] >= last_ts - timedelta(hours=48)]
+if not readings.empty:
+    window = window_48
     if window.empty:
-        window = df.copy()
+        window = readings
 
-    forecast_df = make_forecast(df, hours_ahead=hours_forecast)
+    with perf.stage("forecast"):
+        series = pd.DataFrame({'date_local': local_times(readings).array, 'value': readings['value'].to_numpy(dtype='float64')})
+        forecast_df = make_forecast(series, hours_ahead=hours_forecast, models=forecast_models)
 
     # Prepare dataframes for plotting
-    obs_plot = window[['date_local', 'value']].rename(columns={'date_local':'Time','value':'Value'})
+    obs_plot = pd.DataFrame({'Time': local_times(window).array, 'Value': window['value'].to_numpy()})
+    forecast_plots = {}
     if not forecast_df.empty:
-        p_persist = forecast_df[['date','persistence']].rename(columns={'date':'Time','persistence':'Value'})
-        p_rolling = forecast_df[['date','rolling']].rename(columns={'date':'Time','rolling':'Value'})
-
-    if chart_lib == "Altair":
-        base = alt.Chart(obs_plot).mark_line(point=True).encode(x='Time:T', y='Value:Q')
-        if not forecast_df.empty:
-            persist_chart = alt.Chart(p_persist).mark_line(strokeDash=[5,2], color="red").encode(x='Time:T', y='Value:Q')
-            rolling_chart = alt.Chart(p_rolling).mark_line(strokeDash=[2,2], color="orange").encode(x='Time:T', y='Value:Q')
-            combined = (base + persist_chart + rolling_chart).resolve_scale(y='shared')
-            st.altair_chart(combined, use_container_width=True)
-        else:
-            st.altair_chart(base, use_container_width=True)
-
-    else:  # Plotly
-        fig = px.line(obs_plot, x='Time', y='Value', labels={"Value": f"{param.upper()} ({window['unit'].iloc[0]})"})
-        if not forecast_df.empty:
-            fig.add_scatter(x=p_persist['Time'], y=p_persist['Value'], mode='lines', name='Persistence Forecast', line=dict(dash='dash', color='red'))
-            fig.add_scatter(x=p_rolling['Time'], y=p_rolling['Value'], mode='lines', name='Rolling Forecast', line=dict(dash='dot', color='orange'))
-        fig.update_layout(height=400, margin=dict(l=20, r=20, t=30, b=20))
-        st.plotly_chart(fig, use_container_width=True)
+        for name in forecast_models:
+            forecast_plots[name] = forecast_df[['date', name]].rename(columns={'date':'Time', name:'Value'})
+
+    # chart and map libraries are imported on first use: only the selected
+    # one is ever loaded, and later reruns find it in sys.modules
+    with perf.stage("chart"):
+        if chart_lib == "Altair":
+            import altair as alt
+            base = alt.Chart(obs_plot).mark_line(point=True).encode(x='Time:T', y='Value:Q')
+            if forecast_plots:
+                combined = base
+                for name, p_df in forecast_plots.items():
+                    _, color, dash, _ = FORECAST_STYLES[name]
+                    combined = combined + alt.Chart(p_df).mark_line(strokeDash=dash, color=color).encode(x='Time:T', y='Value:Q')
+                st.altair_chart(combined.resolve_scale(y='shared'), use_container_width=True)
+            else:
+                st.altair_chart(base, use_container_width=True)
+
+        else:  # Plotly
+            import plotly.express as px
+            fig = px.line(obs_plot, x='Time', y='Value', labels={"Value": f"{param.upper()} ({window['unit'].iloc[0]})"})
+            for name, p_df in forecast_plots.items():
+                label, color, _, dash = FORECAST_STYLES[name]
+                fig.add_scatter(x=p_df['Time'], y=p_df['Value'], mode='lines', name=label, line=dict(dash=dash, color=color))
+            fig.update_layout(height=400, margin=dict(l=20, r=20, t=30, b=20))
+            st.plotly_chart(fig, use_container_width=True)
 else:
     st.info("No time-series to show.")
 
@@ -186,59 +260,42 @@ st.markdown("---")
 # ---------------------------
 st.subheader("🗺 Monitoring Stations Map")
 
-if df.empty or not df['lat'].notna().any():
+if readings.empty or not stations['lat'].notna().any():
     st.info("No station coordinates available to plot on map.")
 else:
-    valid_coords = df.dropna(subset=['lat','lon']).copy()
-    # reduce duplicates by location name (take latest per location)
-    valid_coords = valid_coords.sort_values('date_local').groupby('location').tail(1)
+    # latest reading per station
+    valid_coords = station_rows(latest_rows, stations).dropna(subset=['lat', 'lon'])
     center_lat = valid_coords['lat'].mean()
     center_lon = valid_coords['lon'].mean()
     limit = WHO_LIKE.get(param, 35)
 
-    if map_lib == "Folium":
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=10, tiles="CartoDB positron")
-        for _, row in valid_coords.iterrows():
-            try:
-                v = float(row['value'])
-                color = "green" if v <= limit else "orange" if v <= 2*limit else "red"
-                popup = folium.Popup(f"<b>{row['location']}</b><br>{row['value']} {row['unit']}<br>{row['date_local']}", max_width=300)
-                folium.CircleMarker(
-                    location=[row['lat'], row['lon']],
-                    radius=8,
-                    color=color,
-                    fill=True,
-                    fill_opacity=0.9,
-                    popup=popup
-                ).add_to(m)
-            except Exception:
-                continue
-        st_data = st_folium(m, width=900, height=500)
-
-    else:  # Pydeck
-        # prepare color by value
-        def rgb_for(v):
-            if v <= limit:
-                return [0, 180, 0]
-            elif v <= 2*limit:
-                return [255, 165, 0]
-            else:
-                return [220, 20, 60]
-        valid_coords['color'] = valid_coords['value'].apply(lambda x: rgb_for(float(x)))
-        # pydeck layer
-        layer = pdk.Layer(
-            "ScatterplotLayer",
-            data=valid_coords,
-            get_position='[lon, lat]',
-            get_fill_color='color',
-            get_radius=1000,
-            pickable=True,
-            auto_highlight=True
-        )
-        view_state = pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=10, pitch=0)
-        tooltip = {"html": "<b>{location}</b><br>Value: {value} {unit}<br>Time: {date_local}", "style": {"color": "white"}}
-        deck = pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip)
-        st.pydeck_chart(deck)
+    with perf.stage("map"):
+        if map_lib == "Folium":
+            import folium
+            from streamlit_folium import st_folium
+            m = folium.Map(location=[center_lat, center_lon], zoom_start=10, tiles="CartoDB positron")
+            if TEMPO_TILES_URL:
+                # satellite NO2 from tempo_fastapi's /tempo/tiles endpoint
+                folium.TileLayer(tiles=TEMPO_TILES_URL, attr="NASA TEMPO NO₂", name="TEMPO NO₂",
+                                 overlay=True, opacity=0.6).add_to(m)
+            folium_station_layer(valid_coords, limit).add_to(m)
+            st_data = st_folium(m, width=900, height=500)
+
+        else:  # Pydeck
+            import pydeck as pdk
+            layer = pdk.Layer(
+                "ScatterplotLayer",
+                data=pydeck_station_data(valid_coords, limit),
+                get_position='[lon, lat]',
+                get_fill_color=PYDECK_FILL_COLOR,
+                get_radius=1000,
+                pickable=True,
+                auto_highlight=True
+            )
+            view_state = pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=10, pitch=0)
+            tooltip = {"html": "<b>{location}</b><br>Value: {value} {unit}<br>Time: {date_local}", "style": {"color": "white"}}
+            deck = pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip=tooltip)
+            st.pydeck_chart(deck)
 
 st.markdown("---")
 
@@ -246,9 +303,10 @@ st.markdown("---")
 # Export CSV
 # ---------------------------
 st.subheader("📥 Export / Report")
-if not df.empty:
-    export_df = df[['date_local','value','unit','location','lat','lon']].copy().rename(columns={'date_local':'datetime'})
-    csv = export_df.to_csv(index=False).encode('utf-8')
+if not readings.empty:
+    with perf.stage("export"):
+        export_df = station_rows(readings, stations).rename(columns={'date_local':'datetime'})[['datetime','value','unit','location','lat','lon']]
+        csv = export_df.to_csv(index=False).encode('utf-8')
     st.download_button(label="Download CSV (last records)", data=csv, file_name=f"{city}_{param}_data.csv", mime='text/csv')
 else:
     st.info("No data to export.")
@@ -263,6 +321,4 @@ st.markdown("""
 - Built with Streamlit for rapid prototyping — backend can be separated into FastAPI and front-end moved to React if required.
 """)
 
-
-
-
+perf_panel()
@@ -0,0 +1,12 @@
+# benchmarks/__init__.py
+# Micro-benchmarks for the data pipelines. Run from the app/ directory, e.g.
+#   python -m benchmarks.bench_normalize
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+for _path in (APP_DIR, os.path.join(APP_DIR, "weather_data")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,36 @@
+# bench_compact.py
+# Memory per million measurements: raw OpenAQ records in a DataFrame,
+# the normalized fetch/store frame, and station_frame's compact
+# readings + station table.
+import time
+
+import pandas as pd
+
+from benchmarks.stub_server import make_measurement
+from openaq_client import normalize_measurements
+from station_frame import compact, memory_bytes
+
+
+def main(n_rows=1_000_000, raw_rows=100_000):
+    scale = n_rows / raw_rows
+    results = [make_measurement(i) for i in range(raw_rows)]
+    raw = pd.DataFrame(results)
+    normalized = normalize_measurements(results)
+    # the normalized frame at full size, tiled from the sample
+    full = pd.concat([normalized] * int(scale), ignore_index=True)
+
+    start = time.perf_counter()
+    readings, stations = compact(full)
+    elapsed = time.perf_counter() - start
+
+    mb = 2 ** 20
+    print(f"memory per {n_rows:,} measurements ({stations.shape[0]} stations)")
+    print(f"  raw records (nested dicts):  {memory_bytes(raw) * scale / mb:8.1f} MB (scaled from {raw_rows:,})")
+    print(f"  normalized fetch/store frame:{memory_bytes(full) / mb:8.1f} MB")
+    print(f"  compact readings + stations: {memory_bytes(readings, stations) / mb:8.1f} MB "
+          f"({memory_bytes(full) / memory_bytes(readings, stations):.1f}x smaller), built in {elapsed:.2f}s")
+    print(f"  bytes per reading:           {memory_bytes(full) / n_rows:6.0f} -> {memory_bytes(readings) / n_rows:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# bench_csv_stream.py
+# Daily means from a large OpenAQ CSV export: the old whole-file read_csv
+# versus the chunked reader with partial sums, plus the Parquet re-read.
+# Peak memory is measured with tracemalloc (pandas/NumPy buffers included).
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import APP_DIR
+from benchmarks.synthetic import write_openaq_export
+
+sys.path.insert(0, os.path.join(APP_DIR, "openAq datasets"))
+from us_air_quality_ets import convert_to_parquet, daily_means  # noqa: E402
+
+
+def legacy_daily(path: str) -> pd.DataFrame:
+    """preprocess_data + resample before the streaming reader."""
+    df = pd.read_csv(path, parse_dates=['datetime'])
+    df = df[['datetime', 'value', 'city', 'location']]
+    df = df.dropna(subset=['value'])
+    df = df.sort_values('datetime')
+    return df.set_index('datetime').groupby('location')['value'].resample('D').mean().dropna()
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak / 2**20
+
+
+def main(n_rows=2_000_000, chunksize=250_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = os.path.join(tmp, "us_air_quality.csv")
+        write_openaq_export(csv, n_rows)
+        print(f"{n_rows:,} rows, {os.path.getsize(csv) / 2**20:.0f} MB CSV")
+
+        legacy, elapsed, peak = measure(lambda: legacy_daily(csv))
+        print(f"  whole-file read_csv:     {elapsed:6.2f}s  peak {peak:7.1f} MB")
+        streamed, elapsed, peak = measure(lambda: daily_means(csv, chunksize))
+        print(f"  chunked ({chunksize:,} rows): {elapsed:6.2f}s  peak {peak:7.1f} MB")
+
+        a = legacy.sort_index().to_numpy()
+        b = streamed.set_index(["location", "datetime"])["value"].sort_index().to_numpy()
+        assert len(a) == len(b) and np.allclose(a, b, rtol=1e-5), "daily means differ"
+
+        _, elapsed, _ = measure(lambda: convert_to_parquet(csv, chunksize=chunksize))
+        print(f"  one-time Parquet convert: {elapsed:6.2f}s")
+        parquet = os.path.splitext(csv)[0] + ".parquet"
+        _, elapsed, peak = measure(lambda: daily_means(parquet, chunksize))
+        print(f"  daily means from Parquet: {elapsed:6.2f}s  peak {peak:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# bench_ets.py
+# Per-location ETS fitting throughput (series/sec) versus worker count, plus
+# the cached (unchanged) and warm-started (one new day) re-runs.
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import APP_DIR
+
+sys.path.insert(0, os.path.join(APP_DIR, "openAq datasets"))
+from us_air_quality_ets import fit_locations  # noqa: E402
+
+
+def synthetic_stations(n_series: int, days: int = 90, seed: int = 0) -> pd.DataFrame:
+    """Hourly readings with a weekly cycle for ``n_series`` stations."""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2025-06-01", periods=days * 24, freq="h", tz="UTC")
+    weekly = 5 * np.sin(2 * np.pi * np.arange(len(times)) / (24 * 7))
+    base = rng.uniform(8, 30, n_series)[:, None]
+    return pd.DataFrame({
+        "datetime": np.tile(times, n_series),
+        "value": (base + weekly + rng.normal(0, 2, (n_series, len(times)))).ravel(),
+        "city": "Synthetic",
+        "location": np.repeat([f"station-{i:04d}" for i in range(n_series)], len(times)),
+    })
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def main(n_series=200, days=90):
+    df = synthetic_stations(n_series, days)
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cores} & set(range(1, cores + 1))) or [1]
+    print(f"{n_series} stations x {days} days, {cores} core(s)")
+    for workers in counts:
+        _, elapsed = timed(lambda: fit_locations(df, max_workers=workers, cache_path=None))
+        print(f"  cold fit, {workers} worker(s): {elapsed:7.2f}s  {n_series / elapsed:7.1f} series/sec")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "ets_params.json")
+        fit_locations(df, max_workers=counts[-1], cache_path=cache)
+        _, elapsed = timed(lambda: fit_locations(df, max_workers=counts[-1], cache_path=cache))
+        print(f"  unchanged (cached):       {elapsed:7.2f}s  {n_series / elapsed:7.1f} series/sec")
+
+        last = df["datetime"].max()
+        extra = df[df["datetime"] > last - pd.Timedelta(days=1)].copy()
+        extra["datetime"] += pd.Timedelta(days=1)
+        grown = pd.concat([df, extra], ignore_index=True)
+        results, elapsed = timed(lambda: fit_locations(grown, max_workers=counts[-1], cache_path=cache))
+        warm = sum(r["status"] == "warm" for r in results.values())
+        print(f"  +1 day (warm start):      {elapsed:7.2f}s  {n_series / elapsed:7.1f} series/sec ({warm} warm)")
+
+
+if __name__ == "__main__":
+    main()
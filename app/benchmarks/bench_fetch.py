@@ -0,0 +1,35 @@
+# bench_fetch.py
+# Measurements/second for openaq_client.fetch_measurements against the local
+# stub server: one connection walking pages in order vs a pooled session
+# with concurrent page requests.
+import time
+
+from benchmarks.stub_server import StubOpenAQ
+from openaq_client import fetch_measurements
+
+
+def run(url, limit, max_workers):
+    start = time.perf_counter()
+    df = fetch_measurements("Karachi", "pm25", limit=limit, page_size=1000,
+                            max_workers=max_workers, base_url=url)
+    elapsed = time.perf_counter() - start
+    assert len(df) == limit, (len(df), limit)
+    return elapsed
+
+
+def main(sizes=(10_000, 50_000, 100_000), latency=0.05):
+    print(f"{'rows':>8} {'sequential s':>13} {'concurrent s':>13} {'rows/s':>10}")
+    for n in sizes:
+        with StubOpenAQ(total=n, latency=latency) as stub:
+            seq = run(stub.url, n, max_workers=1)
+            con = run(stub.url, n, max_workers=8)
+        print(f"{n:>8} {seq:>13.2f} {con:>13.2f} {n / con:>10,.0f}")
+
+    # retry path: every 5th request is answered with 429 + Retry-After
+    with StubOpenAQ(total=10_000, fail_every=5) as stub:
+        elapsed = run(stub.url, 10_000, max_workers=8)
+        print(f"10k rows with injected 429s: {elapsed:.2f}s over {stub.requests} requests")
+
+
+if __name__ == "__main__":
+    main()
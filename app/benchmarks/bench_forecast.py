@@ -0,0 +1,61 @@
+# bench_forecast.py
+# 10k series x 24h horizon: the old per-series make_forecast loop vs one
+# batched forecast.forecast call.
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from forecast import MODELS, forecast
+
+
+def synthetic_series(n_series: int, length: int = 48, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2025-09-29", periods=length, freq="h", tz="UTC")
+    return pd.DataFrame({
+        "location": np.repeat(np.arange(n_series), length),
+        "parameter": "pm25",
+        "date_local": np.tile(times, n_series),
+        "value": rng.gamma(2.0, 10.0, n_series * length),
+    })
+
+
+def legacy_make_forecast(df, hours_ahead=6):
+    """app.make_forecast before the batched engine."""
+    if df.empty:
+        return pd.DataFrame()
+    last_ts = df['date_local'].max()
+    last_val = df['value'].iloc[-1]
+    window = df['value'].dropna().tail(3)
+    rolling_val = float(window.mean()) if len(window)>0 else last_val
+    rows = []
+    for i in range(1, hours_ahead + 1):
+        t = last_ts + timedelta(hours=i)
+        rows.append({"date": t, "persistence": last_val, "rolling": rolling_val})
+    return pd.DataFrame(rows)
+
+
+def main(n_series=10_000, horizon=24):
+    df = synthetic_series(n_series)
+    start = time.perf_counter()
+    for _, g in df.groupby("location"):
+        legacy_make_forecast(g, horizon)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forecast(df, horizon)
+    batched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    out = forecast(df, horizon, models=list(MODELS))
+    all_models = time.perf_counter() - start
+
+    print(f"{n_series:,} series x {horizon}h ({len(df):,} readings)")
+    print(f"  legacy loop (persistence+rolling): {legacy:7.2f}s")
+    print(f"  batched (persistence+rolling):     {batched:7.3f}s ({legacy / batched:.0f}x)")
+    print(f"  batched (all {len(MODELS)} models):          {all_models:7.3f}s, {len(out):,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# bench_ingest.py
+# Simulated page renders under concurrent sessions: every render fetching
+# inline (old behaviour on a cache miss) vs renders that only read the
+# store while IngestWorker keeps it fresh. Also checks that concurrent
+# refreshes of one pair are coalesced into a single upstream fetch.
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.stub_server import StubOpenAQ
+from ingest_worker import IngestWorker
+from measurement_store import MeasurementStore
+from openaq_client import fetch_measurements
+
+
+def p95(samples):
+    return float(np.percentile(samples, 95)) * 1000
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(sessions=20, renders=100, limit=2_000, latency=0.05):
+    with StubOpenAQ(total=20_000, latency=latency) as stub:
+        inline = lambda: fetch_measurements("Karachi", "pm25", limit=limit, base_url=stub.url)
+        with ThreadPoolExecutor(sessions) as pool:
+            before = stub.requests
+            samples = list(pool.map(lambda _: timed(inline), range(renders)))
+        print(f"inline fetch:   p95 {p95(samples):8.1f} ms, {stub.requests - before} upstream requests")
+
+        store = MeasurementStore(":memory:")
+        worker = IngestWorker(store, [("Karachi", "pm25")], interval=1, limit=limit, base_url=stub.url)
+        worker.run_once()
+        worker.start()
+        read = lambda: store.read("Karachi", "pm25", limit=limit)
+        with ThreadPoolExecutor(sessions) as pool:
+            before = stub.requests
+            samples = list(pool.map(lambda _: timed(read), range(renders)))
+        worker.stop()
+        print(f"worker + store: p95 {p95(samples):8.1f} ms, {stub.requests - before} upstream requests")
+
+        store = MeasurementStore(":memory:")
+        worker = IngestWorker(store, limit=limit, base_url=stub.url)
+        with ThreadPoolExecutor(sessions) as pool:
+            before = stub.requests
+            list(pool.map(lambda _: worker.refresh("Karachi", "pm25"), range(sessions)))
+        print(f"{sessions} concurrent cold refreshes: {stub.requests - before} upstream requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench_map_layers.py
+# Build + serialize time and payload size for the station map with 10k
+# stations: per-row Folium markers / .apply colours vs map_layers.
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+
+from map_layers import PYDECK_FILL_COLOR, folium_station_layer, pydeck_station_data
+
+LIMIT = 15
+
+
+def synthetic_stations(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "location": [f"Station {i}" for i in range(n)],
+        "lat": rng.uniform(25, 49, n),
+        "lon": rng.uniform(-124, -67, n),
+        "value": rng.gamma(2.0, 10.0, n).round(1),
+        "unit": "µg/m³",
+        "date_local": pd.Timestamp("2025-10-01 12:00", tz="UTC"),
+    })
+
+
+def legacy_folium(stations):
+    m = folium.Map(location=[37, -95], zoom_start=4, tiles="CartoDB positron")
+    for _, row in stations.iterrows():
+        v = float(row['value'])
+        color = "green" if v <= LIMIT else "orange" if v <= 2*LIMIT else "red"
+        popup = folium.Popup(f"<b>{row['location']}</b><br>{row['value']} {row['unit']}<br>{row['date_local']}", max_width=300)
+        folium.CircleMarker(location=[row['lat'], row['lon']], radius=8, color=color,
+                            fill=True, fill_opacity=0.9, popup=popup).add_to(m)
+    return m.get_root().render()
+
+
+def new_folium(stations):
+    m = folium.Map(location=[37, -95], zoom_start=4, tiles="CartoDB positron")
+    folium_station_layer(stations, LIMIT).add_to(m)
+    return m.get_root().render()
+
+
+def legacy_pydeck(stations):
+    stations = stations.copy()
+    def rgb_for(v):
+        if v <= LIMIT:
+            return [0, 180, 0]
+        elif v <= 2*LIMIT:
+            return [255, 165, 0]
+        return [220, 20, 60]
+    stations['color'] = stations['value'].apply(lambda x: rgb_for(float(x)))
+    layer = pdk.Layer("ScatterplotLayer", data=stations, get_position='[lon, lat]', get_fill_color='color')
+    return pdk.Deck(layers=[layer]).to_json()
+
+
+def new_pydeck(stations):
+    layer = pdk.Layer("ScatterplotLayer", data=pydeck_station_data(stations, LIMIT),
+                      get_position='[lon, lat]', get_fill_color=PYDECK_FILL_COLOR)
+    return pdk.Deck(layers=[layer]).to_json()
+
+
+def timed(fn, stations):
+    start = time.perf_counter()
+    out = fn(stations)
+    return time.perf_counter() - start, len(out.encode("utf-8"))
+
+
+def main(n=10_000):
+    stations = synthetic_stations(n)
+    for name, fn in [("folium legacy", legacy_folium), ("folium geojson", new_folium),
+                     ("pydeck legacy", legacy_pydeck), ("pydeck lean", new_pydeck)]:
+        elapsed, size = timed(fn, stations)
+        print(f"{name:15} {n:,} stations: {elapsed:6.2f}s, {size / 1e6:6.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
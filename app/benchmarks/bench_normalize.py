@@ -0,0 +1,56 @@
+# bench_normalize.py
+# Rows/second for OpenAQ result normalization: the old per-row
+# apply/dateutil version vs openaq_client.normalize_measurements.
+import json
+import os
+import time
+
+import pandas as pd
+from dateutil import parser
+
+from benchmarks import FIXTURES_DIR
+from openaq_client import normalize_measurements
+
+
+def load_fixture_results():
+    with open(os.path.join(FIXTURES_DIR, "openaq_measurements.json"), encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def legacy_normalize(results):
+    """The normalization previously inlined in app.fetch_openaq."""
+    df = pd.DataFrame(results)
+    df['date_local'] = df['date'].apply(lambda x: parser.parse(x['local']))
+    def get_lat(row):
+        c = row.get('coordinates')
+        return c.get('latitude') if c else None
+    def get_lon(row):
+        c = row.get('coordinates')
+        return c.get('longitude') if c else None
+    df['lat'] = df.apply(get_lat, axis=1)
+    df['lon'] = df.apply(get_lon, axis=1)
+    df = df.sort_values('date_local')
+    return df
+
+
+def rows_per_second(fn, results, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(results)
+        best = min(best, time.perf_counter() - start)
+    return len(results) / best
+
+
+def main(sizes=(1_000, 10_000, 50_000)):
+    base = load_fixture_results()
+    print(f"{'rows':>8} {'legacy rows/s':>15} {'vectorized rows/s':>18} {'speedup':>8}")
+    for n in sizes:
+        results = (base * (n // len(base) + 1))[:n]
+        old = rows_per_second(legacy_normalize, results)
+        new = rows_per_second(normalize_measurements, results)
+        print(f"{n:>8} {old:>15,.0f} {new:>18,.0f} {new / old:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
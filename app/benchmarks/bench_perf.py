@@ -0,0 +1,40 @@
+# bench_perf.py
+# Cost of the perf instrumentation: one stage() / count() call with
+# metrics on, off (PERF_METRICS=0) and with PERF_MEMORY=1, each in a fresh
+# interpreter since the switches are read at import time.
+import os
+import subprocess
+import sys
+
+from benchmarks import APP_DIR
+
+SNIPPET = """
+import timeit, perf
+n = 200_000
+def stage():
+    with perf.stage("bench"):
+        pass
+def count():
+    perf.count("bench", result="hit")
+print(min(timeit.repeat(stage, number=n, repeat=5)) / n * 1e9,
+      min(timeit.repeat(count, number=n, repeat=5)) / n * 1e9)
+"""
+
+
+def measure(**env) -> tuple:
+    out = subprocess.run([sys.executable, "-c", SNIPPET], cwd=APP_DIR, env={**os.environ, **env},
+                         capture_output=True, text=True, check=True).stdout
+    return tuple(float(v) for v in out.split())
+
+
+def main():
+    print("per call              stage()     count()")
+    for label, env in [("PERF_METRICS=0", {"PERF_METRICS": "0"}),
+                       ("enabled (default)", {"PERF_METRICS": "1"}),
+                       ("PERF_MEMORY=1", {"PERF_METRICS": "1", "PERF_MEMORY": "1"})]:
+        stage_ns, count_ns = measure(**env)
+        print(f"  {label:<18} {stage_ns:8.0f} ns {count_ns:8.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_pyramid.py
+# Low-zoom tiles and coarse /tempo/grid requests over three 0.02 degree
+# granules: sampling the full-resolution granule mean versus the cached
+# tempo_pyramid level that matches the output resolution.
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import tempo_pyramid
+import tempo_tiles
+from benchmarks.synthetic import write_granules
+from downsample import block_mean
+from tempo_loader import CANADA_BBOX, mean_no2, subset_bbox
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def tile_cells(paths, z, level):
+    """Grid cells read to render the first z-level tile over Canada from pyramid ``level``."""
+    lat_c, lon_c = tempo_tiles.tile_pixel_centers(z, *_canada_tile(z))
+    grid = tempo_pyramid.open_level(paths, level)
+    rows = tempo_tiles._nearest_index(grid["latitude"].values, lat_c)
+    cols = tempo_tiles._nearest_index(grid["longitude"].values, lon_c)
+    rows, cols = rows[rows >= 0], cols[cols >= 0]
+    return (np.ptp(rows) + 1) * (np.ptp(cols) + 1) if len(rows) and len(cols) else 0
+
+
+def _canada_tile(z):
+    n = 2 ** z
+    x = int((-100 + 180) / 360 * n)
+    y = int((1 - np.arcsinh(np.tan(np.radians(55))) / np.pi) / 2 * n)
+    return x, y
+
+
+def main(zooms=(0, 2, 4, 6), grid_points=(200, 5_000, 20_000)):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = tuple(write_granules(tmp, 3))
+        cache = os.path.join(tmp, "cache")
+
+        start = time.perf_counter()
+        files = tempo_pyramid.build_pyramid(paths, cache)
+        t_build = time.perf_counter() - start
+        size = sum(os.path.getsize(p) for p in files.values()) / 2 ** 20
+        print(f"pyramid build: {t_build:.2f}s, {len(files)} levels, {size:.1f} MB on disk")
+        # point every level lookup at the temporary cache
+        open_level = tempo_pyramid.open_level
+        tempo_pyramid.open_level = lambda p, f, cache_dir=cache: open_level(p, f, cache_dir)
+        native = tempo_pyramid.native_step(paths)
+        try:
+            print("tiles (one 256x256 tile over Canada):")
+            for z in zooms:
+                x, y = _canada_tile(z)
+                level_for = tempo_tiles.level_for
+                tempo_tiles.level_for = lambda p, step: tempo_pyramid.open_level(p, 1)
+                t_full, _ = timed(lambda: tempo_tiles.render_tile(paths, z, x, y, "viridis", 0, 1e15))
+                tempo_tiles.level_for = level_for
+                t_pyr, _ = timed(lambda: tempo_tiles.render_tile(paths, z, x, y, "viridis", 0, 1e15))
+                lat_c, lon_c = tempo_tiles.tile_pixel_centers(z, x, y)
+                f = tempo_pyramid.pick_factor(native, tempo_tiles.pixel_step(lat_c, lon_c))
+                print(f"  z{z}: full res {t_full * 1e3:7.1f} ms ({tile_cells(paths, z, 1):>9,} cells)   "
+                      f"x{f:<2} level {t_pyr * 1e3:6.1f} ms ({tile_cells(paths, z, f):>9,} cells)")
+
+            print("/tempo/grid over Canada:")
+            full = subset_bbox(mean_no2(paths), CANADA_BBOX)
+            for n in grid_points:
+                t_old, old = timed(lambda: block_mean(full, n).values, repeat=1)
+                t_new, new = timed(lambda: tempo_pyramid.coarse_grid(paths, CANADA_BBOX, n).values)
+                print(f"  max_points={n:>6,}: block_mean of full grid {t_old:6.2f}s ({np.isfinite(old).sum():,} cells)   "
+                      f"pyramid {t_new:6.3f}s ({np.isfinite(new).sum():,} cells)")
+        finally:
+            tempo_pyramid.open_level = open_level
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_station_index.py
+# Per-rerun cost of the single-city page's metrics, chart window and map
+# rows on 1M readings: boolean-mask scans + sort/groupby-tail on every
+# rerun versus StationIndex queries and an incremental append.
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from station_frame import compact
+from station_index import StationIndex
+
+
+def synthetic_frame(n_rows: int, n_stations: int = 500, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    utc = pd.date_range("2025-01-01", periods=n_rows, freq="5s", tz="UTC")
+    return pd.DataFrame({
+        "location": pd.Series([f"Station {i}" for i in rng.integers(0, n_stations, n_rows)]),
+        "date_utc": utc,
+        "date_local": utc.tz_convert("Etc/GMT-5"),
+        "value": rng.gamma(2.0, 10.0, n_rows).round(1),
+        "unit": "µg/m³",
+        "parameter": "pm25",
+        "lat": rng.uniform(24, 25, n_rows),
+        "lon": rng.uniform(67, 68, n_rows),
+    })
+
+
+def legacy_rerun(df):
+    """app.py's metric/chart/map queries before the index."""
+    last_ts = df['date_local'].max()
+    window = df[df['date_local'] >= last_ts - timedelta(hours=24)]
+    avg_24, max_24 = window['value'].mean(), window['value'].max()
+    last_ts = df['date_local'].max()
+    window = df[df['date_local'] >= last_ts - timedelta(hours=48)]
+    valid_coords = df.dropna(subset=['lat', 'lon']).copy()
+    valid_coords = valid_coords.sort_values('date_local').groupby('location').tail(1)
+    return avg_24, max_24, len(window), len(valid_coords)
+
+
+def indexed_rerun(index):
+    with index.lock:
+        s = index.stats(24)
+        window = index.window(48)
+        latest = index.latest_per_station()
+    return s["avg"], s["max"], len(window), len(latest)
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main(n_rows=1_000_000, new_rows=100):
+    df = synthetic_frame(n_rows + new_rows)
+    old, new = df.iloc[:n_rows], df.iloc[n_rows:]
+    legacy, t_legacy = timed(lambda: legacy_rerun(old))
+
+    start = time.perf_counter()
+    index = StationIndex.from_frame(old)
+    t_build = time.perf_counter() - start
+    indexed, t_query = timed(lambda: indexed_rerun(index))
+    assert np.isclose(legacy[0], indexed[0]) and np.isclose(legacy[1], indexed[1]) and legacy[2:] == indexed[2:]
+
+    batch = compact(new)
+    start = time.perf_counter()
+    index.append(*batch)
+    t_append = time.perf_counter() - start
+
+    print(f"{n_rows:,} readings, 500 stations")
+    print(f"  legacy masks + groupby tail per rerun: {t_legacy * 1000:8.1f} ms")
+    print(f"  StationIndex queries per rerun:        {t_query * 1000:8.2f} ms ({t_legacy / t_query:.0f}x)")
+    print(f"  one-time index build:                  {t_build * 1000:8.1f} ms")
+    print(f"  append {new_rows} new rows:                 {t_append * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
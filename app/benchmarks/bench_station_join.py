@@ -0,0 +1,92 @@
+# bench_station_join.py
+# TEMPO sampling at 5,000 stations: a per-station .sel(method="nearest")
+# loop versus station_join's vectorized nearest/bilinear lookup, then the
+# full merge_asof join with hourly weather.
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from benchmarks.synthetic import write_granule
+from station_join import build_table, sample_grid, sample_granules, station_coords
+from tempo_aggregates import open_granule
+from weather_client import HOURLY
+
+
+def synthetic_measurements(n_stations: int, hours: int = 48, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    times = pd.date_range("2025-09-20T00:00", periods=hours, freq="h", tz="UTC")
+    lat, lon = rng.uniform(42, 60, n_stations), rng.uniform(-130, -60, n_stations)
+    return pd.DataFrame({
+        "location": np.repeat([f"Station {i}" for i in range(n_stations)], hours),
+        "date_utc": np.tile(times, n_stations),
+        "value": rng.gamma(2.0, 8.0, n_stations * hours),
+        "lat": np.repeat(lat, hours),
+        "lon": np.repeat(lon, hours),
+    })
+
+
+def synthetic_weather(n_sites: int, hours: int = 48) -> pd.DataFrame:
+    times = pd.date_range("2025-09-20T00:00", periods=hours, freq="h", tz="UTC")
+    g = int(np.ceil(np.sqrt(n_sites)))
+    lat = np.repeat(np.linspace(42, 60, g), g)[:n_sites]
+    lon = np.tile(np.linspace(-130, -60, g), g)[:n_sites]
+    df = pd.DataFrame({
+        "location": np.repeat([f"Site {i}" for i in range(n_sites)], hours),
+        "latitude": np.repeat(lat, hours),
+        "longitude": np.repeat(lon, hours),
+        "time": np.tile(times, n_sites),
+    })
+    for k, col in enumerate(HOURLY.values()):
+        df[col] = np.arange(len(df)) % (20 + k)
+    return df
+
+
+def main(n_stations=5_000, legacy_sample=500):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for k, ts in enumerate(["20250920T120000", "20250920T180000", "20250921T000000"]):
+            paths.append(os.path.join(tmp, f"TEMPO_NO2_L3_V04_{ts}Z_S00{k}.nc"))
+            write_granule(paths[-1], seed=k)
+        measurements = synthetic_measurements(n_stations)
+        stations = station_coords(measurements)
+        da = open_granule(paths[0])
+
+        sub = stations.iloc[:legacy_sample]
+        start = time.perf_counter()
+        legacy = [float(da.sel(latitude=la, longitude=lo, method="nearest")) for la, lo in zip(sub["lat"], sub["lon"])]
+        per_station = (time.perf_counter() - start) / legacy_sample
+
+        start = time.perf_counter()
+        nearest = sample_grid(da, stations["lat"], stations["lon"], "nearest")
+        t_nearest = time.perf_counter() - start
+        start = time.perf_counter()
+        bilinear = sample_grid(da, stations["lat"], stations["lon"], "bilinear")
+        t_bilinear = time.perf_counter() - start
+        assert np.allclose(nearest[:legacy_sample], legacy, equal_nan=True), "nearest differs from .sel"
+        ref = da.interp(latitude=xr.DataArray(stations["lat"]), longitude=xr.DataArray(stations["lon"])).values
+        ok = ~np.isnan(ref)
+        assert np.allclose(bilinear[ok], ref[ok], rtol=1e-5), "bilinear differs from interp"
+
+        print(f"{n_stations:,} stations, one 0.02 degree granule ({da.shape[0]} x {da.shape[1]})")
+        print(f"  per-station .sel loop:  {per_station * n_stations:6.2f}s (extrapolated from {legacy_sample})")
+        print(f"  vectorized nearest:     {t_nearest:6.3f}s")
+        print(f"  vectorized bilinear:    {t_bilinear:6.3f}s")
+
+        start = time.perf_counter()
+        tempo = sample_granules(paths, stations)
+        t_granules = time.perf_counter() - start
+        weather = synthetic_weather(200)
+        start = time.perf_counter()
+        table = build_table(measurements, paths, weather)
+        t_join = time.perf_counter() - start
+        print(f"  {len(paths)} granules sampled:     {t_granules:6.3f}s  {len(tempo):,} samples")
+        print(f"  build_table (+200 weather sites): {t_join:6.3f}s  {len(table):,} rows, "
+              f"{table['no2'].notna().mean():.0%} with NO2, {table['temperature_C'].notna().mean():.0%} with weather")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# bench_store.py
+# Refresh cost of a full refetch vs an incremental MeasurementStore.sync
+# once the history is already stored locally.
+import time
+
+from benchmarks.stub_server import StubOpenAQ
+from measurement_store import MeasurementStore
+from openaq_client import fetch_measurements
+
+
+def main(history=50_000, latency=0.05):
+    with StubOpenAQ(total=history, latency=latency) as stub:
+        start = time.perf_counter()
+        fetch_measurements("Karachi", "pm25", limit=history, max_workers=8, base_url=stub.url)
+        full = time.perf_counter() - start
+
+        store = MeasurementStore(":memory:")
+        store.sync("Karachi", "pm25", limit=history, max_workers=8, base_url=stub.url)
+        requests_before = stub.requests
+        start = time.perf_counter()
+        new_rows = store.sync("Karachi", "pm25", limit=history, max_workers=8, base_url=stub.url)
+        incremental = time.perf_counter() - start
+        start = time.perf_counter()
+        df = store.read("Karachi", "pm25", limit=history)
+        read = time.perf_counter() - start
+
+    print(f"full refetch of {history:,} rows: {full:.2f}s")
+    print(f"incremental sync: {incremental:.3f}s, {new_rows} new rows, "
+          f"{stub.requests - requests_before} request(s)")
+    print(f"read {len(df):,} rows from store: {read:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# bench_weather_fetch.py
+# 500 sites against a local Open-Meteo stub with 50 ms latency: the old
+# one-unpooled-request-per-site loop (weather_fetch.py) versus batched
+# multi-coordinate requests, then incremental appends to the store.
+import tempfile
+import time
+
+import pandas as pd
+import requests
+
+from benchmarks.stub_server import NEWEST, StubOpenMeteo
+from weather_client import HOURLY, fetch_weather
+from weather_store import WeatherStore
+
+
+def sites(n: int) -> list:
+    return [(f"Site {i}", round(42 + (i % 50) * 0.1, 4), round(-80 + (i // 50) * 0.1, 4)) for i in range(n)]
+
+
+def legacy_fetch(locations, url) -> pd.DataFrame:
+    """weather_fetch.py, looped over sites."""
+    frames = []
+    for name, latitude, longitude in locations:
+        response = requests.get(f"{url}?latitude={latitude}&longitude={longitude}&hourly=temperature_2m,relative_humidity_2m,wind_speed_10m,precipitation")
+        data = response.json()
+        frames.append(pd.DataFrame({
+            "time": data["hourly"]["time"],
+            "temperature_C": data["hourly"]["temperature_2m"],
+            "humidity_%": data["hourly"]["relative_humidity_2m"],
+            "wind_speed_m/s": data["hourly"]["wind_speed_10m"],
+            "precipitation_mm": data["hourly"]["precipitation"],
+        }).assign(location=name))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(n_sites=500, latency=0.05):
+    locations = sites(n_sites)
+    with StubOpenMeteo(latency=latency) as stub:
+        start = time.perf_counter()
+        legacy_fetch(locations, stub.url)
+        legacy = time.perf_counter() - start
+        legacy_requests, stub.requests = stub.requests, 0
+
+        start = time.perf_counter()
+        df = fetch_weather(locations, past_days=2, base_url=stub.url)
+        batched = time.perf_counter() - start
+        print(f"{n_sites} sites, {latency * 1000:.0f} ms latency, {len(HOURLY)} hourly variables")
+        print(f"  per-site requests.get: {legacy:6.2f}s  {legacy_requests} requests")
+        print(f"  batched fetch_weather: {batched:6.2f}s  {stub.requests} requests, {len(df):,} rows")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = WeatherStore(tmp)
+            now = pd.Timestamp(NEWEST)
+            start = time.perf_counter()
+            first = store.append(df, now=now)
+            t_first = time.perf_counter() - start
+            later = fetch_weather(locations, past_days=2, base_url=stub.url)
+            start = time.perf_counter()
+            second = store.append(later, now=now + pd.Timedelta(hours=6))
+            t_second = time.perf_counter() - start
+            print(f"  store append (initial):  {t_first * 1000:6.1f} ms  {first:,} rows")
+            print(f"  store append (+6h):      {t_second * 1000:6.1f} ms  {second:,} rows")
+            start = time.perf_counter()
+            one = store.read(["Site 7"], start=now - pd.Timedelta(days=1))
+            print(f"  read one site, 1 day:    {(time.perf_counter() - start) * 1000:6.1f} ms  {len(one)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench_weather_plots.py
+# Requests/second for the /weather/* chart endpoints under concurrent
+# clients: the old pyplot-to-file handler vs the cached in-memory renderer
+# (200 responses) vs conditional requests answered with 304.
+#
+# All clients share one event loop and one in-process ASGI client, so the
+# render queue's shared futures are always awaited on the loop that made them.
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from fastapi import FastAPI
+from fastapi.responses import FileResponse
+
+import tempo_fastapi
+from weather_plots import load_weather
+
+_workdir = tempfile.mkdtemp()
+
+
+def legacy_app():
+    """The pre-cache /weather/temperature handler, for comparison."""
+    app = FastAPI()
+    df = load_weather()
+
+    @app.get("/weather/temperature")
+    def get_temperature_graph():
+        output_file = os.path.join(_workdir, "temperature_over_time.png")
+        plt.figure(figsize=(10, 5))
+        plt.plot(df["time"], df["temperature_C"], label="Temperature (°C)", color="red")
+        plt.xticks(rotation=45)
+        plt.xlabel("Time")
+        plt.ylabel("Temperature (°C)")
+        plt.title("Temperature Over Time")
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(output_file, dpi=150, bbox_inches="tight")
+        plt.close()
+        return FileResponse(output_file, media_type="image/png", filename=output_file)
+
+    return app
+
+
+async def load_test(client: httpx.AsyncClient, path, n=200, clients=8, headers=None):
+    """Requests/second over ``n`` requests from ``clients`` concurrent loops, and a
+    status-code count; a request that raises is counted as "error"."""
+    codes = Counter()
+    todo = iter(range(n))
+
+    async def worker():
+        for _ in todo:
+            try:
+                codes[(await client.get(path, headers=headers)).status_code] += 1
+            except Exception:
+                codes["error"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    return n / (time.perf_counter() - start), dict(codes)
+
+
+def asgi_client(app) -> httpx.AsyncClient:
+    # raise_app_exceptions=False: a crashing handler becomes a 500, not a lost run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+
+async def run():
+    async with asgi_client(legacy_app()) as client:
+        rps, codes = await load_test(client, "/weather/temperature", n=40)
+    print(f"legacy pyplot + FileResponse: {rps:8.1f} req/s {codes}")
+    async with asgi_client(tempo_fastapi.app) as client:
+        rps, codes = await load_test(client, "/weather/temperature")
+        print(f"cached in-memory render:      {rps:8.1f} req/s {codes}")
+        etag = (await client.get("/weather/temperature")).headers["etag"]
+        rps, codes = await load_test(client, "/weather/temperature", headers={"If-None-Match": etag})
+        print(f"If-None-Match (304):          {rps:8.1f} req/s {codes}")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# load_test.py
+# Closed-loop load test for tempo_fastapi: N clients, each sending its next
+# request as soon as the previous one returns, over a mix of mostly cold
+# tiles, stats and grid queries over random boxes, uncached weather charts
+# and one identical grid query that every client keeps asking for (served
+# by in-flight de-duplication). Pure standard library (threads + http.client).
+#
+# By default it starts uvicorn on synthetic granules and weather data once
+# per RENDER_WORKERS setting; pass --url to hit a running server instead.
+#   python -m benchmarks.load_test --clients 50 --duration 20 --workers 0,2
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks import APP_DIR
+from benchmarks.synthetic import write_granules, write_weather_csv
+
+# (weight, name) of each request kind in the mix
+MIX = [(50, "tile"), (10, "stats"), (10, "grid"), (15, "hot_grid"), (15, "plot")]
+
+
+def canada_tile(rng: random.Random):
+    z = rng.randint(4, 7)
+    n = 2 ** z
+    lon, lat = rng.uniform(-140, -53), rng.uniform(42, 70)
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2 * n)
+    return z, x, y
+
+
+def next_request(rng: random.Random):
+    kind = rng.choices([k for _, k in MIX], weights=[w for w, _ in MIX])[0]
+    if kind == "tile":
+        z, x, y = canada_tile(rng)
+        return kind, f"/tempo/tiles/{z}/{x}/{y}.png?cmap={rng.choice(['viridis', 'magma', 'plasma'])}"
+    if kind in ("stats", "grid"):
+        lat, lon = rng.uniform(42, 70), rng.uniform(-140, -60)
+        box = f"lat_min={lat:.2f}&lat_max={lat + 5:.2f}&lon_min={lon:.2f}&lon_max={lon + 8:.2f}"
+        return kind, f"/tempo/{kind}?{box}" + ("&max_points=2000" if kind == "grid" else "")
+    if kind == "hot_grid":
+        return kind, "/tempo/grid?max_points=20000"
+    return kind, f"/weather/plot/{rng.choice(['temperature', 'humidity', 'wind'])}?width={rng.randint(4, 30)}"
+
+
+def client(url: str, stop: float, seed: int, results: list):
+    rng = random.Random(seed)
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=120)
+    while time.perf_counter() < stop:
+        kind, path = next_request(rng)
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+            if status == 429:
+                # back off as told (but keep the run bounded); the server drops idle connections
+                time.sleep(min(float(resp.getheader("Retry-After", "1")), max(stop - time.perf_counter(), 0)))
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=120)
+            status = "error"
+        results.append((kind, status, time.perf_counter() - start))
+    conn.close()
+
+
+def warm_up(url: str):
+    """One request per kind, so granule hashes, partials and the pyramid exist before timing."""
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=600)
+    for path in ("/tempo/stats", "/tempo/grid?max_points=500", "/tempo/tiles/0/0/0.png", "/weather/plot/temperature"):
+        conn.request("GET", path)
+        conn.getresponse().read()
+    conn.close()
+
+
+def run_load(url: str, clients: int, duration: float) -> dict:
+    warm_up(url)
+    results = []
+    stop = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(url, stop, i, results)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "results": results}
+
+
+def report(label: str, run: dict):
+    results, elapsed = run["results"], run["elapsed"]
+    statuses = Counter(s for _, s, _ in results)
+    ok = [r for r in results if r[1] == 200]
+    print(f"{label}: {len(results):,} requests in {elapsed:.1f}s -> {len(ok) / elapsed:.1f} ok/s; "
+          f"status {dict(sorted(statuses.items(), key=str))}")
+    by_kind = defaultdict(list)
+    for kind, status, seconds in ok:
+        by_kind[kind].append(seconds)
+    for _, kind in MIX:
+        lat = np.array(by_kind[kind])
+        if len(lat):
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99]) * 1e3
+            print(f"  {kind:<9} {len(lat):6,} ok  p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  p99 {p99:8.1f} ms")
+
+
+# ---------------------------
+# Local server on synthetic data
+# ---------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(data_dir: str, workers: int, queue: int | None):
+    port = _free_port()
+    env = dict(os.environ, TEMPO_DIR=os.path.join(data_dir, "tempo"), RENDER_WORKERS=str(workers),
+               TEMPO_CACHE_DIR=os.path.join(data_dir, f"cache_w{workers}"),
+               WEATHER_CSV=os.path.join(data_dir, "weather_data.csv"))
+    if queue:
+        env["RENDER_QUEUE"] = str(queue)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "tempo_fastapi:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.join(APP_DIR, "weather_data"), env=env)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="existing server to load instead of a local synthetic one")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--workers", default=f"0,{os.cpu_count() or 1}",
+                        help="comma-separated RENDER_WORKERS values to compare (local server only)")
+    parser.add_argument("--queue", type=int, help="RENDER_QUEUE for the local server")
+    args = parser.parse_args()
+
+    if args.url:
+        report(args.url, run_load(args.url, args.clients, args.duration))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        write_granules(os.path.join(tmp, "tempo"), 3)
+        write_weather_csv(os.path.join(tmp, "weather_data.csv"))
+        for workers in [int(w) for w in args.workers.split(",")]:
+            proc, url = start_server(tmp, workers, args.queue)
+            try:
+                label = "thread pool (RENDER_WORKERS=0)" if workers == 0 else f"process pool (RENDER_WORKERS={workers})"
+                report(f"{label}, {args.clients} clients", run_load(url, args.clients, args.duration))
+            finally:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    main()
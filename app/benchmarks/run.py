@@ -0,0 +1,367 @@
+# run.py
+# Reproducible benchmark suite: every pipeline on synthetic data (see
+# synthetic.py / stub_server.py), with results written as JSON so runs can
+# be compared across commits.
+#
+#   python -m benchmarks.run                          # all, small sizes
+#   python -m benchmarks.run --size full --only api,forecast
+#   python -m benchmarks.run --compare results/<old>.json results/<new>.json
+#
+# Each benchmark runs in a fresh interpreter (clean caches, environment and
+# peak RSS) and reports a flat dict of metrics. Metric names ending in _s,
+# _ms or _mb are lower-is-better, names ending in _per_s higher-is-better;
+# anything else is context (row counts, request counts).
+import argparse
+import ast
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import APP_DIR
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SIZES = {
+    "small": {"normalize_rows": 20_000, "fetch_rows": 10_000, "weather_sites": 200, "forecast_series": 2_000,
+              "map_stations": 5_000, "export_rows": 500_000, "ets_series": 20, "granules": 3, "granule_step": 0.05,
+              "api_repeat": 10},
+    "full": {"normalize_rows": 100_000, "fetch_rows": 50_000, "weather_sites": 1_000, "forecast_series": 10_000,
+             "map_stations": 20_000, "export_rows": 2_000_000, "ets_series": 100, "granules": 6, "granule_step": 0.02,
+             "api_repeat": 30},
+}
+
+
+def import_profile(code: str, cwd: str, top: int = 6) -> tuple:
+    """Import time of ``code`` in a fresh interpreter (python -X importtime): total ms, slowest packages.
+
+    Each module's own (self) time is charged to its top-level package, so
+    the breakdown shows what gets loaded, not which import pulled it in.
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd,
+                          capture_output=True, text=True, check=True)
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():  # header
+            continue
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(own) / 1e3
+    slowest = sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+    return sum(packages.values()), {k: round(v, 1) for k, v in slowest}
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def median_ms(fn, repeat: int) -> float:
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+# ---------------------------
+# Benchmarks (each runs in its own interpreter)
+# ---------------------------
+def bench_normalize(size: dict) -> dict:
+    from benchmarks.synthetic import make_measurement
+    from openaq_client import normalize_measurements
+
+    n = size["normalize_rows"]
+    results = [make_measurement(i) for i in range(n)]
+    return {"rows": n, "rows_per_s": n / best_of(lambda: normalize_measurements(results))}
+
+
+def bench_fetch(size: dict) -> dict:
+    from benchmarks.stub_server import StubOpenAQ
+    from openaq_client import fetch_measurements
+
+    n = size["fetch_rows"]
+    with StubOpenAQ(total=n, latency=0.01) as stub:
+        seconds = best_of(lambda: fetch_measurements("Karachi", "pm25", limit=n, max_workers=8, base_url=stub.url), 1)
+        requests = stub.requests
+    return {"rows": n, "requests": requests, "fetch_s": seconds, "rows_per_s": n / seconds}
+
+
+def bench_weather_fetch(size: dict) -> dict:
+    from benchmarks.stub_server import StubOpenMeteo
+    from weather_client import fetch_weather
+
+    sites = [(f"Site {i}", round(42 + (i % 50) * 0.1, 4), round(-80 + (i // 50) * 0.1, 4))
+             for i in range(size["weather_sites"])]
+    with StubOpenMeteo(latency=0.01) as stub:
+        start = time.perf_counter()
+        df = fetch_weather(sites, past_days=2, forecast_days=1, base_url=stub.url)
+        seconds = time.perf_counter() - start
+        requests = stub.requests
+    return {"sites": len(sites), "rows": len(df), "requests": requests, "fetch_s": seconds}
+
+
+def bench_forecast(size: dict) -> dict:
+    from benchmarks.bench_forecast import synthetic_series
+    from forecast import MODELS, forecast
+
+    df = synthetic_series(size["forecast_series"])
+    # app.make_forecast: one city/pollutant series, default models
+    series = synthetic_series(1, length=5_000)
+    return {
+        "series": size["forecast_series"],
+        "make_forecast_ms": best_of(lambda: forecast(series, 6, models=("persistence", "rolling"), keys=())) * 1e3,
+        "batched_default_s": best_of(lambda: forecast(df, 24)),
+        "batched_all_models_s": best_of(lambda: forecast(df, 24, models=list(MODELS))),
+    }
+
+
+def bench_map_layers(size: dict) -> dict:
+    from benchmarks.bench_map_layers import new_folium, new_pydeck, synthetic_stations
+
+    stations = synthetic_stations(size["map_stations"])
+    return {
+        "stations": len(stations),
+        "folium_s": best_of(lambda: new_folium(stations)),
+        "pydeck_s": best_of(lambda: new_pydeck(stations)),
+        "folium_payload_mb": len(new_folium(stations)) / 2 ** 20,
+        "pydeck_payload_mb": len(new_pydeck(stations)) / 2 ** 20,
+    }
+
+
+def bench_preprocess(size: dict) -> dict:
+    sys.path.insert(0, os.path.join(APP_DIR, "openAq datasets"))
+    from benchmarks.synthetic import write_openaq_export
+    from us_air_quality_ets import daily_means, preprocess_data
+
+    n = size["export_rows"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "export.csv")
+        write_openaq_export(path, n)
+        preprocess_s = best_of(lambda: preprocess_data(path), 1)
+        daily_s = best_of(lambda: daily_means(path), 1)
+    return {"rows": n, "preprocess_s": preprocess_s, "daily_means_s": daily_s, "rows_per_s": n / preprocess_s}
+
+
+def bench_ets(size: dict) -> dict:
+    sys.path.insert(0, os.path.join(APP_DIR, "openAq datasets"))
+    from benchmarks.bench_ets import synthetic_stations
+    from us_air_quality_ets import fit_locations
+
+    n = size["ets_series"]
+    df = synthetic_stations(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "ets.json")
+        cold = best_of(lambda: fit_locations(df, max_workers=1, cache_path=cache), 1)
+        cached = best_of(lambda: fit_locations(df, max_workers=1, cache_path=cache), 1)
+    return {"series": n, "cold_series_per_s": n / cold, "cached_series_per_s": n / cached}
+
+
+def bench_startup(size: dict) -> dict:
+    """Cold import cost of the dashboard (app.py's module-level imports) and of the API."""
+    with open(os.path.join(APP_DIR, "app.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    app_imports = "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+    app_ms, app_top = import_profile(app_imports, APP_DIR)
+    api_ms, api_top = import_profile("import tempo_fastapi", os.path.join(APP_DIR, "weather_data"))
+    return {"app_import_ms": app_ms, "api_import_ms": api_ms, "app_slowest_imports_ms": app_top,
+            "api_slowest_imports_ms": api_top}
+
+
+def bench_api(size: dict) -> dict:
+    """Every tempo_fastapi endpoint through TestClient: first (cold) call and median warm call."""
+    from benchmarks.synthetic import write_granules, write_weather_csv
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_granules(os.path.join(tmp, "tempo"), size["granules"], step=size["granule_step"])
+        write_weather_csv(os.path.join(tmp, "weather_data.csv"))
+        # read at import time by the service modules
+        os.environ.update(TEMPO_DIR=os.path.join(tmp, "tempo"), TEMPO_CACHE_DIR=os.path.join(tmp, "cache"),
+                          WEATHER_CSV=os.path.join(tmp, "weather_data.csv"), RENDER_WORKERS="1")
+        from fastapi.testclient import TestClient
+        import tempo_fastapi
+
+        repeat = size["api_repeat"]
+        out = {"granules": size["granules"]}
+        start = time.perf_counter()
+        with TestClient(tempo_fastapi.app) as client:
+            # the lifespan hook warms the TEMPO caches in the background; cold
+            # numbers below are the first requests once /ready says so
+            out["startup_s"] = time.perf_counter() - start
+            while client.get("/ready").status_code == 503:
+                time.sleep(0.05)
+            out["ready_s"] = time.perf_counter() - start
+            def get(path, expect=200):
+                r = client.get(path)
+                assert r.status_code == expect, f"{path}: {r.status_code} {r.text[:200]}"
+                return r
+
+            def cold_warm(name, path):
+                start = time.perf_counter()
+                get(path)
+                out[f"{name}_cold_ms"] = (time.perf_counter() - start) * 1e3
+                out[f"{name}_warm_ms"] = median_ms(lambda i: get(path), repeat)
+
+            cold_warm("stats", "/tempo/stats")
+            cold_warm("stats_bbox", "/tempo/stats?lat_min=45.3&lat_max=52.7&lon_min=-120.1&lon_max=-101.4")
+            cold_warm("grid", "/tempo/grid?max_points=5000")
+            out["grid_arrow_warm_ms"] = median_ms(lambda i: get("/tempo/grid?max_points=5000&format=arrow"), repeat)
+            # distinct tiles render once each; repeats come from the disk cache
+            out["tile_render_ms"] = median_ms(lambda i: get(f"/tempo/tiles/5/{7 + i % 8}/{9 + i // 8}.png"), repeat)
+            out["tile_cached_ms"] = median_ms(lambda i: get(f"/tempo/tiles/5/{7 + i % 8}/{9 + i // 8}.png"), repeat)
+            cmaps = ["viridis", "magma", "plasma"]
+            out["tile_z0_ms"] = median_ms(lambda i: get(f"/tempo/tiles/0/0/0.png?cmap={cmaps[i % 3]}"), 3)
+            try:
+                cold_warm("map", "/tempo/map")
+            except Exception as e:
+                # cartopy downloads coastline/border shapefiles on first use; offline that fails
+                out["map_error"] = f"{type(e).__name__}: {e}"[:200]
+            cold_warm("weather_data", "/weather/data")
+            cold_warm("weather_data_lttb", "/weather/data?max_points=500")
+            out["plot_render_ms"] = median_ms(lambda i: get(f"/weather/plot/temperature?width={4 + i}"), repeat)
+            cold_warm("plot_cached", "/weather/plot/humidity")
+            etag = get("/weather/plot/humidity").headers["etag"]
+            out["plot_304_ms"] = median_ms(
+                lambda i: client.get("/weather/plot/humidity", headers={"If-None-Match": etag}), repeat)
+            cold_warm("metrics", "/metrics")
+    return out
+
+
+BENCHMARKS = {name[len("bench_"):]: fn for name, fn in list(globals().items()) if name.startswith("bench_")}
+
+
+# ---------------------------
+# Running + results
+# ---------------------------
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def run_child(name: str, size: str):
+    """Entry point inside the fresh interpreter: print one JSON object."""
+    start = time.perf_counter()
+    metrics = BENCHMARKS[name](SIZES[size])
+    metrics["wall_s"] = time.perf_counter() - start
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(metrics))
+
+
+def run_benchmark(name: str, size: str) -> dict:
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.run", "--child", name, "--size", size],
+                          cwd=APP_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_info() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=APP_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def environment() -> dict:
+    import numpy
+    import pandas
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "numpy": numpy.__version__, "pandas": pandas.__version__}
+
+
+def direction(metric: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 for context values."""
+    if metric.endswith("_per_s"):
+        return 1
+    if metric.endswith(("_s", "_ms", "_mb")):
+        return -1
+    return 0
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Print old/new/change per metric; returns the number of regressions beyond ``threshold``."""
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} ({old.get('size')}) -> {new.get('commit')} ({new.get('size')})")
+    regressions = 0
+    for bench in sorted(set(old["benchmarks"]) & set(new["benchmarks"])):
+        a, b = old["benchmarks"][bench], new["benchmarks"][bench]
+        print(bench)
+        for metric in sorted(set(a) & set(b)):
+            sign = direction(metric)
+            if not sign or not isinstance(a[metric], (int, float)) or not isinstance(b[metric], (int, float)) \
+                    or not a[metric]:
+                continue
+            change = b[metric] / a[metric] - 1
+            verdict = ""
+            if abs(change) >= threshold:
+                better = change * sign > 0
+                verdict = "better" if better else "WORSE"
+                regressions += not better
+            print(f"  {metric:<28} {a[metric]:>12.4g} {b[metric]:>12.4g} {change:>+8.1%}  {verdict}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite on synthetic data.")
+    parser.add_argument("--size", choices=list(SIZES), default="small")
+    parser.add_argument("--only", help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--out", help="results file (default results/<commit>-<size>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change reported by --compare")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.size)
+        return
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {unknown}")
+    info = git_info()
+    report = {**info, "size": args.size, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+              "environment": environment(), "benchmarks": {}}
+    for name in names:
+        print(f"{name} ...", end=" ", flush=True)
+        report["benchmarks"][name] = result = run_benchmark(name, args.size)
+        print(result.get("error") or f"{result['wall_s']:.1f}s")
+        for metric, value in result.items():
+            if metric not in ("wall_s", "error"):
+                print(f"  {metric:<28} {value:.4g}" if isinstance(value, float) else f"  {metric:<28} {value}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{info['commit'] or 'unknown'}{'-dirty' if info['dirty'] else ''}"
+                                                f"-{args.size}.json")
+    if args.only and os.path.exists(out):
+        # a partial re-run updates the earlier results for the same commit
+        with open(out) as f:
+            report["benchmarks"] = {**json.load(f)["benchmarks"], **report["benchmarks"]}
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# stub_server.py
+# Local stand-ins for the OpenAQ /v2/measurements and Open-Meteo
+# /v1/forecast endpoints, used by the fetch benchmarks and tests. Serves
+# synthetic payloads (see synthetic.py) with optional latency and injected
+# 429/5xx responses so retry/backoff paths get exercised.
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import NEWEST, STEP, make_forecast, make_measurement  # noqa: F401
+
+
+class StubOpenAQ:
+    """Threaded HTTP server holding ``total`` synthetic measurements (newest first).
+
+    Every ``fail_every``-th request, and every request for a page in
+    ``fail_pages``, is answered with ``fail_status`` and, unless
+    ``retry_after`` is None, that Retry-After header.
+    """
+
+    def __init__(self, total: int = 10_000, latency: float = 0.0, fail_every: int = 0,
+                 fail_status: int = 429, retry_after: str | None = "0", fail_pages=()):
+        self.total = total
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.fail_pages = set(fail_pages)
+        self.requests = 0
+        self.page_requests = Counter()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/v2/measurements"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    n = stub.requests
+                if stub.latency:
+                    time.sleep(stub.latency)
+                q = parse_qs(urlparse(self.path).query)
+                limit = int(q.get("limit", ["100"])[0])
+                page = int(q.get("page", ["1"])[0])
+                with stub._lock:
+                    stub.page_requests[page] += 1
+                if (stub.fail_every and n % stub.fail_every == 0) or page in stub.fail_pages:
+                    self._fail()
+                    return
+                # rows are spaced STEP apart going back from NEWEST; date_from /
+                # date_to (both inclusive) select a window of row indices
+                first, total = 0, stub.total
+                if "date_from" in q:
+                    since = datetime.fromisoformat(q["date_from"][0])
+                    total = min(total, (NEWEST - since) // STEP + 1)
+                if "date_to" in q:
+                    until = datetime.fromisoformat(q["date_to"][0])
+                    first = max(0, -((until - NEWEST) // STEP))
+                start = first + (page - 1) * limit
+                stop = min(start + limit, total)
+                city = q.get("city", ["Karachi"])[0]
+                parameter = q.get("parameter", ["pm25"])[0]
+                results = [make_measurement(i, city, parameter) for i in range(start, stop)]
+                meta = {"page": page, "limit": limit, "found": max(0, total - first)}
+                self._send(200, {"meta": meta, "results": results})
+
+            def _fail(self):
+                headers = {} if stub.retry_after is None else {"Retry-After": stub.retry_after}
+                self._send(stub.fail_status, {"detail": "injected failure"}, headers)
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubOpenMeteo(StubOpenAQ):
+    """Open-Meteo /v1/forecast stand-in: hourly series for every requested coordinate.
+
+    Like the real API, several comma separated coordinates return a JSON
+    list and a single one returns an object. ``timeformat=unixtime`` is
+    assumed.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_every: int = 0):
+        super().__init__(total=0, latency=latency, fail_every=fail_every)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/v1/forecast"
+
+    def _handler(self):
+        stub = self
+        base = super()._handler()
+
+        class Handler(base):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    n = stub.requests
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.fail_every and n % stub.fail_every == 0:
+                    self._fail()
+                    return
+                q = parse_qs(urlparse(self.path).query)
+                lats = [float(v) for v in q["latitude"][0].split(",")]
+                lons = [float(v) for v in q["longitude"][0].split(",")]
+                hours = 24 * (int(q.get("past_days", ["0"])[0]) + int(q.get("forecast_days", ["7"])[0]))
+                start = int(NEWEST.timestamp()) - 3600 * 24 * int(q.get("past_days", ["0"])[0])
+                variables = q.get("hourly", [""])[0].split(",")
+                body = [make_forecast(lat, lon, start, hours, variables) for lat, lon in zip(lats, lons)]
+                self._send(200, body if len(body) > 1 else body[0])
+
+        return Handler
+
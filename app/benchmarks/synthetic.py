@@ -0,0 +1,129 @@
+# synthetic.py
+# Deterministic synthetic inputs for the benchmarks: OpenAQ measurement
+# records / API pages / CSV exports, Open-Meteo forecast payloads and
+# weather CSVs, and TEMPO-shaped NO2 NetCDF granules. Everything is
+# derived from a row index or a seeded generator, so the same arguments
+# always produce the same bytes.
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+NEWEST = datetime(2025, 10, 1, tzinfo=timezone.utc)
+STEP = timedelta(minutes=10)
+CANADA = ((41, 83), (-141, -52))
+
+
+# ---------------------------
+# OpenAQ
+# ---------------------------
+def make_measurement(i: int, city: str = "Karachi", parameter: str = "pm25") -> dict:
+    """Record ``i`` of a newest-first /v2/measurements result list (50 stations)."""
+    ts = NEWEST - STEP * i
+    station = i % 50
+    return {
+        "locationId": 1000 + station,
+        "location": f"Station {station}",
+        "parameter": parameter,
+        "value": round(10 + (i * 7919) % 1300 / 10, 1),
+        "date": {
+            "utc": ts.isoformat(),
+            "local": (ts + timedelta(hours=5)).replace(tzinfo=timezone(timedelta(hours=5))).isoformat(),
+        },
+        "unit": "µg/m³",
+        "coordinates": {"latitude": 24.8 + station * 0.002, "longitude": 67.0 + station * 0.003},
+        "country": "PK",
+        "city": city,
+        "isMobile": False,
+    }
+
+
+def openaq_page(page: int = 1, limit: int = 1000, total: int = 10_000, **kwargs) -> dict:
+    """One /v2/measurements response body (meta + results)."""
+    start, stop = (page - 1) * limit, min(page * limit, total)
+    return {"meta": {"page": page, "limit": limit, "found": total},
+            "results": [make_measurement(i, **kwargs) for i in range(start, stop)]}
+
+
+def write_openaq_export(path: str, n_rows: int, n_locations: int = 200, seed: int = 0):
+    """OpenAQ-style CSV export: hourly readings for ``n_locations`` stations, ~1% missing."""
+    rng = np.random.default_rng(seed)
+    hours = n_rows // n_locations
+    times = pd.date_range("2024-01-01", periods=hours, freq="h", tz="UTC").strftime("%Y-%m-%dT%H:%M:%SZ")
+    df = pd.DataFrame({
+        "datetime": np.repeat(times, n_locations),
+        "value": rng.gamma(2.0, 8.0, hours * n_locations).round(1),
+        "city": np.tile([f"City {i // 10}" for i in range(n_locations)], hours),
+        "location": np.tile([f"Station {i}" for i in range(n_locations)], hours),
+    })
+    df.loc[rng.random(len(df)) < 0.01, "value"] = np.nan
+    df.to_csv(path, index=False)
+
+
+# ---------------------------
+# Weather
+# ---------------------------
+def make_forecast(lat: float, lon: float, start: int, hours: int, variables) -> dict:
+    """Open-Meteo /v1/forecast body for one coordinate (timeformat=unixtime)."""
+    times = list(range(start, start + 3600 * hours, 3600))
+    seed = int(abs(lat * 100 + lon))
+    hourly = {"time": times}
+    for k, var in enumerate(variables):
+        hourly[var] = [round((seed + 7 * i + 13 * k) % 300 / 10, 1) for i in range(hours)]
+    return {"latitude": lat, "longitude": lon, "utc_offset_seconds": 0, "timezone": "GMT",
+            "hourly_units": {"time": "unixtime"}, "hourly": hourly}
+
+
+def weather_frame(hours: int = 24 * 90, n_sites: int = 1, start: str = "2025-07-01") -> pd.DataFrame:
+    """Hourly weather in the weather_data.csv layout; ``location``/lat/lon columns when ``n_sites`` > 1."""
+    times = pd.date_range(start, periods=hours, freq="h")
+    t = np.arange(hours)
+    frames = []
+    for site in range(n_sites):
+        df = pd.DataFrame({
+            "time": times.strftime("%Y-%m-%dT%H:%M"),
+            "temperature_C": (15 + 8 * np.sin(2 * np.pi * (t + site) / 24)).round(1),
+            "humidity_%": (60 + 20 * np.cos(2 * np.pi * (t + site) / 24)).round(),
+            "wind_speed_m/s": (5 + 3 * np.sin((t + site) / 7)).round(1),
+            "precipitation_mm": np.where((t + site) % 37 == 0, 1.2, 0.0),
+        })
+        if n_sites > 1:
+            df.insert(0, "location", f"Site {site}")
+            df.insert(1, "latitude", round(42 + (site % 50) * 0.1, 4))
+            df.insert(2, "longitude", round(-80 + (site // 50) * 0.1, 4))
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_weather_csv(path: str, hours: int = 24 * 90, n_sites: int = 1):
+    weather_frame(hours, n_sites).to_csv(path, index=False)
+
+
+# ---------------------------
+# TEMPO
+# ---------------------------
+def write_granule(path: str, step: float = 0.02, bbox=CANADA, seed: int = 0):
+    """Synthetic L3 granule (descending latitude, NaN gaps) chunked like the real files."""
+    rng = np.random.default_rng(seed)
+    (lat0, lat1), (lon0, lon1) = bbox
+    lat = np.arange(lat1, lat0, -step)
+    lon = np.arange(lon0, lon1, step)
+    field = (np.sin(np.radians(lat))[:, None] * np.cos(np.radians(lon))[None, :] * 1e15).astype("float32")
+    field += rng.normal(0, 1e14, field.shape).astype("float32")
+    field[rng.random(field.shape) < 0.2] = np.nan
+    ds = xr.Dataset({"weight": (("latitude", "longitude"), field)}, coords={"latitude": lat, "longitude": lon})
+    chunks = (min(512, len(lat)), min(512, len(lon)))
+    ds.to_netcdf(path, encoding={"weight": {"chunksizes": chunks, "zlib": False}})
+
+
+def write_granules(directory: str, count: int = 3, step: float = 0.02, bbox=CANADA,
+                   start: str = "2025-09-20T12:00") -> list:
+    """``count`` hourly granules named like TEMPO_NO2_L3 files; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for k, ts in enumerate(pd.date_range(start, periods=count, freq="h")):
+        paths.append(os.path.join(directory, f"TEMPO_NO2_L3_V04_{ts:%Y%m%dT%H%M%S}Z_S{k:03d}.nc"))
+        write_granule(paths[-1], step, bbox, seed=k)
+    return paths
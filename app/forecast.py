@@ -0,0 +1,122 @@
+# forecast.py
+# Baseline forecasts for many series at once.
+#
+# Input is a long DataFrame (one row per reading) keyed by e.g.
+# location/parameter. The newest LOOKBACK readings of every series are laid
+# out right-aligned in one (series x lookback) matrix and every model is a
+# NumPy reduction over that matrix, broadcast across the horizon. Readings
+# are treated as hourly steps, like the dashboard's original forecast.
+import numpy as np
+import pandas as pd
+
+DEFAULT_MODELS = ("persistence", "rolling")
+
+
+# ---------------------------
+# Models: (history matrix, horizon) -> (series x horizon) forecasts
+# ---------------------------
+def persistence(hist: np.ndarray, horizon: int, **_) -> np.ndarray:
+    """Last observed value, repeated."""
+    return np.repeat(hist[:, -1:], horizon, axis=1)
+
+
+def rolling(hist: np.ndarray, horizon: int, window: int = 3, **_) -> np.ndarray:
+    """Mean of the last ``window`` observations."""
+    recent = hist[:, -window:]
+    count = (~np.isnan(recent)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nansum(recent, axis=1) / count
+    return np.repeat(mean[:, None], horizon, axis=1)
+
+
+def ewm(hist: np.ndarray, horizon: int, alpha: float = 0.3, **_) -> np.ndarray:
+    """Exponentially weighted mean (pandas ``ewm(alpha, adjust=True)`` on the lookback)."""
+    weights = (1 - alpha) ** np.arange(hist.shape[1])[::-1]
+    valid = ~np.isnan(hist)
+    num = np.where(valid, hist, 0.0) @ weights
+    den = valid @ weights
+    with np.errstate(invalid="ignore", divide="ignore"):
+        level = num / den
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def seasonal_naive(hist: np.ndarray, horizon: int, season: int = 24, **_) -> np.ndarray:
+    """Value observed one season before each forecast step."""
+    steps = np.arange(1, horizon + 1)
+    back = season * np.ceil(steps / season).astype(int) - steps  # 0 = newest observation
+    return hist[:, hist.shape[1] - 1 - back]
+
+
+MODELS = {
+    "persistence": persistence,
+    "rolling": rolling,
+    "ewm": ewm,
+    "seasonal_naive": seasonal_naive,
+}
+
+
+def _lookback(models, window: int, alpha: float, season: int) -> int:
+    need = [1]
+    if "rolling" in models:
+        need.append(window)
+    if "ewm" in models:
+        # weights below ~1e-4 of the newest one don't change the result
+        need.append(int(np.ceil(np.log(1e-4) / np.log(1 - alpha))) if 0 < alpha < 1 else 1)
+    if "seasonal_naive" in models:
+        need.append(season)
+    return max(need)
+
+
+# ---------------------------
+# Engine
+# ---------------------------
+def history_matrix(df: pd.DataFrame, keys, time_col: str, value_col: str, lookback: int):
+    """(series index, last timestamps, right-aligned lookback matrix) for every key group."""
+    df = df.dropna(subset=[value_col]).sort_values(list(keys) + [time_col], kind="stable")
+    if keys:
+        groups = df.groupby(list(keys), sort=False, observed=True)
+        codes = groups.ngroup().to_numpy()
+        from_end = groups.cumcount(ascending=False).to_numpy()
+        last = groups[time_col].last()
+        index, last_ts = last.index, pd.DatetimeIndex(last)
+    else:
+        codes = np.zeros(len(df), dtype=np.int64)
+        from_end = np.arange(len(df))[::-1]
+        index = pd.RangeIndex(1 if len(df) else 0)
+        last_ts = pd.DatetimeIndex(df[time_col].iloc[-1:])
+    keep = from_end < lookback
+    hist = np.full((len(index), lookback), np.nan)
+    hist[codes[keep], lookback - 1 - from_end[keep]] = df[value_col].to_numpy(dtype="float64")[keep]
+    return index, last_ts, hist
+
+
+def forecast(df: pd.DataFrame, horizon: int = 6, models=DEFAULT_MODELS, keys=("location", "parameter"),
+             time_col: str = "date_local", value_col: str = "value", freq: str = "h",
+             window: int = 3, alpha: float = 0.3, season: int = 24) -> pd.DataFrame:
+    """Forecast ``horizon`` steps for every series in ``df`` with each of ``models``.
+
+    Returns one row per (series, step): the key columns, ``step``, ``date``
+    (last timestamp + step * freq) and one column per model. ``keys=()``
+    treats the whole frame as a single series.
+    """
+    keys = list(keys)
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise ValueError(f"Unknown forecast model(s): {sorted(unknown)}")
+    if df.empty or not df[value_col].notna().any():
+        return pd.DataFrame()
+    index, last_ts, hist = history_matrix(df, keys, time_col, value_col,
+                                          _lookback(models, window, alpha, season))
+    n = len(index)
+    steps = np.arange(1, horizon + 1)
+    dates = last_ts.repeat(horizon) + pd.to_timedelta(np.tile(steps, n), unit=freq)
+    out = {}
+    if keys:
+        key_frame = index.to_frame(index=False) if isinstance(index, pd.MultiIndex) else pd.DataFrame({keys[0]: index})
+        for k in keys:
+            out[k] = np.repeat(key_frame[k].to_numpy(), horizon)
+    out["step"] = np.tile(steps, n)
+    out["date"] = dates
+    for name in models:
+        out[name] = MODELS[name](hist, horizon, window=window, alpha=alpha, season=season).reshape(-1)
+    return pd.DataFrame(out)
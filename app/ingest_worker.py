@@ -0,0 +1,206 @@
+# ingest_worker.py
+# Keeps the measurement store fresh outside of Streamlit reruns.
+#
+# Either run it as its own process:
+#   python ingest_worker.py --pairs Karachi:pm25 Lahore:no2 --interval 300
+# or let app.py start a single background thread shared by all sessions.
+# The dashboard then only reads snapshots from the store.
+#
+# Pairs given up front (--pairs / INGEST_PAIRS) are polled for as long as
+# the worker runs. Pairs the dashboard asks for via track() are dropped
+# again once nobody has asked for them for INGEST_IDLE_INTERVALS polling
+# intervals, so every city ever typed into the sidebar isn't polled forever.
+import argparse
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from measurement_store import MeasurementStore
+from openaq_client import make_session
+
+DEFAULT_INTERVAL = int(os.environ.get("INGEST_INTERVAL", "300"))
+IDLE_INTERVALS = int(os.environ.get("INGEST_IDLE_INTERVALS", "12"))
+
+logger = logging.getLogger(__name__)
+
+
+def parse_pairs(values) -> list:
+    """``["Karachi:pm25", ...]`` (or one comma separated string) -> [(city, parameter)]."""
+    if isinstance(values, str):
+        values = values.split(",")
+    pairs = []
+    for v in values:
+        if v.strip():
+            city, _, parameter = v.strip().rpartition(":")
+            pairs.append((city, parameter))
+    return pairs
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            return fut.result()
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return fut.result()
+
+
+class IngestWorker:
+    """Polls tracked (city, parameter) pairs and syncs them into the store."""
+
+    def __init__(self, store: MeasurementStore, pairs=(), interval: int = DEFAULT_INTERVAL,
+                 limit: int = 1000, max_workers: int = 4, idle_intervals: int = IDLE_INTERVALS, **fetch_kwargs):
+        self.store = store
+        self.interval = interval
+        self.limit = limit
+        self.idle_intervals = idle_intervals
+        self.fetch_kwargs = {"max_workers": max_workers, **fetch_kwargs}
+        self.fetch_kwargs.setdefault("session", make_session(max_workers))
+        self.pairs = {}
+        self.pinned = set()
+        self.last_seen = {}
+        self.last_sync = {}
+        self.last_error = {}
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        for city, parameter in pairs:
+            self.track(city, parameter, pinned=True)
+
+    def track(self, city: str, parameter: str, limit: int | None = None, pinned: bool = False):
+        """Add a pair to the polling set (or raise its row limit) and mark it as in use.
+
+        Unpinned pairs are untracked after ``idle_intervals`` polling
+        intervals without another track() call.
+        """
+        limit = limit or self.limit
+        with self._lock:
+            key = (city, parameter)
+            is_new = key not in self.pairs
+            self.pairs[key] = max(limit, self.pairs.get(key, 0))
+            self.last_seen[key] = time.time()
+            if pinned:
+                self.pinned.add(key)
+        if is_new:
+            self._wake.set()
+
+    def untrack(self, city: str, parameter: str):
+        """Stop polling a pair; its stored rows are kept."""
+        key = (city, parameter)
+        with self._lock:
+            self.pairs.pop(key, None)
+            self.pinned.discard(key)
+            self.last_seen.pop(key, None)
+        self.last_sync.pop(key, None)
+        self.last_error.pop(key, None)
+
+    def expire_idle(self, now: float | None = None) -> list:
+        """Untrack unpinned pairs nobody has asked for in ``idle_intervals`` intervals; returns them."""
+        if self.idle_intervals <= 0:
+            return []
+        cutoff = (now or time.time()) - self.idle_intervals * self.interval
+        with self._lock:
+            idle = [k for k, seen in self.last_seen.items() if k not in self.pinned and seen < cutoff]
+        for city, parameter in idle:
+            self.untrack(city, parameter)
+            logger.info("untracked idle pair %s/%s", city, parameter)
+        return idle
+
+    def refresh(self, city: str, parameter: str) -> int:
+        """Sync one pair now; concurrent refreshes of a pair share one fetch."""
+        limit = self.pairs.get((city, parameter), self.limit)
+
+        def sync():
+            try:
+                n = self.store.sync(city, parameter, limit=limit, **self.fetch_kwargs)
+            except Exception as e:
+                self.last_error[(city, parameter)] = e
+                raise
+            self.last_sync[(city, parameter)] = time.time()
+            self.last_error.pop((city, parameter), None)
+            return n
+
+        return self._flight.do((city, parameter), sync)
+
+    def refresh_many(self, pairs, max_workers: int = 8) -> dict:
+        """Refresh several pairs concurrently; returns {pair: new rows or exception}."""
+        pairs = list(pairs)
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pairs)))) as pool:
+            futures = {pool.submit(self.refresh, city, parameter): (city, parameter) for city, parameter in pairs}
+            for fut, pair in futures.items():
+                try:
+                    results[pair] = fut.result()
+                except Exception as e:
+                    results[pair] = e
+        return results
+
+    def run_once(self):
+        self.expire_idle()
+        with self._lock:
+            pairs = list(self.pairs)
+        for (city, parameter), result in self.refresh_many(pairs).items():
+            if isinstance(result, Exception):
+                logger.warning("sync of %s/%s failed: %s", city, parameter, result)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.run_once()
+            self._wake.wait(self.interval)
+
+    def start(self):
+        """Start polling in a daemon thread (idempotent)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="ingest-worker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Poll OpenAQ into the local measurement store.")
+    ap.add_argument("--pairs", nargs="+", default=parse_pairs(os.environ.get("INGEST_PAIRS", "Karachi:pm25")),
+                    type=lambda v: parse_pairs([v])[0], help="city:parameter pairs to poll")
+    ap.add_argument("--interval", type=int, default=DEFAULT_INTERVAL, help="seconds between polls")
+    ap.add_argument("--limit", type=int, default=1000, help="rows to backfill for a new pair")
+    ap.add_argument("--once", action="store_true", help="sync every pair once and exit")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    worker = IngestWorker(MeasurementStore(), args.pairs, interval=args.interval, limit=args.limit)
+    if args.once:
+        worker.run_once()
+    else:
+        try:
+            worker.run_forever()
+        except KeyboardInterrupt:
+            pass
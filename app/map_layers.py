@@ -0,0 +1,59 @@
+# map_layers.py
+# Station map layers for app.py, built column-wise instead of per row.
+# Thousands of stations become one GeoJSON layer for Folium and one lean
+# table for Pydeck, instead of one CircleMarker + Popup each.
+import numpy as np
+import pandas as pd
+
+from alerts import LEVEL_COLORS, alert_levels
+
+# same order as alerts.LEVELS: good, moderate, unhealthy, no data
+LEVEL_RGB = np.array([[0, 180, 0], [255, 165, 0], [220, 20, 60], [128, 128, 128]], dtype=np.uint8)
+
+
+def station_geojson(stations: pd.DataFrame, limit: float) -> dict:
+    """FeatureCollection of station points with colour and popup HTML properties."""
+    colors = LEVEL_COLORS[alert_levels(stations["value"], limit)]
+    popups = ("<b>" + stations["location"].astype(str) + "</b><br>" + stations["value"].astype(str) + " "
+              + stations["unit"].astype(str) + "<br>" + stations["date_local"].astype(str))
+    features = [
+        {"type": "Feature",
+         "geometry": {"type": "Point", "coordinates": [lon, lat]},
+         "properties": {"color": color, "popup": popup}}
+        for lon, lat, color, popup in zip(stations["lon"].round(5).tolist(), stations["lat"].round(5).tolist(),
+                                          colors.tolist(), popups.tolist())
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+def folium_station_layer(stations: pd.DataFrame, limit: float):
+    """All stations as a single folium.GeoJson layer of circle markers."""
+    import folium
+
+    return folium.GeoJson(
+        station_geojson(stations, limit),
+        name="Stations",
+        marker=folium.CircleMarker(radius=8, fill=True, fill_opacity=0.9),
+        style_function=lambda f: {"color": f["properties"]["color"], "fillColor": f["properties"]["color"]},
+        popup=folium.GeoJsonPopup(fields=["popup"], labels=False, max_width=300),
+    )
+
+
+# deck.gl accessor picking the colour from the integer level on the client,
+# so the payload carries one small int per station instead of an RGB list
+PYDECK_FILL_COLOR = "@@=" + " : ".join(
+    f"level == {i} ? {rgb.tolist()}" for i, rgb in enumerate(LEVEL_RGB[:-1])
+) + f" : {LEVEL_RGB[-1].tolist()}"
+
+
+def pydeck_station_data(stations: pd.DataFrame, limit: float) -> pd.DataFrame:
+    """Only the columns the ScatterplotLayer and tooltip use; pair with PYDECK_FILL_COLOR."""
+    return pd.DataFrame({
+        "lon": stations["lon"].round(5).to_numpy(),
+        "lat": stations["lat"].round(5).to_numpy(),
+        "level": alert_levels(stations["value"], limit),
+        "location": stations["location"].to_numpy(),
+        "value": stations["value"].to_numpy(),
+        "unit": stations["unit"].to_numpy(),
+        "date_local": stations["date_local"].astype(str).to_numpy(),
+    })
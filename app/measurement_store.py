@@ -0,0 +1,175 @@
+# measurement_store.py
+# Local SQLite store for OpenAQ measurements, so restarts and new
+# (city, parameter) combinations don't refetch the whole history.
+# Each sync asks OpenAQ for everything since the newest stored row (minus
+# a lookback for late reporters), and backfills older history when more
+# rows are wanted than are stored.
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from openaq_client import fetch_measurements, parse_local_timestamps
+
+DEFAULT_DB = os.environ.get(
+    "OPENAQ_STORE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "measurements.db")
+)
+
+# re-read this much before the newest stored row on every sync, so
+# stations that report late aren't skipped; duplicates are ignored
+LOOKBACK = pd.Timedelta(hours=float(os.environ.get("OPENAQ_LOOKBACK_HOURS", "6")))
+
+COLUMNS = ["parameter", "city", "location", "location_id", "date_utc", "date_local",
+           "value", "unit", "lat", "lon", "country"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS measurements (
+    parameter   TEXT    NOT NULL,
+    city        TEXT    NOT NULL,
+    location    TEXT    NOT NULL,
+    location_id INTEGER,
+    date_utc    INTEGER NOT NULL,  -- epoch milliseconds
+    date_local  TEXT,              -- ISO timestamp with station UTC offset
+    value       REAL,
+    unit        TEXT,
+    lat         REAL,
+    lon         REAL,
+    country     TEXT,
+    PRIMARY KEY (parameter, city, location, date_utc)
+) WITHOUT ROWID;
+"""
+
+
+class MeasurementStore:
+    """Measurements keyed by (parameter, city, location, date_utc)."""
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # one connection shared by Streamlit's script threads, guarded by a lock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # pairs whose history OpenAQ has no more of: {(city, parameter): earliest stored}
+        self._history_start = {}
+
+    def close(self):
+        self.conn.close()
+
+    def latest_timestamp(self, city: str, parameter: str):
+        """Newest stored ``date_utc`` for the pair, or None when empty."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT MAX(date_utc) FROM measurements WHERE city = ? AND parameter = ?",
+                (city, parameter),
+            ).fetchone()
+        return pd.Timestamp(row[0], unit="ms", tz="UTC") if row[0] is not None else None
+
+    def extent(self, city: str, parameter: str) -> tuple:
+        """(row count, oldest, newest ``date_utc``) stored for the pair; timestamps are None when empty."""
+        with self._lock:
+            n, lo, hi = self.conn.execute(
+                "SELECT COUNT(*), MIN(date_utc), MAX(date_utc) FROM measurements WHERE city = ? AND parameter = ?",
+                (city, parameter),
+            ).fetchone()
+        ts = lambda v: pd.Timestamp(v, unit="ms", tz="UTC") if v is not None else None
+        return n, ts(lo), ts(hi)
+
+    def append(self, df: pd.DataFrame, city: str, parameter: str) -> int:
+        """Insert normalized measurements, ignoring rows already stored.
+
+        Rows are filed under the queried ``city``/``parameter`` so reads with
+        the same sidebar values find them regardless of OpenAQ's spelling.
+        """
+        if df.empty:
+            return 0
+        rows = pd.DataFrame({
+            "parameter": parameter,
+            "city": city,
+            "location": df["location"].fillna("") if "location" in df else "",
+            "location_id": df["locationId"] if "locationId" in df else None,
+            "date_utc": pd.to_datetime(df["date_utc"], utc=True).astype("int64") // 1_000_000,
+            "date_local": df["date_local"].astype(str),
+            "value": df["value"],
+            "unit": df["unit"] if "unit" in df else None,
+            "lat": df["lat"],
+            "lon": df["lon"],
+            "country": df["country"] if "country" in df else None,
+        }, index=df.index)
+        rows = rows.astype(object).where(rows.notna(), None)
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO measurements ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows.itertuples(index=False, name=None),
+            )
+            return self.conn.total_changes - before
+
+    def read(self, city: str | None = None, parameter: str | None = None,
+             since=None, limit: int | None = None, pairs=None) -> pd.DataFrame:
+        """Stored measurements in the same shape as ``fetch_measurements``.
+
+        ``pairs`` restricts the read to a list of (city, parameter) pairs in
+        one query. With ``limit`` only the newest rows are returned; the
+        result is always sorted oldest first.
+        """
+        where, args = [], []
+        if pairs:
+            where.append("(" + " OR ".join(["(city = ? AND parameter = ?)"] * len(pairs)) + ")")
+            args.extend(v for pair in pairs for v in pair)
+        if city is not None:
+            where.append("city = ?")
+            args.append(city)
+        if parameter is not None:
+            where.append("parameter = ?")
+            args.append(parameter)
+        if since is not None:
+            where.append("date_utc >= ?")
+            args.append(int(pd.Timestamp(since).timestamp() * 1000))
+        sql = f"SELECT {', '.join(COLUMNS)} FROM measurements"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY date_utc DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            df = pd.read_sql_query(sql, self.conn, params=args)
+        if df.empty:
+            return pd.DataFrame()
+        df = df.iloc[::-1].reset_index(drop=True)
+        df = df.rename(columns={"location_id": "locationId"})
+        df["date_utc"] = pd.to_datetime(df["date_utc"], unit="ms", utc=True)
+        df["date_local"] = parse_local_timestamps(df["date_local"].astype("string"))
+        return df
+
+    def sync(self, city: str, parameter: str, limit: int = 1000, fetch=fetch_measurements,
+             lookback: pd.Timedelta = LOOKBACK, **fetch_kwargs) -> int:
+        """Bring the pair up to date and make sure at least ``limit`` rows are stored.
+
+        An empty store gets the latest ``limit`` rows. Afterwards every row
+        since the newest stored one (less ``lookback``) is fetched, however
+        many there are, and if fewer than ``limit`` rows are stored the
+        missing older ones are backfilled. Returns the number of new rows.
+        """
+        count, earliest, latest = self.extent(city, parameter)
+        if latest is None:
+            return self.append(fetch(city, parameter, limit=limit, **fetch_kwargs), city, parameter)
+        since = (latest - lookback).isoformat()
+        added = self.append(fetch(city, parameter, limit=None, date_from=since, **fetch_kwargs), city, parameter)
+        count += added
+        key = (city, parameter)
+        if count < limit and self._history_start.get(key) != earliest:
+            wanted = limit - count
+            # date_to is inclusive: one extra row for the stored one it returns again
+            older = fetch(city, parameter, limit=wanted + 1, date_to=earliest.isoformat(), **fetch_kwargs)
+            if not older.empty:
+                older = older[pd.to_datetime(older["date_utc"], utc=True) < earliest]
+            added += self.append(older, city, parameter)
+            if len(older) < wanted:
+                # OpenAQ has nothing older; don't ask again on every sync
+                self._history_start[key] = self.extent(city, parameter)[1]
+        return added
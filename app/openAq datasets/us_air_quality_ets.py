@@ -1,23 +1,127 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 import requests
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 
+# measurement_store lives next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from measurement_store import DEFAULT_DB, MeasurementStore
+
+# Fitted ETS parameters per location, keyed by a hash of the daily series
+ETS_CACHE = os.environ.get('ETS_CACHE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ets_params.json'))
+SEASONAL_PERIODS = 7
+MIN_DAYS = 2 * SEASONAL_PERIODS
+
 # Step 1: Download OpenAQ data for the US (example: PM2.5, last 1000 records)
 def fetch_openaq_us_data():
     # Skip API download, use local sample file
     print('Using local sample_openaq_us.csv file for analysis.')
 
 # Step 2: Preprocess data
-def preprocess_data(filepath='sample_openaq_us.csv'):
-    df = pd.read_csv(filepath, parse_dates=['datetime'])
+# Bulk exports are read in chunks with explicit dtypes so memory stays
+# bounded by the chunk size (and, for daily_means, by the number of
+# location-days) rather than by the file size.
+CSV_COLUMNS = ['datetime', 'value', 'city', 'location']
+CSV_DTYPES = {'value': 'float32', 'city': 'category', 'location': 'category'}
+CHUNKSIZE = int(os.environ.get('CSV_CHUNKSIZE', '1000000'))
+
+def iter_chunks(filepath, chunksize=CHUNKSIZE):
+    """Cleaned chunks of an OpenAQ CSV (or converted Parquet) export: typed columns, no missing values."""
+    if str(filepath).endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(filepath).iter_batches(batch_size=chunksize, columns=CSV_COLUMNS)
+        reader = (b.to_pandas().astype(CSV_DTYPES) for b in batches)
+    else:
+        reader = pd.read_csv(filepath, usecols=CSV_COLUMNS, dtype=CSV_DTYPES, chunksize=chunksize)
+    for chunk in reader:
+        if chunk['datetime'].dtype == object:
+            chunk['datetime'] = pd.to_datetime(chunk['datetime'], utc=True, format='ISO8601', errors='coerce')
+        chunk = chunk.dropna(subset=['datetime', 'value'])
+        if len(chunk):
+            yield chunk[CSV_COLUMNS]
+
+def _concat_categorical(frames):
+    df = pd.concat(frames, ignore_index=True)
+    for col in ('city', 'location'):
+        # chunks carry different categories; concat falls back to object
+        df[col] = df[col].astype('category')
+    return df
+
+def preprocess_data(filepath='sample_openaq_us.csv', chunksize=CHUNKSIZE):
+    frames = list(iter_chunks(filepath, chunksize))
+    if not frames:
+        return pd.DataFrame(columns=CSV_COLUMNS)
+    df = _concat_categorical(frames)
+    df = df.sort_values('datetime', kind='stable', ignore_index=True)
+    return df
+
+def daily_partials(chunk):
+    """Per (city, location, day) value sums and counts of one chunk."""
+    day = chunk['datetime'].dt.floor('D')
+    keys = [chunk['city'].astype(str), chunk['location'].astype(str), day.rename('datetime')]
+    grouped = chunk['value'].astype('float64').groupby(keys, observed=True, sort=False)
+    return pd.DataFrame({'sum': grouped.sum(), 'count': grouped.count()})
+
+def daily_means(filepath, chunksize=CHUNKSIZE):
+    """Daily mean per location, computed out of core.
+
+    Each chunk is reduced to partial sums and counts which are merged into
+    a running total, so only one chunk plus the location-day totals are in
+    memory at a time. Returns datetime/value/city/location rows like
+    preprocess_data, one per location and day.
+    """
+    total = None
+    for chunk in iter_chunks(filepath, chunksize):
+        part = daily_partials(chunk)
+        total = part if total is None else pd.concat([total, part]).groupby(level=[0, 1, 2], sort=False).sum()
+    if total is None:
+        return pd.DataFrame(columns=CSV_COLUMNS)
+    out = (total['sum'] / total['count']).astype('float32').rename('value').reset_index()
+    out = out.astype({'city': 'category', 'location': 'category'})
+    return out[CSV_COLUMNS].sort_values(['location', 'datetime'], ignore_index=True)
+
+def convert_to_parquet(filepath, out=None, chunksize=CHUNKSIZE):
+    """One-time CSV -> Parquet conversion (needs pyarrow); returns the output path."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    out = out or os.path.splitext(filepath)[0] + '.parquet'
+    schema = pa.schema([('datetime', pa.timestamp('ns', tz='UTC')), ('value', pa.float32()),
+                        ('city', pa.string()), ('location', pa.string())])
+    with pq.ParquetWriter(out, schema) as writer:
+        for chunk in iter_chunks(filepath, chunksize):
+            chunk = chunk.astype({'city': str, 'location': str})
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    return out
+
+# Step 2b: Or read what the dashboard has already synced into the local store
+def load_from_store(parameter='pm25', city=None, db_path=DEFAULT_DB):
+    if not os.path.exists(db_path):
+        return pd.DataFrame(columns=['datetime', 'value', 'city', 'location'])
+    store = MeasurementStore(db_path)
+    try:
+        df = store.read(city=city, parameter=parameter)
+    finally:
+        store.close()
+    if df.empty:
+        return pd.DataFrame(columns=['datetime', 'value', 'city', 'location'])
+    df = df.rename(columns={'date_utc': 'datetime'})
     df = df[['datetime', 'value', 'city', 'location']]
     df = df.dropna(subset=['value'])
-    df = df.sort_values('datetime')
     return df
 
 # Step 3: Visualize time series
 def plot_time_series(df):
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(12,6))
     plt.plot(df['datetime'], df['value'], marker='.', linestyle='-', alpha=0.5)
     plt.title('US Air Quality (PM2.5) Time Series')
@@ -26,28 +130,182 @@ def plot_time_series(df):
     plt.tight_layout()
     plt.show()
 
-# Step 4: ETS Decomposition (on daily mean)
-def ets_decomposition(df):
-    df_daily = df.set_index('datetime').resample('D').mean(numeric_only=True)
-    df_daily = df_daily.dropna()
-    # Exponential Smoothing (ETS)
-    model = ExponentialSmoothing(df_daily['value'], trend='add', seasonal='add', seasonal_periods=7)
-    fit = model.fit()
-    # Plot original and fitted values
-    plt.figure(figsize=(12,6))
-    plt.plot(df_daily.index, df_daily['value'], label='Observed')
-    plt.plot(df_daily.index, fit.fittedvalues, label='Fitted', linestyle='--')
-    plt.title('ETS Decomposition (Exponential Smoothing)')
-    plt.xlabel('Date')
-    plt.ylabel('PM2.5 (µg/m³)')
-    plt.legend()
-    plt.tight_layout()
+# Step 4: ETS per location (on daily means)
+def daily_by_location(df):
+    """{location: daily mean Series} for every station in df."""
+    daily = (df.set_index('datetime')
+               .groupby('location', observed=True)['value']
+               .resample('D').mean()
+               .dropna())
+    return {loc: s.droplevel(0) for loc, s in daily.groupby(level=0, sort=True, observed=True)}
+
+def series_hash(series):
+    """Content hash of a daily series (dates and values)."""
+    h = hashlib.sha256()
+    h.update(series.index.asi8.tobytes())
+    h.update(series.to_numpy(dtype='float64').tobytes())
+    return h.hexdigest()
+
+def _model(series, params=None):
+    if params is None:
+        return ExponentialSmoothing(series, trend='add', seasonal='add', seasonal_periods=SEASONAL_PERIODS)
+    return ExponentialSmoothing(series, trend='add', seasonal='add', seasonal_periods=SEASONAL_PERIODS,
+                                initialization_method='known', initial_level=params['initial_level'],
+                                initial_trend=params['initial_trend'], initial_seasonal=params['initial_seasons'])
+
+def _start_params(params):
+    return np.r_[params['smoothing_level'], params['smoothing_trend'], params['smoothing_seasonal'],
+                 params['initial_level'], params['initial_trend'], params['initial_seasons']]
+
+def fit_series(location, series, previous=None, return_fitted=False):
+    """Fit one location; warm-starts the optimizer from ``previous`` params.
+
+    Runs in a worker process, so it only returns plain data.
+    """
+    model = _model(series)
+    if previous is not None and len(previous['initial_seasons']) == SEASONAL_PERIODS:
+        fit = model.fit(start_params=_start_params(previous), use_brute=False)
+        status = 'warm'
+    else:
+        fit = model.fit()
+        status = 'cold'
+    p = fit.params
+    params = {
+        'smoothing_level': float(p['smoothing_level']),
+        'smoothing_trend': float(p['smoothing_trend']),
+        'smoothing_seasonal': float(p['smoothing_seasonal']),
+        'initial_level': float(p['initial_level']),
+        'initial_trend': float(p['initial_trend']),
+        'initial_seasons': [float(s) for s in p['initial_seasons']],
+    }
+    return {'location': location, 'status': status, 'n': len(series), 'params': params,
+            'sse': float(fit.sse), 'aic': float(fit.aic),
+            'fitted': fit.fittedvalues if return_fitted else None}
+
+def fitted_values(series, params):
+    """In-sample fit of cached params without re-optimizing."""
+    fit = _model(series, params).fit(smoothing_level=params['smoothing_level'],
+                                     smoothing_trend=params['smoothing_trend'],
+                                     smoothing_seasonal=params['smoothing_seasonal'],
+                                     optimized=False)
+    return fit.fittedvalues
+
+def load_param_cache(path=ETS_CACHE):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_param_cache(cache, path=ETS_CACHE):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+def fit_locations(df, max_workers=None, cache_path=ETS_CACHE, return_fitted=False):
+    """Fit an ETS model per location over a process pool.
+
+    Series whose hash matches the cache are skipped; changed series
+    warm-start from their cached params. Returns {location: result} where
+    result['status'] is one of cold / warm / cached / too_short / failed.
+    """
+    series = daily_by_location(df)
+    cache = load_param_cache(cache_path)
+    results, todo = {}, []
+    for loc, s in series.items():
+        key, digest = str(loc), series_hash(s)
+        entry = cache.get(key)
+        if len(s) < MIN_DAYS:
+            results[loc] = {'location': loc, 'status': 'too_short', 'n': len(s)}
+        elif entry is not None and entry['hash'] == digest:
+            results[loc] = {'location': loc, 'status': 'cached', 'n': len(s), 'params': entry['params'],
+                            'sse': entry['sse'], 'aic': entry['aic'],
+                            'fitted': fitted_values(s, entry['params']) if return_fitted else None}
+        else:
+            todo.append((loc, digest, entry['params'] if entry else None))
+
+    def record(loc, digest, run):
+        try:
+            result = run()
+        except Exception as e:
+            results[loc] = {'location': loc, 'status': 'failed', 'n': len(series[loc]), 'error': str(e)}
+            return
+        results[loc] = result
+        cache[str(loc)] = {'hash': digest, 'params': result['params'], 'sse': result['sse'], 'aic': result['aic']}
+
+    if todo and max_workers == 1:
+        for loc, digest, previous in todo:
+            record(loc, digest, lambda: fit_series(loc, series[loc], previous, return_fitted))
+    elif todo:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [(loc, digest, pool.submit(fit_series, loc, series[loc], previous, return_fitted))
+                       for loc, digest, previous in todo]
+            for loc, digest, fut in futures:
+                record(loc, digest, fut.result)
+    if todo and cache_path:
+        save_param_cache(cache, cache_path)
+    return {loc: results[loc] for loc in series}
+
+def plot_fits(df, results):
+    import matplotlib.pyplot as plt
+
+    series = daily_by_location(df)
+    for loc, r in results.items():
+        if r.get('fitted') is None:
+            continue
+        s = series[loc]
+        plt.figure(figsize=(12,6))
+        plt.plot(s.index, s.to_numpy(), label='Observed')
+        plt.plot(s.index, r['fitted'], label='Fitted', linestyle='--')
+        plt.title(f'ETS Decomposition (Exponential Smoothing) - {loc}')
+        plt.xlabel('Date')
+        plt.ylabel('PM2.5 (µg/m³)')
+        plt.legend()
+        plt.tight_layout()
     plt.show()
-    return fit
+
+def ets_decomposition(df, plot=True, max_workers=None, cache_path=ETS_CACHE):
+    results = fit_locations(df, max_workers=max_workers, cache_path=cache_path, return_fitted=plot)
+    if plot:
+        plot_fits(df, results)
+    return results
+
+def summary_table(results):
+    rows = [{'location': r['location'], 'status': r['status'], 'days': r['n'],
+             'alpha': r.get('params', {}).get('smoothing_level'),
+             'beta': r.get('params', {}).get('smoothing_trend'),
+             'gamma': r.get('params', {}).get('smoothing_seasonal'),
+             'sse': r.get('sse'), 'aic': r.get('aic')} for r in results.values()]
+    return pd.DataFrame(rows)
 
 if __name__ == '__main__':
-    fetch_openaq_us_data()
-    df = preprocess_data()
-    plot_time_series(df)
-    fit = ets_decomposition(df)
-    print(fit.summary())
+    ap = argparse.ArgumentParser(description='Per-location ETS fits on OpenAQ daily means.')
+    ap.add_argument('--plot', action='store_true', help='show the series and fitted values')
+    ap.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    ap.add_argument('--no-cache', action='store_true', help=f'refit everything, ignore {os.path.basename(ETS_CACHE)}')
+    ap.add_argument('--csv', help='OpenAQ CSV export to stream into daily means (e.g. us_air_quality.csv)')
+    ap.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='rows per CSV chunk')
+    ap.add_argument('--parquet', action='store_true', help='convert --csv to Parquet once and read that afterwards')
+    args = ap.parse_args()
+
+    if args.csv:
+        path = args.csv
+        if args.parquet:
+            parquet = os.path.splitext(path)[0] + '.parquet'
+            if not os.path.exists(parquet) or os.path.getmtime(parquet) < os.path.getmtime(path):
+                convert_to_parquet(path, parquet, args.chunksize)
+            path = parquet
+        df = daily_means(path, args.chunksize)
+    else:
+        df = load_from_store()
+        if df.empty:
+            fetch_openaq_us_data()
+            df = preprocess_data()
+    if args.plot:
+        plot_time_series(df)
+    start = time.perf_counter()
+    results = ets_decomposition(df, plot=args.plot, max_workers=args.workers,
+                                cache_path=None if args.no_cache else ETS_CACHE)
+    elapsed = time.perf_counter() - start
+    print(summary_table(results).to_string(index=False))
+    print(f'{len(results)} series in {elapsed:.2f}s ({len(results) / elapsed:.1f} series/sec)')
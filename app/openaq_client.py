@@ -0,0 +1,198 @@
+# openaq_client.py
+# Helpers for turning OpenAQ /v2/measurements responses into DataFrames.
+# Kept free of Streamlit so it can be imported by scripts and benchmarks.
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+import perf
+
+BASE_URL = "https://api.openaq.org/v2/measurements"
+PAGE_SIZE = 1000
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# ---------------------------
+# Normalization
+# ---------------------------
+NESTED_COLUMNS = {
+    "date": {"utc": "date_utc", "local": "date_local"},
+    "coordinates": {"latitude": "lat", "longitude": "lon"},
+}
+
+
+def parse_local_timestamps(local: pd.Series) -> pd.Series:
+    """Parse ISO local timestamps in bulk.
+
+    Everything is parsed as UTC first (one vectorized call); when every row
+    carries the same UTC offset the result is converted back to that offset
+    so the dashboard keeps showing station-local time.
+    """
+    parsed = pd.to_datetime(local, utc=True, format="ISO8601", errors="coerce")
+    offsets = local.dropna().str[-6:].unique()
+    if len(offsets) == 1 and offsets[0][0] in "+-":
+        tz = pd.Timestamp("2000-01-01T00:00:00" + offsets[0]).tz
+        parsed = parsed.dt.tz_convert(tz)
+    return parsed
+
+
+@perf.timed("normalize")
+def normalize_measurements(results: list) -> pd.DataFrame:
+    """Flatten OpenAQ measurement records into a sorted DataFrame.
+
+    The nested ``date`` and ``coordinates`` dicts are flattened in one pass and
+    timestamps are parsed column-wise, giving ``date_utc``, ``date_local``,
+    ``lat`` and ``lon`` columns next to the flat fields of the payload.
+    """
+    if not results:
+        return pd.DataFrame()
+    df = pd.DataFrame(results)
+    for col, fields in NESTED_COLUMNS.items():
+        nested = df.pop(col) if col in df.columns else pd.Series(None, index=df.index)
+        records = [x if isinstance(x, dict) else {} for x in nested]
+        flat = pd.DataFrame.from_records(records, index=df.index, columns=list(fields))
+        df = df.join(flat.rename(columns=fields))
+    df["date_utc"] = pd.to_datetime(df["date_utc"], utc=True, format="ISO8601", errors="coerce")
+    df["date_local"] = parse_local_timestamps(df["date_local"].astype("string"))
+    df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
+    df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
+    df = df.sort_values("date_local", kind="stable").reset_index(drop=True)
+    return df
+
+
+# ---------------------------
+# HTTP: pooled session + retry/backoff
+# ---------------------------
+def make_session(pool_size: int = 8) -> requests.Session:
+    """Session whose connection pool is large enough for ``pool_size`` workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _retry_after(resp) -> float | None:
+    """Seconds to wait according to a Retry-After header, if present."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+@perf.timed("http_fetch")
+def get_json(session: requests.Session, url: str, params: dict, retries: int = 5,
+             backoff: float = 0.5, max_backoff: float = 30.0, timeout: float = 15):
+    """GET ``url`` and decode JSON, retrying 429/5xx and connection errors.
+
+    Waits for the server's Retry-After when given, otherwise uses jittered
+    exponential backoff. The last error is raised once ``retries`` is used up.
+    """
+    for attempt in range(retries + 1):
+        try:
+            resp = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            time.sleep(_backoff(attempt, backoff, max_backoff))
+            continue
+        if resp.status_code in RETRY_STATUS and attempt < retries:
+            delay = _retry_after(resp)
+            time.sleep(min(delay, max_backoff) if delay is not None else _backoff(attempt, backoff, max_backoff))
+            continue
+        resp.raise_for_status()
+        perf.add_bytes(urlparse(url).netloc, len(resp.content))
+        return resp.json()
+
+
+# ---------------------------
+# Paginated fetch
+# ---------------------------
+def fetch_measurements(city: str, parameter: str, limit: int | None = 200, page_size: int = PAGE_SIZE,
+                       max_workers: int = 4, session: requests.Session | None = None,
+                       base_url: str = BASE_URL, **extra_params) -> pd.DataFrame:
+    """Fetch up to ``limit`` newest measurements, walking pages concurrently.
+
+    The first page is fetched on its own to learn how many rows exist; the
+    remaining pages go through a pool of at most ``max_workers`` threads
+    sharing one pooled session. Each page is normalized as soon as it
+    arrives, so only in-flight pages are ever held as raw JSON.
+    ``limit=None`` fetches every matching row (page by page when the API
+    doesn't report a row count). ``extra_params`` (e.g. ``date_from``) are
+    passed through to the API.
+    """
+    own_session = session is None
+    if own_session:
+        session = make_session(max_workers)
+    if limit is not None:
+        page_size = max(1, min(page_size, limit))
+    params = {
+        "city": city,
+        "parameter": parameter,
+        "limit": page_size,
+        "sort": "desc",
+        "order_by": "date",
+        **extra_params,
+    }
+
+    def page_results(page: int) -> list:
+        results = get_json(session, base_url, {**params, "page": page}).get("results", [])
+        # the last page may overshoot the requested limit
+        return results if limit is None else results[:limit - (page - 1) * page_size]
+
+    def fetch_page(page: int) -> pd.DataFrame:
+        return normalize_measurements(page_results(page))
+
+    try:
+        first = get_json(session, base_url, {**params, "page": 1})
+        results = first.get("results", [])
+        frames = [normalize_measurements(results if limit is None else results[:limit])]
+        found = first.get("meta", {}).get("found")
+        if limit is not None:
+            total = min(limit, found) if isinstance(found, int) else limit
+        else:
+            total = found if isinstance(found, int) else None
+        if len(results) == page_size and total is not None:
+            n_pages = math.ceil(total / page_size)
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(fetch_page, page) for page in range(2, n_pages + 1)]
+                for fut in as_completed(futures):
+                    frames.append(fut.result())
+        elif len(results) == page_size:
+            # no row count to split the work by: walk pages until a short one
+            page = 1
+            while len(results) == page_size:
+                page += 1
+                results = page_results(page)
+                frames.append(normalize_measurements(results))
+    finally:
+        if own_session:
+            session.close()
+
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if not isinstance(df["date_local"].dtype, pd.DatetimeTZDtype):
+        # pages resolved to different UTC offsets; fall back to UTC
+        df["date_local"] = pd.to_datetime(df["date_local"], utc=True)
+    df = df.sort_values("date_local", kind="stable").reset_index(drop=True)
+    return df
@@ -0,0 +1,201 @@
+# perf.py
+# Lightweight per-stage timers and counters for the dashboard and the API.
+#
+#   with stage("fetch"): ...          # calls, total / max seconds per stage
+#   @timed("forecast")                # same, as a decorator
+#   count("tile_cache", result="hit") # labelled counters
+#   add_bytes("openaq", len(body))    # bytes fetched per source
+#
+# Everything goes into one process-wide registry that prometheus_text()
+# renders for /metrics and snapshot() returns as a table for the Streamlit
+# debug panel. PERF_METRICS=0 turns it all off: stage() hands back a shared
+# no-op context manager, timed() returns the function unchanged and the
+# counters return on their first line. PERF_MEMORY=1 additionally records
+# the tracemalloc peak of every stage (costly, and approximate when stages
+# run on several threads at once).
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from functools import wraps
+
+ENABLED = os.environ.get("PERF_METRICS", "1") != "0"
+MEMORY = ENABLED and os.environ.get("PERF_MEMORY", "0") == "1"
+PREFIX = "cleanair"
+
+_NULL = nullcontext()
+_lock = threading.Lock()
+_stages = {}    # name -> [calls, seconds, max_seconds, peak_bytes]
+_counters = {}  # (name, ((label, value), ...)) -> value
+_local = threading.local()
+
+if MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+# ---------------------------
+# Recording
+# ---------------------------
+class _Stage:
+    __slots__ = ("name", "start", "mem")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        if MEMORY:
+            stack = _local.__dict__.setdefault("stack", [])
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self.mem = [current, 0]
+            stack.append(self.mem)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        peak = 0
+        if MEMORY:
+            stack = _local.stack
+            stack.pop()
+            # nested stages reset the tracemalloc peak; they report theirs back up
+            top = max(tracemalloc.get_traced_memory()[1], self.mem[1])
+            if stack:
+                stack[-1][1] = max(stack[-1][1], top)
+            peak = top - self.mem[0]
+        record(self.name, seconds, peak)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing the enclosed block as stage ``name``."""
+    return _Stage(name) if ENABLED else _NULL
+
+
+def timed(name: str | None = None):
+    """Decorator form of stage(); the stage defaults to the function's name."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Stage(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(name: str, seconds: float, peak_bytes: int = 0):
+    """Add one call of ``seconds`` to stage ``name``."""
+    if not ENABLED:
+        return
+    with _lock:
+        s = _stages.setdefault(name, [0, 0.0, 0.0, 0])
+        s[0] += 1
+        s[1] += seconds
+        s[2] = max(s[2], seconds)
+        s[3] = max(s[3], peak_bytes)
+
+
+def count(name: str, value: float = 1, **labels):
+    """Add ``value`` to counter ``name`` with the given labels (e.g. result="hit")."""
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def add_bytes(source: str, n: int):
+    """Bytes fetched from ``source``."""
+    count("fetched_bytes", n, source=source)
+
+
+# ---------------------------
+# Reading / merging
+# ---------------------------
+def drain() -> dict:
+    """Everything recorded so far, cleared; for shipping worker-process metrics home."""
+    with _lock:
+        data = {"stages": {k: list(v) for k, v in _stages.items()}, "counters": dict(_counters)}
+        _stages.clear()
+        _counters.clear()
+    return data
+
+
+def merge(data: dict):
+    """Fold a drain() from another process into this registry."""
+    if not ENABLED:
+        return
+    with _lock:
+        for name, (calls, seconds, max_seconds, peak) in data["stages"].items():
+            s = _stages.setdefault(name, [0, 0.0, 0.0, 0])
+            s[0] += calls
+            s[1] += seconds
+            s[2] = max(s[2], max_seconds)
+            s[3] = max(s[3], peak)
+        for key, value in data["counters"].items():
+            _counters[key] = _counters.get(key, 0) + value
+
+
+def reset():
+    """Forget everything recorded so far."""
+    drain()
+
+
+def snapshot() -> list:
+    """[{stage, calls, total_s, mean_ms, max_ms, peak_mb}] sorted by total time."""
+    with _lock:
+        stages = {k: list(v) for k, v in _stages.items()}
+    rows = [{"stage": name, "calls": calls, "total_s": seconds, "mean_ms": seconds / calls * 1e3,
+             "max_ms": max_seconds * 1e3, "peak_mb": peak / 2 ** 20}
+            for name, (calls, seconds, max_seconds, peak) in stages.items()]
+    return sorted(rows, key=lambda r: -r["total_s"])
+
+
+def counters() -> dict:
+    """{"name{label=value,...}": value}."""
+    with _lock:
+        items = list(_counters.items())
+    return {name + _labels(labels): value for (name, labels), value in sorted(items)}
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _number(v) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def prometheus_text() -> str:
+    """Registry in the Prometheus text exposition format."""
+    with _lock:
+        stages = sorted((k, list(v)) for k, v in _stages.items())
+        items = sorted(_counters.items())
+    lines = []
+    for metric, kind, help_text, i in [
+        ("stage_calls_total", "counter", "Completed calls per stage.", 0),
+        ("stage_seconds_total", "counter", "Wall time spent per stage.", 1),
+        ("stage_seconds_max", "gauge", "Slowest single call per stage.", 2),
+        ("stage_peak_bytes", "gauge", "Largest traced allocation peak per stage (PERF_MEMORY=1).", 3),
+    ]:
+        if i == 3 and not MEMORY:
+            continue
+        lines += [f"# HELP {PREFIX}_{metric} {help_text}", f"# TYPE {PREFIX}_{metric} {kind}"]
+        lines += [f"{PREFIX}_{metric}{_labels((('stage', name),))} {_number(values[i])}" for name, values in stages]
+    seen = set()
+    for (name, labels), value in items:
+        if name not in seen:
+            seen.add(name)
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+        lines.append(f"{PREFIX}_{name}_total{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,80 @@
+# station_frame.py
+# Compact in-memory layout for station measurements.
+#
+# A fetch/store frame repeats object strings (location, unit, city,
+# country), two tz-aware timestamps, float64 values and the coordinates
+# on every reading. Here readings become a narrow table of categorical
+# station/unit/parameter codes, int64 epoch milliseconds, an int16 UTC
+# offset and the float64 values as reported, while everything that only
+# varies per station (name, id, coordinates, city, country) is kept once
+# in a station table indexed by the station code.
+from datetime import timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+READING_COLUMNS = ["ts", "offset", "station", "parameter", "unit", "value"]
+STATION_COLUMNS = ["location", "locationId", "city", "country", "lat", "lon"]
+
+
+def compact(df: pd.DataFrame) -> tuple:
+    """(readings, stations) from a fetch_measurements / MeasurementStore.read frame.
+
+    Row order is kept. ``readings["station"].cat.codes`` is the row of
+    ``stations`` holding that reading's station, with its latest known
+    coordinates.
+    """
+    if df.empty:
+        return (pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                              zip(READING_COLUMNS, ["int64", "int16", "category", "category", "category", "float64"])}),
+                pd.DataFrame(columns=STATION_COLUMNS))
+    station = pd.Categorical(df["location"].fillna("").to_numpy())
+    codes = station.codes
+    # last row of every station
+    last = np.full(len(station.categories), -1, dtype=np.int64)
+    last[codes] = np.arange(len(codes))
+    stations = pd.DataFrame({"location": station.categories.to_numpy()})
+    for col in STATION_COLUMNS[1:]:
+        stations[col] = df[col].to_numpy()[last] if col in df else None
+
+    utc = pd.to_datetime(df["date_utc"], utc=True)
+    local = df["date_local"] if "date_local" in df else utc
+    if isinstance(local.dtype, pd.DatetimeTZDtype):
+        offset = local.dt.tz_localize(None) - utc.dt.tz_localize(None)
+    else:
+        offset = pd.to_timedelta(np.zeros(len(df)), unit="m")
+    readings = pd.DataFrame({
+        "ts": utc.astype("int64").to_numpy() // 1_000_000,
+        "offset": (offset.to_numpy() // np.timedelta64(1, "m")).astype(np.int16),
+        "station": station,
+        "parameter": pd.Categorical(df["parameter"].to_numpy()) if "parameter" in df else pd.Categorical([None] * len(df)),
+        "unit": pd.Categorical(df["unit"].to_numpy()) if "unit" in df else pd.Categorical([None] * len(df)),
+        "value": df["value"].to_numpy(dtype="float64"),
+    })
+    return readings, stations
+
+
+def local_times(readings: pd.DataFrame) -> pd.Series:
+    """Station-local timestamps of ``readings`` (UTC if the offsets differ), as on the fetch frame."""
+    utc = pd.to_datetime(readings["ts"], unit="ms", utc=True)
+    offsets = readings["offset"].unique()
+    if len(offsets) == 1 and offsets[0]:
+        return utc.dt.tz_convert(timezone(timedelta(minutes=int(offsets[0]))))
+    return utc
+
+
+def station_rows(readings: pd.DataFrame, stations: pd.DataFrame) -> pd.DataFrame:
+    """Map-ready rows (location, lat, lon, value, unit, date_local) for a slice of readings."""
+    codes = readings["station"].cat.codes.to_numpy()
+    return pd.DataFrame({
+        "location": stations["location"].to_numpy()[codes],
+        "lat": stations["lat"].to_numpy(dtype="float64")[codes],
+        "lon": stations["lon"].to_numpy(dtype="float64")[codes],
+        "value": readings["value"].to_numpy(dtype="float64"),
+        "unit": readings["unit"].to_numpy(),
+        "date_local": local_times(readings).array,
+    })
+
+
+def memory_bytes(*frames) -> int:
+    return int(sum(f.memory_usage(deep=True).sum() for f in frames))
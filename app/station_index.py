@@ -0,0 +1,230 @@
+# station_index.py
+# Time-indexed queries over readings for the dashboard.
+#
+# Readings (station_frame layout) are kept sorted by their epoch-ms
+# timestamp, so any time window is a searchsorted away. Prefix sums of
+# value and valid-count give window averages in O(log n), the trailing
+# 24h maximum is kept in a monotonic deque and the latest row of every
+# station in an array indexed by station code. All of it is updated in
+# place as rows are appended, so a rerun only pays for the rows that
+# arrived since the previous one; late rows (older than the newest one
+# indexed, e.g. from the store's lookback re-fetch) make the index rebuild
+# itself in time order. Appends build new arrays rather than writing into
+# old ones, so frames handed out by earlier queries stay valid; hold
+# ``lock`` to take a consistent set of query results.
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from station_frame import READING_COLUMNS, STATION_COLUMNS, compact
+
+HOUR_MS = 3_600_000
+
+
+class StationIndex:
+    """Sorted readings + station table with incremental window aggregates.
+
+    ``max_rows`` bounds the visible history (the newest rows, like the
+    store's ``limit``); older rows are dropped in batches.
+    """
+
+    def __init__(self, max_rows: int | None = None, window_ms: int = 24 * HOUR_MS):
+        self.max_rows = max_rows
+        self.window_ms = window_ms
+        self.stations = compact(pd.DataFrame())[1]
+        self._clear()
+        self.lock = threading.RLock()
+
+    def _clear(self):
+        """Drop every reading, keeping the station table."""
+        self._readings = compact(pd.DataFrame())[0]
+        self._ts = np.empty(0, dtype=np.int64)
+        self._csum = np.zeros(1)
+        self._ccount = np.zeros(1, dtype=np.int64)
+        self._latest = np.full(len(self.stations), -1, dtype=np.int64)
+        self._max = deque()  # positions of a decreasing run of values inside the trailing window
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **kwargs):
+        """Index over a fetch/store frame."""
+        index = cls(**kwargs)
+        index.append(*compact(df))
+        return index
+
+    def __len__(self):
+        return len(self.readings)
+
+    @property
+    def _start(self) -> int:
+        n = len(self._ts)
+        return n - min(n, self.max_rows) if self.max_rows else 0
+
+    @property
+    def readings(self) -> pd.DataFrame:
+        """The visible (newest ``max_rows``) readings, oldest first."""
+        return self._readings.iloc[self._start:]
+
+    @property
+    def empty(self) -> bool:
+        return len(self._ts) == 0
+
+    @property
+    def last_ts(self):
+        """Newest timestamp (epoch ms) or None."""
+        return int(self._ts[-1]) if len(self._ts) else None
+
+    # ---------------------------
+    # Updates
+    # ---------------------------
+    def append(self, readings: pd.DataFrame, stations: pd.DataFrame) -> int:
+        """Add rows (compact layout) not indexed yet; returns how many were added.
+
+        A row is already indexed if its station has a reading at that
+        ``ts``. Rows older than ``last_ts`` are inserted in time order (the
+        index is rebuilt); with a full ``max_rows`` history, rows older than
+        all of it are ignored.
+        """
+        with self.lock:
+            readings = self._unseen(readings)
+            if readings.empty:
+                return 0
+            if self.last_ts is not None and readings["ts"].min() < self.last_ts:
+                self._rebuild(readings, stations)
+            else:
+                self._extend(readings, stations)
+            return len(readings)
+
+    def _unseen(self, readings: pd.DataFrame) -> pd.DataFrame:
+        if self.empty or readings.empty:
+            return readings
+        if self.max_rows and len(self._ts) >= self.max_rows:
+            readings = readings[readings["ts"] >= self._ts[self._start]]
+            if readings.empty:
+                return readings
+        lo = int(np.searchsorted(self._ts, readings["ts"].min(), "left"))
+        indexed = pd.MultiIndex.from_arrays([self._readings["station"].iloc[lo:].astype(str).to_numpy(),
+                                             self._ts[lo:]])
+        keys = pd.MultiIndex.from_arrays([readings["station"].astype(str).to_numpy(),
+                                          readings["ts"].to_numpy(dtype=np.int64)])
+        return readings[~keys.isin(indexed)]
+
+    def _rebuild(self, late: pd.DataFrame, stations: pd.DataFrame):
+        """Re-index the visible readings together with ``late`` ones."""
+        old = self.readings
+        combined = pd.concat([old, late], ignore_index=True)
+        for col in ("station", "parameter", "unit"):
+            combined[col] = union_categoricals([old[col], late[col]])
+        self._clear()
+        self._extend(combined, stations)
+
+    def _extend(self, readings: pd.DataFrame, stations: pd.DataFrame):
+        readings = readings.sort_values("ts", kind="stable")
+        codes = self._station_codes(readings["station"], stations)
+        new = readings.assign(station=pd.Categorical.from_codes(codes, categories=self.stations["location"]))
+        if self._readings.empty:
+            combined = new.reset_index(drop=True)
+        else:
+            combined = pd.concat([self._readings, new], ignore_index=True)
+            for col in ("parameter", "unit"):
+                combined[col] = union_categoricals([self._readings[col], new[col]])
+            combined["station"] = pd.Categorical.from_codes(
+                np.concatenate([self._readings["station"].cat.codes, codes]), categories=self.stations["location"])
+        first = len(self._ts)
+        values = new["value"].to_numpy(dtype="float64")
+        valid = ~np.isnan(values)
+        self._readings = combined[READING_COLUMNS]
+        self._ts = np.concatenate([self._ts, new["ts"].to_numpy(dtype=np.int64)])
+        self._csum = np.concatenate([self._csum, self._csum[-1] + np.cumsum(np.where(valid, values, 0.0))])
+        self._ccount = np.concatenate([self._ccount, self._ccount[-1] + np.cumsum(valid)])
+        self._latest[codes] = np.arange(first, first + len(codes))
+        self._push_max(first)
+        self._trim()
+
+    def _station_codes(self, station: pd.Series, stations: pd.DataFrame) -> np.ndarray:
+        """Codes of ``station`` in self.stations, adding new stations and refreshing coordinates."""
+        if self.stations.empty:
+            self.stations = stations[STATION_COLUMNS].reset_index(drop=True)
+            self._latest = np.full(len(self.stations), -1, dtype=np.int64)
+        table = self.stations.copy()
+        known = pd.Index(table["location"])
+        incoming = stations.set_index("location")
+        added = incoming.index.difference(known)
+        if len(added):
+            table = pd.concat([table, incoming.loc[added].reset_index()[STATION_COLUMNS]], ignore_index=True)
+            self._latest = np.concatenate([self._latest, np.full(len(added), -1, dtype=np.int64)])
+            known = pd.Index(table["location"])
+        # newer batches carry the latest known coordinates
+        pos = known.get_indexer(incoming.index)
+        for col in STATION_COLUMNS[1:]:
+            table.loc[pos, col] = incoming[col].to_numpy()
+        self.stations = table
+        return known.get_indexer(station.astype(str)).astype(np.int64)
+
+    def _push_max(self, first: int):
+        values = self._readings["value"].to_numpy()
+        cutoff = self._ts[-1] - self.window_ms
+        # rows already older than the window can never be its maximum
+        first = max(first, int(np.searchsorted(self._ts, cutoff, "left")))
+        for i in range(first, len(self._ts)):
+            if np.isnan(values[i]):
+                continue
+            while self._max and values[self._max[-1]] <= values[i]:
+                self._max.pop()
+            self._max.append(i)
+        while self._max and self._ts[self._max[0]] < cutoff:
+            self._max.popleft()
+
+    def _trim(self):
+        """Drop rows older than the visible history once they make up half the arrays."""
+        drop = self._start
+        if not self.max_rows or drop < self.max_rows:
+            return
+        self._readings = self._readings.iloc[drop:].reset_index(drop=True)
+        self._ts = self._ts[drop:]
+        self._csum = self._csum[drop:] - self._csum[drop]
+        self._ccount = self._ccount[drop:] - self._ccount[drop]
+        self._latest = np.where(self._latest >= drop, self._latest - drop, -1)
+        self._max = deque(i - drop for i in self._max if i >= drop)
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def span(self, start_ms=None, end_ms=None) -> slice:
+        """Positions (into ``readings``) of rows with ``start_ms <= ts <= end_ms``."""
+        lo = int(np.searchsorted(self._ts, start_ms, "left")) if start_ms is not None else 0
+        hi = int(np.searchsorted(self._ts, end_ms, "right")) if end_ms is not None else len(self._ts)
+        start = self._start
+        return slice(max(lo, start) - start, max(hi, start) - start)
+
+    def window(self, hours: float) -> pd.DataFrame:
+        """Readings of the last ``hours`` hours, ending at the newest reading."""
+        if self.empty:
+            return self.readings
+        return self.readings.iloc[self.span(self.last_ts - int(hours * HOUR_MS))]
+
+    def stats(self, hours: float = 24) -> dict:
+        """avg / max / count of the values in the trailing ``hours`` window."""
+        if self.empty:
+            return {"avg": float("nan"), "max": float("nan"), "count": 0}
+        window_ms = int(hours * HOUR_MS)
+        s = self.span(self.last_ts - window_ms)
+        lo, hi = s.start + self._start, s.stop + self._start
+        count = int(self._ccount[hi] - self._ccount[lo])
+        avg = float((self._csum[hi] - self._csum[lo]) / count) if count else float("nan")
+        if window_ms == self.window_ms and self._max and self._max[0] >= lo:
+            vmax = float(self._readings["value"].iat[self._max[0]])
+        else:
+            vmax = float(np.nanmax(self._readings["value"].to_numpy()[lo:hi])) if count else float("nan")
+        return {"avg": avg, "max": vmax, "count": count}
+
+    def latest(self) -> pd.Series:
+        """The newest reading."""
+        return self._readings.iloc[-1]
+
+    def latest_per_station(self) -> pd.DataFrame:
+        """Newest visible reading of every station, in time order."""
+        pos = np.sort(self._latest[self._latest >= self._start])
+        return self._readings.iloc[pos]
@@ -0,0 +1,11 @@
+# conftest.py
+# Tests run from app/ (python -m pytest tests) and import modules the same
+# flat way app.py and the API do.
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for _path in (APP_DIR, os.path.join(APP_DIR, "weather_data")):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,37 @@
+# test_alerts.py
+# The batch summary reports the newest reading that has a value, with its
+# own timestamp and alert status.
+import numpy as np
+import pandas as pd
+
+from alerts import summarize_24h
+
+
+def readings(*rows) -> pd.DataFrame:
+    """Store-shaped frame from (city, UTC time, value) tuples, all pm25."""
+    return pd.DataFrame({
+        "city": [r[0] for r in rows],
+        "parameter": "pm25",
+        "date_utc": pd.to_datetime([r[1] for r in rows], utc=True),
+        "value": [r[2] for r in rows],
+    })
+
+
+def test_latest_skips_a_missing_newest_value():
+    df = readings(("Karachi", "2025-07-02 09:00", 80.0), ("Karachi", "2025-07-02 10:00", np.nan),
+                  ("Lahore", "2025-07-02 10:00", 10.0))
+    out = summarize_24h(df).set_index("city")
+    assert out.loc["Karachi", "latest"] == 80.0
+    assert out.loc["Karachi", "latest_time"] == pd.Timestamp("2025-07-02 09:00", tz="UTC")
+    assert out.loc["Karachi", "status"] == "Unhealthy"
+    assert out.loc["Karachi", "n_24h"] == 1
+    assert out.loc["Lahore", "status"] == "Good"
+
+
+def test_group_without_values_has_no_data():
+    df = readings(("Karachi", "2025-07-02 10:00", np.nan), ("Lahore", "2025-07-02 10:00", 10.0))
+    out = summarize_24h(df).set_index("city")
+    assert pd.isna(out.loc["Karachi", "latest"]) and pd.isna(out.loc["Karachi", "latest_time"])
+    assert out.loc["Karachi", "status"] == "No data"
+    assert list(out.columns) == ["parameter", "latest", "latest_time", "avg_24h", "max_24h", "n_24h", "status",
+                                 "color"]
@@ -0,0 +1,51 @@
+# test_ingest_worker.py
+# Idle (city, parameter) pairs are dropped from polling; configured ones stay.
+import logging
+import time
+
+import pandas as pd
+import pytest
+
+from ingest_worker import IngestWorker
+from measurement_store import MeasurementStore
+
+
+@pytest.fixture
+def store():
+    s = MeasurementStore(":memory:")
+    yield s
+    s.close()
+
+
+def no_rows(city, parameter, **kwargs):
+    return pd.DataFrame()
+
+
+def test_idle_pairs_expire_but_pinned_pairs_stay(store):
+    worker = IngestWorker(store, [("Karachi", "pm25")], interval=60, idle_intervals=2, fetch=no_rows)
+    worker.track("Typo City", "pm25")
+    worker.track("Lahore", "no2")
+    now = time.time()
+    assert worker.expire_idle(now + 60) == []
+    worker.last_seen[("Lahore", "no2")] = now + 60  # viewed again a minute later
+    assert worker.expire_idle(now + 150) == [("Typo City", "pm25")]
+    assert set(worker.pairs) == {("Karachi", "pm25"), ("Lahore", "no2")}
+    assert worker.expire_idle(now + 300) == [("Lahore", "no2")]
+    assert set(worker.pairs) == {("Karachi", "pm25")}
+
+
+def test_idle_intervals_zero_never_expires(store):
+    worker = IngestWorker(store, interval=60, idle_intervals=0, fetch=no_rows)
+    worker.track("Lahore", "no2")
+    assert worker.expire_idle(time.time() + 10 ** 6) == []
+
+
+def test_failed_sync_is_logged(store, caplog):
+    def failing(city, parameter, **kwargs):
+        raise RuntimeError("upstream down")
+
+    worker = IngestWorker(store, [("Karachi", "pm25")], fetch=failing)
+    with caplog.at_level(logging.WARNING, logger="ingest_worker"):
+        worker.run_once()
+    assert "Karachi/pm25" in caplog.text and "upstream down" in caplog.text
+    assert isinstance(worker.last_error[("Karachi", "pm25")], RuntimeError)
@@ -0,0 +1,64 @@
+# test_measurement_store.py
+# MeasurementStore.sync against the stub OpenAQ server: no gaps after a
+# long outage, backfill when the limit grows, and the late-reporter overlap.
+import pandas as pd
+import pytest
+
+from benchmarks.stub_server import StubOpenAQ
+from benchmarks.synthetic import NEWEST, STEP, make_measurement
+from measurement_store import MeasurementStore
+from openaq_client import normalize_measurements
+
+
+@pytest.fixture
+def store():
+    s = MeasurementStore(":memory:")
+    yield s
+    s.close()
+
+
+def stored_indices(store) -> list:
+    """Stub row indices (0 = newest) present in the store, newest first."""
+    df = store.read("Karachi", "pm25")
+    return sorted(((pd.Timestamp(NEWEST) - df["date_utc"]) // STEP).tolist())
+
+
+def test_sync_after_outage_leaves_no_gap(store):
+    # last synced long ago: rows 2,100 .. 2,199 stored, 2,100 newer ones waiting
+    old = normalize_measurements([make_measurement(i) for i in range(2_100, 2_200)])
+    store.append(old, "Karachi", "pm25")
+    with StubOpenAQ(total=2_200) as stub:
+        added = store.sync("Karachi", "pm25", limit=100, base_url=stub.url)
+    assert added == 2_100
+    assert stored_indices(store) == list(range(2_200))
+
+
+def test_growing_limit_backfills_history(store):
+    with StubOpenAQ(total=1_000) as stub:
+        store.sync("Karachi", "pm25", limit=100, base_url=stub.url)
+        assert stored_indices(store) == list(range(100))
+        store.sync("Karachi", "pm25", limit=400, base_url=stub.url)
+        assert stored_indices(store) == list(range(400))
+
+
+def test_exhausted_history_is_not_refetched(store):
+    with StubOpenAQ(total=150) as stub:
+        store.sync("Karachi", "pm25", limit=100, base_url=stub.url)
+        store.sync("Karachi", "pm25", limit=1_000, base_url=stub.url)
+        assert stored_indices(store) == list(range(150))
+        before = stub.requests
+        store.sync("Karachi", "pm25", limit=1_000, base_url=stub.url)
+        # only the incremental request; no backfill of history that isn't there
+        assert stub.requests == before + 1
+
+
+def test_sync_rereads_lookback_window(store):
+    store.append(normalize_measurements([make_measurement(i) for i in range(10)]), "Karachi", "pm25")
+    calls = []
+
+    def fetch(city, parameter, **kwargs):
+        calls.append(kwargs)
+        return pd.DataFrame()
+
+    store.sync("Karachi", "pm25", limit=5, fetch=fetch, lookback=pd.Timedelta(hours=6))
+    assert calls == [{"limit": None, "date_from": (pd.Timestamp(NEWEST) - pd.Timedelta(hours=6)).isoformat()}]
@@ -0,0 +1,150 @@
+# test_openaq_client.py
+# normalize_measurements against the per-row normalization it replaced,
+# and the paginated fetch / retry paths against the local stub server.
+import copy
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+import requests
+
+import openaq_client
+from benchmarks.bench_normalize import legacy_normalize, load_fixture_results
+from benchmarks.stub_server import StubOpenAQ
+from openaq_client import fetch_measurements, normalize_measurements
+
+
+def legacy(results):
+    """app.fetch_openaq before vectorization, including its empty-result guard."""
+    return pd.DataFrame() if not results else legacy_normalize(results)
+
+
+def comparable(df: pd.DataFrame) -> pd.DataFrame:
+    """Columns both versions produce, ordered by instant then station (ties sort either way)."""
+    out = pd.DataFrame({
+        "instant": pd.to_datetime(df["date_local"], utc=True),
+        "local": [ts.isoformat() for ts in df["date_local"]],
+        "location": df["location"],
+        "value": df["value"].astype("float64"),
+        "lat": pd.to_numeric(df["lat"]).astype("float64"),
+        "lon": pd.to_numeric(df["lon"]).astype("float64"),
+    })
+    return out.sort_values(["instant", "location"], kind="stable").reset_index(drop=True)
+
+
+@pytest.fixture
+def results():
+    return load_fixture_results()
+
+
+def test_matches_legacy_on_fixture(results):
+    new = normalize_measurements(copy.deepcopy(results))
+    assert new["date_local"].is_monotonic_increasing
+    # single UTC offset: station-local wall clock and offset are kept
+    assert str(new["date_local"].dt.tz) == "UTC+05:00"
+    pd.testing.assert_frame_equal(comparable(new), comparable(legacy(copy.deepcopy(results))))
+
+
+def test_mixed_offsets_keep_instants(results):
+    # half the stations report with a different offset: same instants, UTC result
+    for i, r in enumerate(results):
+        if i % 2:
+            utc = datetime.fromisoformat(r["date"]["utc"])
+            r["date"]["local"] = utc.astimezone(timezone(timedelta(hours=-4))).isoformat()
+    new = normalize_measurements(copy.deepcopy(results))
+    assert str(new["date_local"].dt.tz) == "UTC"
+    old = legacy(copy.deepcopy(results))
+    pd.testing.assert_frame_equal(comparable(new).drop(columns="local"), comparable(old).drop(columns="local"))
+
+
+def test_missing_coordinates(results):
+    missing = [i for i, r in enumerate(results) if not r.get("coordinates")]
+    assert missing, "fixture should contain stations without coordinates"
+    new = normalize_measurements(copy.deepcopy(results))
+    assert new["lat"].isna().sum() == len(missing)
+    assert new["lon"].isna().sum() == len(missing)
+    # absent key (not just null) and a non-numeric value are handled too
+    del results[0]["coordinates"]
+    results[1]["coordinates"] = {"latitude": "n/a", "longitude": None}
+    new = normalize_measurements(results)
+    assert new["lat"].dtype == "float64" and new["lat"].isna().sum() == len(set(missing) | {0, 1})
+
+
+def test_empty_results():
+    assert normalize_measurements([]).empty
+    assert legacy([]).empty
+
+
+# ---------------------------
+# Paginated fetch + retries (stub server)
+# ---------------------------
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the retry delays instead of sleeping through them."""
+    delays = []
+    monkeypatch.setattr(openaq_client, "time", SimpleNamespace(sleep=delays.append, time=time.time))
+    return delays
+
+
+def test_pagination_walks_every_page():
+    with StubOpenAQ(total=2_500) as stub:
+        df = fetch_measurements("Karachi", "pm25", limit=5_000, page_size=1_000, base_url=stub.url)
+        assert stub.page_requests == {1: 1, 2: 1, 3: 1}
+    assert len(df) == 2_500
+    assert df["date_utc"].is_unique and df["date_local"].is_monotonic_increasing
+
+
+def test_pagination_stops_at_limit():
+    with StubOpenAQ(total=10_000) as stub:
+        df = fetch_measurements("Karachi", "pm25", limit=1_500, page_size=1_000, base_url=stub.url)
+        assert stub.page_requests == {1: 1, 2: 1}
+    assert len(df) == 1_500
+    # the newest 1,500 rows, not an arbitrary subset
+    assert df["date_utc"].max() == pd.Timestamp("2025-10-01", tz="UTC")
+
+
+def test_date_from_limits_rows():
+    with StubOpenAQ(total=10_000) as stub:
+        df = fetch_measurements("Karachi", "pm25", limit=10_000, base_url=stub.url,
+                                date_from="2025-09-30T00:00:00+00:00")
+    # one row every 10 minutes for 24h, both ends included
+    assert len(df) == 24 * 6 + 1
+
+
+def test_429_waits_for_retry_after(sleeps):
+    with StubOpenAQ(total=3_000, fail_every=2, retry_after="3") as stub:
+        df = fetch_measurements("Karachi", "pm25", limit=3_000, page_size=1_000, max_workers=1,
+                                base_url=stub.url)
+        assert stub.requests > 3
+    assert len(df) == 3_000
+    assert sleeps and all(d == 3.0 for d in sleeps)
+
+
+@pytest.mark.parametrize("status", [500, 502, 503, 504])
+def test_5xx_is_retried_with_backoff(sleeps, status):
+    with StubOpenAQ(total=2_000, fail_every=2, fail_status=status, retry_after=None) as stub:
+        df = fetch_measurements("Karachi", "pm25", limit=2_000, page_size=1_000, max_workers=1,
+                                base_url=stub.url)
+    assert len(df) == 2_000
+    # no Retry-After: jittered exponential backoff from 0.5s
+    assert sleeps and all(0 <= d <= 0.5 for d in sleeps)
+
+
+def test_page_that_keeps_failing_is_raised(sleeps):
+    with StubOpenAQ(total=3_000, fail_status=503, fail_pages={2}) as stub:
+        with pytest.raises(requests.HTTPError) as err:
+            fetch_measurements("Karachi", "pm25", limit=3_000, page_size=1_000, base_url=stub.url)
+        # the default 5 retries, then the 503 surfaces instead of a partial frame
+        assert stub.page_requests[2] == 6
+    assert err.value.response.status_code == 503
+    assert len(sleeps) == 5
+
+
+def test_non_retryable_status_is_not_retried(sleeps):
+    with StubOpenAQ(total=1_000, fail_status=404, fail_pages={1}) as stub:
+        with pytest.raises(requests.HTTPError):
+            fetch_measurements("Karachi", "pm25", limit=1_000, base_url=stub.url)
+        assert stub.page_requests[1] == 1
+    assert sleeps == []
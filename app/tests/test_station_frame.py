@@ -0,0 +1,22 @@
+# test_station_frame.py
+# Values keep the precision they were reported with through the compact
+# layout and back out of station_rows.
+import pandas as pd
+
+from station_frame import compact, station_rows
+
+
+def test_values_round_trip_exactly():
+    df = pd.DataFrame({
+        "location": ["A", "B", "A"],
+        "date_utc": pd.to_datetime(["2025-07-02 09:00", "2025-07-02 09:00", "2025-07-02 10:00"], utc=True),
+        "parameter": "pm25",
+        "unit": "µg/m³",
+        "value": [33.8, 0.1, 123456.789],
+        "lat": [24.9, 24.8, 24.9],
+        "lon": [67.1, 67.0, 67.1],
+    })
+    readings, stations = compact(df)
+    rows = station_rows(readings, stations)
+    assert rows["value"].tolist() == [33.8, 0.1, 123456.789]
+    assert rows["location"].tolist() == ["A", "B", "A"]
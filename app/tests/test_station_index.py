@@ -0,0 +1,60 @@
+# test_station_index.py
+# Late-reporting stations (re-read through the store's lookback window)
+# end up in the index as if they had arrived on time.
+import numpy as np
+import pandas as pd
+import pytest
+
+from station_frame import compact
+from station_index import StationIndex
+
+
+def frame(*rows) -> pd.DataFrame:
+    """Fetch-shaped frame from (location, UTC time, value) tuples."""
+    return pd.DataFrame({
+        "location": [r[0] for r in rows],
+        "date_utc": pd.to_datetime([r[1] for r in rows], utc=True),
+        "parameter": "pm25",
+        "unit": "µg/m³",
+        "value": [r[2] for r in rows],
+        "lat": 24.9,
+        "lon": 67.1,
+    })
+
+
+def test_late_row_is_inserted_in_time_order():
+    index = StationIndex.from_frame(frame(("A", "2025-07-02 10:00", 30.0)))
+    assert index.append(*compact(frame(("B", "2025-07-02 09:00", 50.0)))) == 1
+    assert index.readings["ts"].is_monotonic_increasing
+    assert index.stats(24) == {"avg": 40.0, "max": 50.0, "count": 2}
+    assert index.latest_per_station()["station"].astype(str).tolist() == ["B", "A"]
+    assert index.latest()["station"] == "A"
+
+
+def test_overlapping_reads_add_only_unseen_rows():
+    rows = [("A", "2025-07-02 08:00", 10.0), ("B", "2025-07-02 09:00", 20.0), ("A", "2025-07-02 10:00", 30.0)]
+    index = StationIndex.from_frame(frame(rows[0], rows[2]))
+    # a lookback re-read returns the indexed rows again plus B's late one
+    assert index.append(*compact(frame(*rows))) == 1
+    assert index.append(*compact(frame(*rows))) == 0
+    assert len(index) == 3
+
+
+@pytest.mark.parametrize("late_value", [5.0, 99.0, np.nan])
+def test_aggregates_after_late_rows_match_a_fresh_index(late_value):
+    hours = pd.date_range("2025-07-01", periods=48, freq="h")
+    on_time = [(f"S{i % 3}", t, float(i)) for i, t in enumerate(hours) if i % 7]
+    late = [(f"S{i % 3}", t, late_value) for i, t in enumerate(hours) if not i % 7]
+    index = StationIndex.from_frame(frame(*on_time))
+    index.append(*compact(frame(*late)))
+    fresh = StationIndex.from_frame(frame(*sorted(on_time + late, key=lambda r: r[1])))
+    assert index.stats(24) == fresh.stats(24)
+    assert index.stats(6) == fresh.stats(6)
+    pd.testing.assert_frame_equal(index.readings, fresh.readings)
+
+
+def test_rows_older_than_a_full_history_are_ignored():
+    index = StationIndex.from_frame(frame(("A", "2025-07-02 10:00", 1.0), ("A", "2025-07-02 11:00", 2.0)), max_rows=2)
+    assert index.append(*compact(frame(("B", "2025-07-02 09:00", 3.0)))) == 0
+    assert index.append(*compact(frame(("B", "2025-07-02 10:30", 3.0)))) == 1
+    assert index.readings["value"].tolist() == [3.0, 2.0]
@@ -0,0 +1,41 @@
+# test_station_join.py
+# Granules whose file name carries no scan time (possible with a custom
+# TEMPO_GLOB) are skipped instead of breaking the merge.
+import logging
+
+import pandas as pd
+
+from benchmarks.synthetic import write_granule
+from station_join import build_table, join
+
+BBOX = ((40, 50), (-80, -70))
+
+
+def measurements() -> pd.DataFrame:
+    return pd.DataFrame({
+        "location": ["Toronto", "Ottawa"],
+        "date_utc": pd.to_datetime(["2025-09-20T12:10Z", "2025-09-20T12:20Z"]),
+        "value": [10.0, 20.0],
+        "lat": [43.7, 45.4],
+        "lon": [-79.4, -75.7],
+    })
+
+
+def test_granules_without_a_scan_time_are_skipped(tmp_path, caplog):
+    timed = str(tmp_path / "TEMPO_NO2_L3_V04_20250920T120000Z_S001.nc")
+    untimed = str(tmp_path / "no2_mosaic.nc")
+    write_granule(timed, step=0.5, bbox=BBOX)
+    write_granule(untimed, step=0.5, bbox=BBOX, seed=1)
+    with caplog.at_level(logging.WARNING, logger="station_join"):
+        table = build_table(measurements(), paths=[untimed, timed])
+    assert "no2_mosaic.nc" in caplog.text
+    assert table["no2"].notna().all()
+    assert (table["tempo_time"] == pd.Timestamp("2025-09-20T12:00Z")).all()
+
+
+def test_join_drops_tempo_samples_without_a_time():
+    tempo = pd.DataFrame({"location": ["Toronto", "Ottawa"], "tempo_time": [pd.NaT, "2025-09-20T12:00Z"],
+                          "no2": [1.0, 2.0]})
+    no2 = join(measurements(), tempo).set_index("location")["no2"]
+    assert no2["Ottawa"] == 2.0
+    assert pd.isna(no2["Toronto"])
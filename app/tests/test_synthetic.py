@@ -0,0 +1,13 @@
+# test_synthetic.py
+# The synthetic granule writer has to work for small test grids too.
+import xarray as xr
+
+from benchmarks.synthetic import write_granule
+
+
+def test_small_granule_is_chunked_to_fit(tmp_path):
+    path = str(tmp_path / "small.nc")
+    write_granule(path, step=0.5, bbox=((45, 50), (-80, -70)))
+    with xr.open_dataset(path) as ds:
+        assert ds["weight"].shape == (10, 20)
+        assert ds["weight"].encoding["chunksizes"] == (10, 20)
@@ -0,0 +1,59 @@
+# test_weather_api.py
+# Query validation on the API endpoints; weather data comes from the bundled CSV.
+import pytest
+from fastapi.testclient import TestClient
+
+from tempo_fastapi import app
+
+client = TestClient(app)  # no lifespan: nothing here needs the warm-up
+
+
+def rows(**params):
+    r = client.get("/weather/data", params={"variables": "temperature", **params})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_tz_aware_bounds_are_converted_to_utc():
+    naive = rows(start="2025-09-30T06:00", end="2025-09-30T12:00")
+    assert len(naive["time"]) == 7
+    assert rows(start="2025-09-30T06:00Z", end="2025-09-30T12:00+00:00") == naive
+    assert rows(start="2025-09-30T02:00-04:00", end="2025-09-30T08:00-04:00") == naive
+
+
+def test_bad_time_range_is_a_400():
+    r = client.get("/weather/data", params={"start": "bogus"})
+    assert r.status_code == 400
+    assert "Bad time range" in r.json()["error"]
+
+
+@pytest.mark.parametrize("max_points", [0, 1, 2])
+def test_max_points_below_three_is_rejected(max_points):
+    r = client.get("/weather/data", params={"max_points": max_points})
+    assert r.status_code == 422
+
+
+def test_max_points_downsamples():
+    assert len(rows(max_points=3)["time"]) == 3
+
+
+def test_plot_accepts_tz_aware_bounds():
+    url = "/weather/plot/temperature"
+    naive = client.get(url, params={"start": "2025-09-30T06:00", "width": 4, "height": 3, "dpi": 50})
+    assert naive.status_code == 200
+    r = client.get(url, params={"start": "2025-09-30T02:00-04:00", "width": 4, "height": 3, "dpi": 50},
+                   headers={"If-None-Match": naive.headers["etag"]})
+    assert r.status_code == 304
+
+
+@pytest.mark.parametrize("max_points", [-1, 0])
+def test_grid_max_points_must_be_positive(max_points):
+    r = client.get("/tempo/grid", params={"max_points": max_points})
+    assert r.status_code == 422
+
+
+@pytest.mark.parametrize("url", ["/tempo/stats", "/tempo/grid"])
+def test_tempo_bad_time_range_is_a_400(url):
+    r = client.get(url, params={"start": "bogus"})
+    assert r.status_code == 400
+    assert "Bad time range" in r.json()["error"]
@@ -0,0 +1,13 @@
+# app_path.py
+# Puts app/ (perf, openaq_client, measurement_store) on sys.path for the
+# weather_data entry points: the API module and the runnable scripts
+# import this first. Library modules import those names directly and rely
+# on their entry point (or the benchmarks package) having done so; spawned
+# render workers inherit the parent's sys.path.
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
@@ -0,0 +1,59 @@
+# downsample.py
+# Server-side downsampling so data endpoints can cap their payload:
+# LTTB (largest triangle three buckets) for time series and block means
+# for gridded fields.
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of ``n_out`` points that preserve the visual shape of y(x).
+
+    First and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point
+    and the mean of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo = edges[i + 1]
+        nhi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def lttb(times, values, n_out: int):
+    """Downsample a (time, value) series to ``n_out`` points, ignoring NaNs."""
+    times = np.asarray(times)
+    values = np.asarray(values, dtype="float64")
+    ok = ~np.isnan(values)
+    times, values = times[ok], values[ok]
+    idx = lttb_indices(times.astype("datetime64[ns]").astype("int64"), values, n_out)
+    return times[idx], values[idx]
+
+
+def block_mean(grid: xr.DataArray, max_points: int) -> xr.DataArray:
+    """Coarsen a lat/lon grid by block means until it has at most ``max_points`` cells."""
+    size = grid.sizes["latitude"] * grid.sizes["longitude"]
+    factor = math.ceil(math.sqrt(size / max_points)) if max_points else 1
+    if factor <= 1:
+        return grid
+    return grid.coarsen(latitude=factor, longitude=factor, boundary="trim").mean()
@@ -0,0 +1,114 @@
+# render_queue.py
+# Bounded process pool for the API's CPU-bound work.
+#
+# Tile/map/chart rendering and grid/stat reductions run in worker
+# processes, so they neither block the event loop nor contend with each
+# other for the GIL. Identical requests that are already queued or running
+# share one job, and once RENDER_QUEUE distinct jobs are outstanding new
+# ones are refused with Overloaded, which the API turns into
+# 429 + Retry-After.
+#
+# RENDER_WORKERS=0 runs jobs on the default thread pool instead (no worker
+# processes; handy for debugging and as a baseline for the load test).
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import perf
+
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", os.cpu_count() or 1))
+RENDER_QUEUE = int(os.environ.get("RENDER_QUEUE", 8 * max(RENDER_WORKERS, 1)))
+
+
+class Overloaded(Exception):
+    """The queue is full; ``retry_after`` is a hint in whole seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Render queue full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _timed(fn, args):
+    start = time.perf_counter()
+    with perf.stage(f"job {fn.__name__}"):
+        result = fn(*args)
+    # a worker process ships what it recorded back with the result
+    metrics = perf.drain() if multiprocessing.parent_process() is not None else None
+    return time.perf_counter() - start, result, metrics
+
+
+class RenderQueue:
+    """De-duplicating front end to a lazily started process pool."""
+
+    def __init__(self, workers: int = RENDER_WORKERS, max_pending: int = RENDER_QUEUE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.job_seconds = 0.5  # running mean of job run time, for Retry-After
+        self._pool = None
+        self._inflight = {}
+
+    @property
+    def pending(self) -> int:
+        """Distinct jobs queued or running."""
+        return len(self._inflight)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        return max(1, math.ceil(self.job_seconds * self.pending / max(self.workers, 1)))
+
+    def _executor(self):
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            # spawn: workers must not inherit the server's threads, locks or open files
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def run(self, key, fn, *args):
+        """``fn(*args)`` on a worker; concurrent calls with an equal ``key`` share one job.
+
+        ``fn`` and its arguments must be picklable (module-level functions).
+        Raises Overloaded instead of queueing more than ``max_pending`` jobs.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            perf.count("render_jobs", job=fn.__name__, result="joined")
+        else:
+            if self.pending >= self.max_pending:
+                perf.count("render_jobs", job=fn.__name__, result="rejected")
+                raise Overloaded(self.retry_after())
+            perf.count("render_jobs", job=fn.__name__, result="queued")
+            future = asyncio.ensure_future(self._run(fn, args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finished(key, f))
+        # a client that disconnects must not cancel the job others are waiting on
+        return await asyncio.shield(future)
+
+    async def _run(self, fn, args):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            seconds, result, metrics = await loop.run_in_executor(self._executor(), _timed, fn, args)
+        except BrokenProcessPool:
+            # a worker died (e.g. OOM); start a fresh pool for the next job
+            self._pool = None
+            raise
+        if metrics:
+            perf.merge(metrics)
+        perf.record("render_queue_wait", time.perf_counter() - start - seconds)
+        self.job_seconds += 0.2 * (seconds - self.job_seconds)
+        return result
+
+    def _finished(self, key, future):
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # retrieved, so an error nobody awaited isn't logged as lost
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,200 @@
+# station_join.py
+# One analysis-ready table from ground stations, TEMPO NO2 and weather.
+#
+# Every TEMPO granule is sampled at all station coordinates at once:
+# station lat/lon become fractional indices on the regular L3 grid and the
+# nearest-cell (or four bilinear corner) values are gathered with a single
+# vectorized point index, so only the chunks that contain stations are
+# read. Samples and hourly weather are then attached to each station
+# observation with merge_asof inside a time tolerance.
+#
+#   python station_join.py --out joined.parquet
+import argparse
+import logging
+import os
+
+import dask
+import numpy as np
+import pandas as pd
+
+import app_path  # noqa: F401  (runnable script: app/ on sys.path first)
+from tempo_aggregates import granule_time, open_granule
+from tempo_loader import TEMPO_VARIABLE, granule_paths
+from weather_client import HOURLY
+
+WEATHER_COLUMNS = list(HOURLY.values())
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------
+# Grid sampling
+# ---------------------------
+def fractional_index(coords: np.ndarray, values) -> np.ndarray:
+    """Position of ``values`` on a regular ascending axis, in cells (NaN outside)."""
+    step = coords[1] - coords[0]
+    pos = (np.asarray(values, dtype="float64") - coords[0]) / step
+    # stations on the outer cell centre still count as inside
+    pos[(pos < -0.5) | (pos > len(coords) - 0.5)] = np.nan
+    return pos
+
+
+def _gather(data, rows, cols) -> list:
+    """Values of ``data`` at each (rows[k], cols[k]) index pair, for several pairs at once."""
+    if hasattr(data, "vindex"):
+        return [np.asarray(v, dtype="float64") for v in dask.compute(*[data.vindex[r, c] for r, c in zip(rows, cols)])]
+    data = np.asarray(data)
+    return [data[r, c].astype("float64") for r, c in zip(rows, cols)]
+
+
+def sample_grid(da, lat, lon, method: str = "nearest") -> np.ndarray:
+    """``da`` (2-D latitude x longitude, ascending) at every (lat, lon) point.
+
+    ``method`` is "nearest" (containing cell) or "bilinear" (weighted mean
+    of the four surrounding cell centres, ignoring NaN corners). Points
+    off the grid get NaN.
+    """
+    if method not in ("nearest", "bilinear"):
+        raise ValueError(f"Unknown sampling method: {method}")
+    fi = fractional_index(da["latitude"].values, lat)
+    fj = fractional_index(da["longitude"].values, lon)
+    out = np.full(len(fi), np.nan)
+    inside = ~(np.isnan(fi) | np.isnan(fj))
+    if not inside.any():
+        return out
+    fi, fj = fi[inside], fj[inside]
+    n_lat, n_lon = da.shape
+    if method == "nearest":
+        i = np.clip(np.rint(fi).astype(np.int64), 0, n_lat - 1)
+        j = np.clip(np.rint(fj).astype(np.int64), 0, n_lon - 1)
+        out[inside] = _gather(da.data, [i], [j])[0]
+        return out
+    i0 = np.clip(np.floor(fi).astype(np.int64), 0, max(n_lat - 2, 0))
+    j0 = np.clip(np.floor(fj).astype(np.int64), 0, max(n_lon - 2, 0))
+    i1, j1 = np.minimum(i0 + 1, n_lat - 1), np.minimum(j0 + 1, n_lon - 1)
+    wi, wj = np.clip(fi - i0, 0, 1), np.clip(fj - j0, 0, 1)
+    corners = _gather(da.data, [i0, i0, i1, i1], [j0, j1, j0, j1])
+    weights = [(1 - wi) * (1 - wj), (1 - wi) * wj, wi * (1 - wj), wi * wj]
+    num = sum(np.where(np.isnan(v), 0.0, v * w) for v, w in zip(corners, weights))
+    den = sum(np.where(np.isnan(v), 0.0, w) for v, w in zip(corners, weights))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[inside] = np.where(den > 0, num / den, np.nan)
+    return out
+
+
+def station_coords(measurements: pd.DataFrame) -> pd.DataFrame:
+    """One row per station (location, lat, lon), using its latest reported coordinates."""
+    coords = measurements.dropna(subset=["lat", "lon"]).drop_duplicates("location", keep="last")
+    return coords[["location", "lat", "lon"]].reset_index(drop=True)
+
+
+def sample_granules(paths, stations: pd.DataFrame, method: str = "nearest",
+                    variable: str = TEMPO_VARIABLE) -> pd.DataFrame:
+    """NO2 at every station for every granule: location, tempo_time, no2 (NaN samples dropped).
+
+    Granules without a scan time in their file name are skipped.
+    """
+    frames = []
+    lat, lon = stations["lat"].to_numpy(), stations["lon"].to_numpy()
+    for path in paths:
+        scan = granule_time(path)
+        if pd.isna(scan):
+            logger.warning("skipping %s: no scan time in the file name", os.path.basename(path))
+            continue
+        values = sample_grid(open_granule(path, variable), lat, lon, method)
+        frames.append(pd.DataFrame({"location": stations["location"].to_numpy(),
+                                    "tempo_time": scan, "no2": values}))
+    if not frames:
+        return pd.DataFrame(columns=["location", "tempo_time", "no2"])
+    return pd.concat(frames, ignore_index=True).dropna(subset=["no2"])
+
+
+# ---------------------------
+# Weather sites
+# ---------------------------
+def nearest_site(stations: pd.DataFrame, sites: pd.DataFrame) -> pd.DataFrame:
+    """Closest weather site (location, latitude, longitude rows) for every station, with distance in km."""
+    lat1, lon1 = np.radians(stations["lat"].to_numpy())[:, None], np.radians(stations["lon"].to_numpy())[:, None]
+    lat2, lon2 = np.radians(sites["latitude"].to_numpy())[None, :], np.radians(sites["longitude"].to_numpy())[None, :]
+    # equirectangular distance is plenty to pick the nearest site
+    x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+    dist = 6371.0 * np.hypot(x, lat2 - lat1)
+    best = dist.argmin(axis=1)
+    return pd.DataFrame({
+        "location": stations["location"].to_numpy(),
+        "weather_site": sites["location"].to_numpy()[best],
+        "weather_km": dist[np.arange(len(best)), best],
+    })
+
+
+# ---------------------------
+# Join
+# ---------------------------
+def _ns_utc(s: pd.Series) -> pd.Series:
+    s = pd.to_datetime(s, utc=True)
+    return s.astype("datetime64[ns, UTC]")
+
+
+def join(measurements: pd.DataFrame, tempo: pd.DataFrame | None = None, weather: pd.DataFrame | None = None,
+         time_col: str = "date_utc", tempo_tolerance: str = "90min", weather_tolerance: str = "1h") -> pd.DataFrame:
+    """Station observations with the nearest-in-time TEMPO sample and weather row attached.
+
+    ``tempo`` comes from sample_granules and ``weather`` is in the
+    weather_client schema; each is matched per station within its
+    tolerance (direction "nearest") and left NaN when nothing is close
+    enough. TEMPO samples without a time are dropped.
+    """
+    obs = measurements.dropna(subset=[time_col]).copy()
+    obs[time_col] = _ns_utc(obs[time_col])
+    obs = obs.sort_values(time_col, kind="stable", ignore_index=True)
+    if tempo is not None and not tempo.empty:
+        t = tempo.assign(tempo_time=_ns_utc(tempo["tempo_time"])).dropna(subset=["tempo_time"])
+        if len(t) < len(tempo):
+            logger.warning("dropped %d TEMPO samples without a time", len(tempo) - len(t))
+        t = t.sort_values("tempo_time", kind="stable")
+        obs = pd.merge_asof(obs, t, left_on=time_col, right_on="tempo_time", by="location",
+                            tolerance=pd.Timedelta(tempo_tolerance), direction="nearest")
+    else:
+        obs["tempo_time"], obs["no2"] = pd.NaT, np.nan
+    if weather is not None and not weather.empty:
+        sites = weather.drop_duplicates("location")[["location", "latitude", "longitude"]]
+        obs = obs.merge(nearest_site(station_coords(obs), sites), on="location", how="left")
+        w = weather[["location", "time", *WEATHER_COLUMNS]].rename(columns={"location": "weather_site"})
+        w = w.assign(time=_ns_utc(w["time"])).sort_values("time", kind="stable")
+        obs = pd.merge_asof(obs.sort_values(time_col, kind="stable"), w, left_on=time_col, right_on="time",
+                            by="weather_site", tolerance=pd.Timedelta(weather_tolerance), direction="nearest")
+        obs = obs.drop(columns="time")
+    else:
+        obs["weather_site"], obs["weather_km"] = None, np.nan
+        for col in WEATHER_COLUMNS:
+            obs[col] = np.nan
+    return obs.sort_values(["location", time_col], kind="stable", ignore_index=True)
+
+
+def build_table(measurements: pd.DataFrame, paths=None, weather: pd.DataFrame | None = None,
+                method: str = "nearest", **join_kwargs) -> pd.DataFrame:
+    """Sample ``paths`` at the stations in ``measurements`` and join everything into one table."""
+    paths = granule_paths() if paths is None else paths
+    tempo = sample_granules(paths, station_coords(measurements), method) if paths else None
+    return join(measurements, tempo, weather, **join_kwargs)
+
+
+if __name__ == "__main__":
+    from measurement_store import MeasurementStore
+    from weather_store import WeatherStore
+
+    ap = argparse.ArgumentParser(description="Join OpenAQ stations with TEMPO NO2 and weather.")
+    ap.add_argument("--city")
+    ap.add_argument("--parameter")
+    ap.add_argument("--method", choices=("nearest", "bilinear"), default="nearest")
+    ap.add_argument("--out", default="joined.parquet", help=".parquet or .csv")
+    args = ap.parse_args()
+
+    table = build_table(MeasurementStore().read(city=args.city, parameter=args.parameter),
+                        weather=WeatherStore().read(), method=args.method)
+    if args.out.endswith(".csv"):
+        table.to_csv(args.out, index=False)
+    else:
+        table.to_parquet(args.out, index=False)
+    print(f"{len(table):,} rows, {table['no2'].notna().mean():.0%} with TEMPO NO2, "
+          f"{table[WEATHER_COLUMNS[0]].notna().mean():.0%} with weather -> {args.out}")
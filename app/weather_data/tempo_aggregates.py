@@ -0,0 +1,253 @@
+# tempo_aggregates.py
+# Cached per-granule partial aggregates for TEMPO NO2 statistics.
+#
+# Every granule is reduced once into a coarse block grid of partials
+# (count, sum, min, max, sum of squares per BLOCK x BLOCK pixels) and the
+# result is stored on disk keyed by the file's content hash. Statistics
+# for any bounding box / granule subset are then merged from those
+# partials; only the thin strips of pixels along the bbox edges that don't
+# cover a whole block are read from the granule itself. Adding a new
+# hourly granule costs one reduction of that granule, nothing more.
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+from tempo_loader import CHUNKS, TEMPO_VARIABLE
+import perf
+
+TEMPO_CACHE_DIR = os.environ.get(
+    "TEMPO_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tempo_cache")
+)
+BLOCK = 50  # pixels per block side (1 degree on the 0.02 degree L3 grid)
+FIELDS = ("count", "sum", "min", "max", "sumsq")
+
+_GRANULE_TIME = re.compile(r"_(\d{8}T\d{6})Z_")
+_memory = {}
+_lock = threading.Lock()
+
+
+# ---------------------------
+# Granule identity
+# ---------------------------
+def granule_time(path: str):
+    """Scan start time encoded in a TEMPO file name, or NaT."""
+    m = _GRANULE_TIME.search(os.path.basename(path))
+    return pd.Timestamp(m.group(1), tz="UTC") if m else pd.NaT
+
+
+def file_hash(path: str, cache_dir: str = TEMPO_CACHE_DIR) -> str:
+    """SHA-256 of the file, remembered per (size, mtime) so unchanged files aren't re-read."""
+    st = os.stat(path)
+    index_path = os.path.join(cache_dir, "index.json")
+    key = os.path.abspath(path)
+    with _lock:
+        index = {}
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+        entry = index.get(key)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+    perf.add_bytes("granule_hash", st.st_size)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    with _lock:
+        os.makedirs(cache_dir, exist_ok=True)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                index = json.load(f)
+        index[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        # atomic, since other worker processes read the index concurrently
+        tmp = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, index_path)
+    return digest
+
+
+def granule_set_key(paths) -> str:
+    """Short stable id for a set of granules, based on their content hashes."""
+    h = hashlib.sha256()
+    for p in sorted(paths):
+        h.update(file_hash(p).encode())
+    return h.hexdigest()[:16]
+
+
+def open_granule(path: str, variable: str = TEMPO_VARIABLE) -> xr.DataArray:
+    """One granule as a lazy 2-D array with ascending latitude."""
+    import xarray as xr
+
+    da = xr.open_dataset(path, chunks=CHUNKS)[variable].squeeze(drop=True)
+    if da["latitude"][0] > da["latitude"][-1]:
+        da = da.isel(latitude=slice(None, None, -1))
+    return da
+
+
+# ---------------------------
+# Partials
+# ---------------------------
+def _pixel_partials(values: np.ndarray) -> dict:
+    valid = values[~np.isnan(values)].astype("float64")
+    if valid.size == 0:
+        return {"count": 0, "sum": 0.0, "min": np.nan, "max": np.nan, "sumsq": 0.0}
+    return {"count": valid.size, "sum": valid.sum(), "min": valid.min(),
+            "max": valid.max(), "sumsq": np.square(valid).sum()}
+
+
+@perf.timed("granule_reduce")
+def compute_partials(path: str, block: int = BLOCK) -> dict:
+    """Block-grid partial aggregates for one granule (one pass over its chunks)."""
+    import dask
+
+    da = open_granule(path)
+    coarse = da.astype("float64").coarsen(latitude=block, longitude=block, boundary="pad")
+    count, total, vmin, vmax, sumsq = dask.compute(
+        coarse.count(), coarse.sum(), coarse.min(), coarse.max(),
+        (da.astype("float64") ** 2).coarsen(latitude=block, longitude=block, boundary="pad").sum(),
+    )
+    return {
+        "count": count.values.astype("int64"),
+        "sum": total.values,
+        "min": vmin.values,
+        "max": vmax.values,
+        "sumsq": sumsq.values,
+        "latitude": da["latitude"].values,
+        "longitude": da["longitude"].values,
+        "block": np.int64(block),
+    }
+
+
+def load_partials(path: str, cache_dir: str = TEMPO_CACHE_DIR, block: int = BLOCK) -> dict:
+    """Partials for ``path`` from memory, the on-disk cache, or a fresh reduction."""
+    digest = file_hash(path, cache_dir)
+    key = (digest, block)
+    if key in _memory:
+        perf.count("granule_partials", source="memory")
+        return _memory[key]
+    cache_file = os.path.join(cache_dir, f"{digest}_b{block}.npz")
+    if os.path.exists(cache_file):
+        perf.count("granule_partials", source="disk")
+        with np.load(cache_file) as npz:
+            partials = dict(npz)
+    else:
+        perf.count("granule_partials", source="computed")
+        partials = compute_partials(path, block)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, **partials)
+        os.replace(tmp, cache_file)
+    _memory[key] = partials
+    return partials
+
+
+def merge(parts) -> dict:
+    """Combine partial aggregates (dicts of FIELDS) into one."""
+    out = {"count": 0, "sum": 0.0, "min": np.nan, "max": np.nan, "sumsq": 0.0}
+    for p in parts:
+        if not p["count"]:
+            continue
+        out["count"] += int(p["count"])
+        out["sum"] += float(p["sum"])
+        out["sumsq"] += float(p["sumsq"])
+        out["min"] = float(np.fmin(out["min"], p["min"]))
+        out["max"] = float(np.fmax(out["max"], p["max"]))
+    return out
+
+
+# ---------------------------
+# Region queries
+# ---------------------------
+def _bbox_partials(path: str, partials: dict, bbox) -> list:
+    """Partials covering ``bbox`` in one granule: whole blocks + edge strips."""
+    (lat_min, lat_max), (lon_min, lon_max) = bbox
+    lat, lon, block = partials["latitude"], partials["longitude"], int(partials["block"])
+    i0, i1 = np.searchsorted(lat, lat_min, "left"), np.searchsorted(lat, lat_max, "right")
+    j0, j1 = np.searchsorted(lon, lon_min, "left"), np.searchsorted(lon, lon_max, "right")
+    if i0 >= i1 or j0 >= j1:
+        return []
+    # whole blocks inside the pixel box
+    bi0, bi1 = -(-i0 // block), i1 // block
+    bj0, bj1 = -(-j0 // block), j1 // block
+    if bi0 >= bi1 or bj0 >= bj1:
+        bi0 = bi1 = i0 // block
+        bj0 = bj1 = j0 // block
+    parts, strips = [], []
+    if bi0 < bi1:
+        core = {f: partials[f][bi0:bi1, bj0:bj1] for f in FIELDS}
+        has = core["count"] > 0
+        parts.append({
+            "count": core["count"].sum(),
+            "sum": core["sum"].sum(),
+            "sumsq": core["sumsq"].sum(),
+            "min": core["min"][has].min() if has.any() else np.nan,
+            "max": core["max"][has].max() if has.any() else np.nan,
+        })
+        r0, r1, c0, c1 = bi0 * block, bi1 * block, bj0 * block, bj1 * block
+        strips = [(i0, r0, j0, j1), (r1, i1, j0, j1), (r0, r1, j0, c0), (r0, r1, c1, j1)]
+    else:
+        strips = [(i0, i1, j0, j1)]
+    strips = [s for s in strips if s[0] < s[1] and s[2] < s[3]]
+    if strips:
+        import dask
+
+        da = open_granule(path)
+        values = dask.compute(*[da.isel(latitude=slice(a, b), longitude=slice(c, d)).data
+                                for a, b, c, d in strips])
+        parts.extend(_pixel_partials(np.asarray(v)) for v in values)
+    return parts
+
+
+def _utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def select_granules(paths, granules=None, start=None, end=None) -> list:
+    """Filter granule paths by file name and/or scan time window.
+
+    Raises ValueError for an unparseable ``start`` or ``end``.
+    """
+    start = _utc(start) if start is not None else None
+    end = _utc(end) if end is not None else None
+    selected = []
+    for p in paths:
+        name = os.path.basename(p)
+        if granules and name not in granules and os.path.splitext(name)[0] not in granules:
+            continue
+        t = granule_time(p)
+        if start is not None and (pd.isna(t) or t < start):
+            continue
+        if end is not None and (pd.isna(t) or t > end):
+            continue
+        selected.append(p)
+    return selected
+
+
+def region_stats(paths, bbox) -> dict:
+    """Pooled NO2 statistics over all valid pixels of ``paths`` inside ``bbox``."""
+    merged = merge(part for p in paths for part in _bbox_partials(p, load_partials(p), bbox))
+    n = merged["count"]
+    mean = merged["sum"] / n if n else float("nan")
+    var = max(merged["sumsq"] / n - mean * mean, 0.0) if n else float("nan")
+    return {
+        "mean": mean,
+        "max": merged["max"],
+        "min": merged["min"],
+        "std": float(np.sqrt(var)),
+        "count": n,
+        "granules": len(paths),
+    }
@@ -1,151 +1,319 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse, FileResponse
-import xarray as xr
-import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
-import cartopy.feature as cfeature
-import pandas as pd
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+import pandas as pd
+
+import app_path  # noqa: F401  (first: puts app/ on sys.path for the modules below)
+from downsample import lttb
+from render_queue import Overloaded, RenderQueue
+from tempo_loader import CANADA_BBOX, granule_paths
+from tempo_aggregates import region_stats, select_granules
+from tempo_pyramid import grid_table, warm_up
+from tempo_tiles import get_map, get_tile, map_path, read_cached, tile_path
+from weather_plots import VARIABLES, data_version, get_plot, load_weather, naive_utc, plot_etag, time_slice
+import perf
+
+# CPU-bound rendering and reductions go through this bounded process pool
+# (see render_queue.py); file reads and serialization use worker threads,
+# so the event loop itself only routes requests.
+render_queue = RenderQueue()
+
+# TEMPO_WARMUP=0 skips the startup warm-up (granule hashes, partial
+# aggregates, NO2 pyramid); the first requests then pay for it instead.
+TEMPO_WARMUP = os.environ.get("TEMPO_WARMUP", "1") == "1"
+readiness = {"ready": not TEMPO_WARMUP}
+
+
+async def warm_up_tempo():
+    """Runs in the background after startup; /ready reports 503 until it is done."""
+    start = time.perf_counter()
+    try:
+        paths = tuple(await asyncio.to_thread(granule_paths))
+        if paths:
+            summary = await render_queue.run(("warm_up", paths), warm_up, paths)
+            readiness.update(granules=summary["granules"], pixel_count=int(summary["pixel_count"]))
+    except Exception as e:
+        # still ready: the weather endpoints work, and TEMPO requests retry the work and report the error
+        readiness["error"] = f"{type(e).__name__}: {e}"
+    readiness.update(ready=True, warm_up_seconds=round(time.perf_counter() - start, 3))
+    perf.record("warm_up", time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(warm_up_tempo()) if TEMPO_WARMUP else None
+    yield
+    if task is not None:
+        task.cancel()
+    render_queue.shutdown()
+
 
-app = FastAPI(title="TEMPO NO2 + Weather API")
+app = FastAPI(title="TEMPO NO2 + Weather API", lifespan=lifespan)
+TILE_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+
+async def request_metrics(request: Request, call_next):
+    """Per-route request time and status counts for /metrics."""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    perf.record(f"request {path}", time.perf_counter() - start)
+    perf.count("requests", route=path, status=response.status_code)
+    return response
+
+
+if perf.ENABLED:
+    app.middleware("http")(request_metrics)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(status_code=429, content={"error": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
 
 # ============================================================
 # 1️⃣ TEMPO NO₂ DATA (Canada)
 # ============================================================
-file_paths = [
-    r"C:\Users\aqsar\OneDrive\Desktop\heckathone_data\TEMPO_data\TEMPO_NO2_L3_V04_20250925T215959Z_S013.nc",
-    r"C:\Users\aqsar\OneDrive\Desktop\heckathone_data\TEMPO_data\TEMPO_NO2_L3_V04_20250925T225959Z_S014.nc",
-    r"C:\Users\aqsar\OneDrive\Desktop\heckathone_data\TEMPO_data\TEMPO_NO2_L3_V04_20250925T234007Z_S015.nc"
-]
-
-datasets = [xr.open_dataset(fp) for fp in file_paths]
-no2_list = [ds["weight"] for ds in datasets]
-no2_all = xr.concat(no2_list, dim="granule").mean(dim="granule")
-no2_canada = no2_all.sel(latitude=slice(41, 83), longitude=slice(-141, -52))
-no2_valid = no2_canada.where(~no2_canada.isnull(), drop=True)
+# Granules are found via TEMPO_DIR / TEMPO_GLOB. Nothing is opened at
+# import: the lifespan hook warms the caches in a render worker after the
+# server is up (see warm_up_tempo and /ready), and xarray / matplotlib /
+# cartopy are only imported by the code that reads or draws the pixels.
 
 # ============================================================
 # 2️⃣ WEATHER CSV DATA
 # ============================================================
-csv_file = r"C:\Users\admin\Desktop\weather_data\weather_data.csv"
-if os.path.exists(csv_file):
-    df = pd.read_csv(csv_file)
-    df["time"] = pd.to_datetime(df["time"])
-else:
-    df = None
+# Read from WEATHER_CSV (see weather_plots.py) and re-read only when the
+# file changes.
 
 # ============================================================
 # 3️⃣ API ENDPOINTS
 # ============================================================
+TABLE_MEDIA_TYPES = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def table_response(df: pd.DataFrame, fmt: str):
+    """Serialize a flat table as columnar JSON, Arrow IPC stream or Parquet."""
+    if fmt not in TABLE_MEDIA_TYPES:
+        return JSONResponse(status_code=400, content={"error": f"Unknown format: {fmt}"})
+    if fmt == "json":
+        body = "{" + ",".join(
+            f'"{col}":' + df[col].to_json(orient="values", date_format="iso") for col in df.columns
+        ) + "}"
+        return Response(content=body, media_type=TABLE_MEDIA_TYPES[fmt])
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return JSONResponse(status_code=400, content={"error": f"format={fmt} requires pyarrow"})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if fmt == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+    return Response(content=sink.getvalue().to_pybytes(), media_type=TABLE_MEDIA_TYPES[fmt])
+
+
+async def cached_or_render(path: str, key, fn, *args) -> bytes:
+    """Rendered bytes from the disk cache at ``path``, else from a render job."""
+    data = await asyncio.to_thread(read_cached, path)
+    perf.count("render_cache", kind=key[0], result="miss" if data is None else "hit")
+    if data is None:
+        data = await render_queue.run(key, fn, *args)
+    return data
+
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "TEMPO NO2 + Weather API is running!"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the TEMPO warm-up has finished"""
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming up"}, headers={"Retry-After": "1"})
+    return {"status": "ready", **{k: v for k, v in readiness.items() if k != "ready"}}
+
+@app.get("/metrics")
+async def metrics():
+    """Stage timers and counters (worker processes included) in Prometheus text format"""
+    body = perf.prometheus_text() + (
+        "# TYPE cleanair_render_queue_pending gauge\n"
+        f"cleanair_render_queue_pending {render_queue.pending}\n"
+    )
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 # ---------- TEMPO ENDPOINTS ----------
 @app.get("/tempo/stats")
-def get_tempo_stats():
-    """Return basic statistics for Canada NO2"""
+async def get_tempo_stats(
+    lat_min: float = CANADA_BBOX[0][0],
+    lat_max: float = CANADA_BBOX[0][1],
+    lon_min: float = CANADA_BBOX[1][0],
+    lon_max: float = CANADA_BBOX[1][1],
+    granules: list[str] | None = Query(None, description="granule file names to include"),
+    start: str | None = None,
+    end: str | None = None,
+):
+    """Return NO2 statistics for a bounding box (Canada by default) and granule subset.
+
+    Served from cached per-granule partial aggregates (see tempo_aggregates.py),
+    pooled over every valid pixel of the selected granules.
+    """
+    try:
+        paths = select_granules(granule_paths(), granules, start, end)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Bad time range: {e}"})
+    if not paths:
+        return {"error": "No TEMPO granules match the request"}
+    bbox = ((lat_min, lat_max), (lon_min, lon_max))
+    s = await render_queue.run(("stats", tuple(paths), bbox), region_stats, paths, bbox)
+    clean = lambda v: None if pd.isna(v) else float(v)
     stats = {
-        "mean_NO2": float(no2_valid.mean().values),
-        "max_NO2": float(no2_valid.max().values),
-        "min_NO2": float(no2_valid.min().values)
+        "mean_NO2": clean(s["mean"]),
+        "max_NO2": clean(s["max"]),
+        "min_NO2": clean(s["min"]),
+        "std_NO2": clean(s["std"]),
+        "pixel_count": s["count"],
+        "granule_count": s["granules"]
     }
     return JSONResponse(content=stats)
 
 @app.get("/tempo/map")
-def get_tempo_map():
-    """Generate and return NO2 map as PNG"""
-    output_file = "tempo_no2_canada.png"
-    
-    plt.figure(figsize=(12, 8))
-    ax = plt.axes(projection=ccrs.PlateCarree())
-    no2_valid.plot(ax=ax, cmap="viridis", cbar_kwargs={"label": "NO₂ (molecules/cm²)"})
-    ax.coastlines()
-    ax.add_feature(cfeature.BORDERS, linestyle=":")
-    ax.set_title("TEMPO NO₂ over Canada (Average of 3 granules)")
-    
-    plt.savefig(output_file, dpi=150, bbox_inches="tight")
-    plt.close()
-    
-    return FileResponse(output_file, media_type="image/png", filename=output_file)
+async def get_tempo_map(cmap: str = "viridis"):
+    """Return the NO2 map as PNG (rendered once per granule set and colormap)"""
+    paths = tuple(granule_paths())
+    if not paths:
+        return {"error": "No TEMPO granules found"}
+    try:
+        path = await asyncio.to_thread(map_path, paths, cmap)
+        png = await cached_or_render(path, ("map", paths, cmap), get_map, paths, cmap)
+    except KeyError:
+        return JSONResponse(status_code=400, content={"error": f"Unknown colormap: {cmap}"})
+    return Response(content=png, media_type="image/png", headers=TILE_HEADERS)
+
+@app.get("/tempo/tiles/{z}/{x}/{y}.png")
+async def get_tempo_tile(z: int, x: int, y: int, cmap: str = "viridis"):
+    """XYZ web-mercator NO2 tile, usable as a Folium/Leaflet overlay"""
+    paths = tuple(granule_paths())
+    if not paths:
+        return JSONResponse(status_code=404, content={"error": "No TEMPO granules found"})
+    try:
+        path = await asyncio.to_thread(tile_path, paths, z, x, y, cmap)
+        png = await cached_or_render(path, ("tile", paths, z, x, y, cmap), get_tile, paths, z, x, y, cmap)
+    except ValueError as e:
+        return JSONResponse(status_code=404, content={"error": str(e)})
+    except KeyError:
+        return JSONResponse(status_code=400, content={"error": f"Unknown colormap: {cmap}"})
+    return Response(content=png, media_type="image/png", headers=TILE_HEADERS)
+
+@app.get("/tempo/grid")
+async def get_tempo_grid(
+    lat_min: float = CANADA_BBOX[0][0],
+    lat_max: float = CANADA_BBOX[0][1],
+    lon_min: float = CANADA_BBOX[1][0],
+    lon_max: float = CANADA_BBOX[1][1],
+    granules: list[str] | None = Query(None, description="granule file names to include"),
+    start: str | None = None,
+    end: str | None = None,
+    max_points: int = Query(10000, ge=1),
+    fmt: str = Query("json", alias="format"),
+):
+    """Granule-mean NO2 cells inside a bounding box as a latitude/longitude/no2 table.
+
+    The grid is block-averaged until it has at most ``max_points`` cells,
+    starting from the coarsest cached pyramid level that is fine enough
+    (see tempo_pyramid.py); empty cells are dropped.
+    """
+    try:
+        paths = select_granules(granule_paths(), granules, start, end)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Bad time range: {e}"})
+    if not paths:
+        return {"error": "No TEMPO granules match the request"}
+    if fmt not in TABLE_MEDIA_TYPES:
+        return JSONResponse(status_code=400, content={"error": f"Unknown format: {fmt}"})
+    args = (tuple(paths), ((lat_min, lat_max), (lon_min, lon_max)), max_points)
+    df = await render_queue.run(("grid",) + args, grid_table, *args)
+    return await asyncio.to_thread(table_response, df, fmt)
 
 # ---------- WEATHER ENDPOINTS ----------
-@app.get("/weather/temperature")
-def get_temperature_graph():
+@app.get("/weather/data")
+async def get_weather_data(
+    variables: list[str] | None = Query(None, description="defaults to all variables"),
+    start: str | None = None,
+    end: str | None = None,
+    max_points: int | None = Query(None, ge=3, description="LTTB needs at least 3 points"),
+    fmt: str = Query("json", alias="format"),
+):
+    """Weather series as a variable/time/value table, optionally LTTB-downsampled to max_points per variable"""
+    df = await asyncio.to_thread(load_weather)
     if df is None:
         return {"error": "weather_data.csv not found!"}
-    output_file = "temperature_over_time.png"
-    
-    plt.figure(figsize=(10, 5))
-    plt.plot(df["time"], df["temperature_C"], label="Temperature (°C)", color="red")
-    plt.xticks(rotation=45)
-    plt.xlabel("Time")
-    plt.ylabel("Temperature (°C)")
-    plt.title("Temperature Over Time")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=150, bbox_inches="tight")
-    plt.close()
-    
-    return FileResponse(output_file, media_type="image/png", filename=output_file)
+    variables = variables or list(VARIABLES)
+    unknown = [v for v in variables if v not in VARIABLES]
+    if unknown:
+        return JSONResponse(status_code=404, content={"error": f"Unknown variable(s): {unknown}"})
+    try:
+        window = time_slice(df, start, end)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Bad time range: {e}"})
+    return await asyncio.to_thread(weather_table, window, variables, max_points, fmt)
 
-@app.get("/weather/humidity")
-def get_humidity_graph():
-    if df is None:
-        return {"error": "weather_data.csv not found!"}
-    output_file = "humidity_over_time.png"
-    
-    plt.figure(figsize=(10, 5))
-    plt.plot(df["time"], df["humidity_%"], label="Humidity (%)", color="blue")
-    plt.xticks(rotation=45)
-    plt.xlabel("Time")
-    plt.ylabel("Humidity (%)")
-    plt.title("Humidity Over Time")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=150, bbox_inches="tight")
-    plt.close()
-    
-    return FileResponse(output_file, media_type="image/png", filename=output_file)
 
-@app.get("/weather/wind")
-def get_wind_graph():
-    if df is None:
-        return {"error": "weather_data.csv not found!"}
-    output_file = "wind_speed_over_time.png"
-    
-    plt.figure(figsize=(10, 5))
-    plt.plot(df["time"], df["wind_speed_m/s"], label="Wind Speed (m/s)", color="purple")
-    plt.xticks(rotation=45)
-    plt.xlabel("Time")
-    plt.ylabel("Wind Speed (m/s)")
-    plt.title("Wind Speed Over Time")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=150, bbox_inches="tight")
-    plt.close()
-    
-    return FileResponse(output_file, media_type="image/png", filename=output_file)
+def weather_table(window: pd.DataFrame, variables: list, max_points: int | None, fmt: str):
+    frames = []
+    for v in variables:
+        times, values = window["time"].values, window[VARIABLES[v]["column"]].values
+        if max_points:
+            times, values = lttb(times, values, max_points)
+        frames.append(pd.DataFrame({"variable": v, "time": times, "value": values}))
+    return table_response(pd.concat(frames, ignore_index=True), fmt)
 
-@app.get("/weather/precipitation")
-def get_precipitation_graph():
-    if df is None:
+@app.get("/weather/plot/{variable}")
+async def get_weather_plot(variable: str, request: Request, start: str | None = None, end: str | None = None,
+                     width: float = 10, height: float = 5, dpi: int = 150):
+    """Chart of one weather variable as PNG, with ETag / If-None-Match support"""
+    if variable not in VARIABLES:
+        return JSONResponse(status_code=404, content={"error": f"Unknown variable: {variable}"})
+    version = data_version()
+    if version is None:
         return {"error": "weather_data.csv not found!"}
-    output_file = "precipitation_over_time.png"
-    
-    plt.figure(figsize=(10, 5))
-    plt.bar(df["time"], df["precipitation_mm"], label="Precipitation (mm)", color="green")
-    plt.xticks(rotation=45)
-    plt.xlabel("Time")
-    plt.ylabel("Precipitation (mm)")
-    plt.title("Precipitation Over Time")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=150, bbox_inches="tight")
-    plt.close()
-    
-    return FileResponse(output_file, media_type="image/png", filename=output_file)
+    try:
+        start, end = [naive_utc(t).isoformat() if t else None for t in (start, end)]
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": f"Bad time range: {e}"})
+    width, height = min(max(width, 2), 30), min(max(height, 2), 20)
+    dpi = min(max(dpi, 50), 300)
+    etag = plot_etag(variable, start, end, width, height, dpi, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    args = (variable, start, end, width, height, dpi, version)
+    png = await render_queue.run(("plot",) + args, get_plot, *args)
+    headers["Content-Disposition"] = f'inline; filename="{VARIABLES[variable]["filename"]}"'
+    return Response(content=png, media_type="image/png", headers=headers)
 
+@app.get("/weather/temperature")
+async def get_temperature_graph(request: Request):
+    return await get_weather_plot("temperature", request)
 
+@app.get("/weather/humidity")
+async def get_humidity_graph(request: Request):
+    return await get_weather_plot("humidity", request)
 
+@app.get("/weather/wind")
+async def get_wind_graph(request: Request):
+    return await get_weather_plot("wind", request)
+
+@app.get("/weather/precipitation")
+async def get_precipitation_graph(request: Request):
+    return await get_weather_plot("precipitation", request)
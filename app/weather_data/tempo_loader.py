@@ -0,0 +1,84 @@
+# tempo_loader.py
+# Lazy loading of TEMPO NO2 L3 granules.
+#
+# Granules are discovered from a directory/glob (TEMPO_DIR / TEMPO_GLOB)
+# and opened with open_mfdataset + dask chunks. Each granule is cut down
+# to the region of interest *before* concatenation, so nothing is read
+# from disk until a reduction or plot actually needs the pixels.
+#
+# xarray itself is imported on first use, so that the API process (which
+# only routes requests to render workers) starts without it.
+from __future__ import annotations
+
+import glob
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+TEMPO_DIR = os.environ.get("TEMPO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "TEMPO_data"))
+TEMPO_GLOB = os.environ.get("TEMPO_GLOB", "TEMPO_NO2_L3_*.nc")
+TEMPO_VARIABLE = os.environ.get("TEMPO_VARIABLE", "weight")
+CHUNKS = {"latitude": 512, "longitude": 512}
+
+# Canada bounding box: (lat_min, lat_max), (lon_min, lon_max)
+CANADA_BBOX = ((41, 83), (-141, -52))
+
+
+def granule_paths(directory: str = TEMPO_DIR, pattern: str = TEMPO_GLOB) -> list:
+    """Sorted granule files matching ``pattern`` inside ``directory``."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def subset_bbox(obj, bbox=CANADA_BBOX):
+    """Select a lat/lon box, whichever way the latitude axis is ordered."""
+    (lat_min, lat_max), (lon_min, lon_max) = bbox
+    lat = obj["latitude"]
+    lat_slice = slice(lat_min, lat_max) if lat[0] <= lat[-1] else slice(lat_max, lat_min)
+    return obj.sel(latitude=lat_slice, longitude=slice(lon_min, lon_max))
+
+
+def open_granules(paths, variable: str = TEMPO_VARIABLE, bbox=CANADA_BBOX, chunks=CHUNKS) -> xr.DataArray:
+    """Lazily open ``paths`` as one DataArray stacked along ``granule``.
+
+    Only ``variable`` inside ``bbox`` is kept from each file; the result is
+    dask-backed, so memory stays bounded by the chunk size rather than the
+    number of granules.
+    """
+    import xarray as xr
+
+    if not paths:
+        raise FileNotFoundError(f"No TEMPO granules found (TEMPO_DIR={TEMPO_DIR}, TEMPO_GLOB={TEMPO_GLOB})")
+
+    def preprocess(ds):
+        return subset_bbox(ds[[variable]], bbox)
+
+    ds = xr.open_mfdataset(
+        paths,
+        combine="nested",
+        concat_dim="granule",
+        chunks=chunks,
+        preprocess=preprocess,
+        data_vars="all",
+        coords="minimal",
+        compat="override",
+        join="override",
+    )
+    return ds[variable]
+
+
+@lru_cache(maxsize=8)
+def mean_no2(paths: tuple) -> xr.DataArray:
+    """Lazy granule-mean NO2 over Canada for a fixed set of granule files."""
+    return open_granules(list(paths)).mean(dim="granule")
+
+
+def load_no2(directory: str = TEMPO_DIR, pattern: str = TEMPO_GLOB) -> xr.DataArray:
+    """Granule-mean NO2 over Canada, built on first use and reused afterwards.
+
+    The returned array is still lazy; NaN-skipping reductions make an
+    explicit ``where(..., drop=True)`` copy unnecessary.
+    """
+    return mean_no2(tuple(granule_paths(directory, pattern)))
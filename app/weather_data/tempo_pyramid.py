@@ -0,0 +1,160 @@
+# tempo_pyramid.py
+# Multi-resolution cache of the granule-mean NO2 grid.
+#
+# For a granule set, the Canada mean grid is reduced once into levels of
+# 2x, 4x, 8x, ... block means together with the number of valid pixels
+# behind every cell. Each level is built from the previous one's sums and
+# counts, so all of them cost one pass over the full-resolution grid, and
+# is written as a chunked NetCDF file under TEMPO_CACHE_DIR keyed by the
+# granule set. Consumers ask for the cell size they need and get the
+# coarsest level that is still at least that fine.
+#
+#   python tempo_pyramid.py   # build levels for every granule in TEMPO_DIR
+from __future__ import annotations
+
+import math
+import os
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    import xarray as xr
+
+import app_path  # noqa: F401  (runnable script: app/ on sys.path first)
+from tempo_aggregates import TEMPO_CACHE_DIR, granule_set_key, region_stats
+from tempo_loader import CANADA_BBOX, granule_paths, mean_no2, subset_bbox
+import perf
+
+FACTORS = (1, 2, 4, 8, 16, 32, 64)
+CHUNK = 512
+_build_lock = threading.Lock()
+
+
+def _level_path(paths, factor: int, cache_dir: str) -> str:
+    return os.path.join(cache_dir, "pyramid", granule_set_key(paths), f"x{factor}.nc")
+
+
+def _halve(total: np.ndarray, count: np.ndarray):
+    """2x2 block sums of ``total``/``count``, zero-padding odd edges."""
+    pad = ((0, total.shape[0] % 2), (0, total.shape[1] % 2))
+    total, count = np.pad(total, pad), np.pad(count, pad)
+    n, m = total.shape[0] // 2, total.shape[1] // 2
+    return (total.reshape(n, 2, m, 2).sum(axis=(1, 3)),
+            count.reshape(n, 2, m, 2).sum(axis=(1, 3)))
+
+
+def _write_level(path: str, lat, lon, total, count):
+    import xarray as xr
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, np.nan).astype("float32")
+    ds = xr.Dataset(
+        {"no2": (("latitude", "longitude"), mean), "count": (("latitude", "longitude"), count.astype("int32"))},
+        coords={"latitude": lat, "longitude": lon},
+    )
+    chunks = (min(CHUNK, len(lat)), min(CHUNK, len(lon)))
+    encoding = {v: {"chunksizes": chunks, "zlib": True, "complevel": 1} for v in ("no2", "count")}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    ds.to_netcdf(tmp, encoding=encoding)
+    os.replace(tmp, path)
+
+
+def build_pyramid(paths: tuple, cache_dir: str = TEMPO_CACHE_DIR) -> dict:
+    """Write every level for ``paths`` that isn't on disk yet; returns {factor: file}."""
+    files = {f: _level_path(paths, f, cache_dir) for f in FACTORS}
+    with _build_lock, perf.stage("pyramid_build"):
+        if all(os.path.exists(p) for p in files.values()):
+            return files
+        grid = mean_no2(paths).sortby("latitude").sortby("longitude")
+        values = np.asarray(grid.values, dtype="float64")
+        lat, lon = grid["latitude"].values, grid["longitude"].values
+        valid = ~np.isnan(values)
+        total, count = np.where(valid, values, 0.0), valid.astype(np.int64)
+        dlat, dlon = lat[1] - lat[0], lon[1] - lon[0]
+        for f in FACTORS:
+            if f > 1:
+                total, count = _halve(total, count)
+            # cell centres of f x f blocks on the regular native grid
+            clat = lat[0] + dlat * ((f - 1) / 2 + f * np.arange(total.shape[0]))
+            clon = lon[0] + dlon * ((f - 1) / 2 + f * np.arange(total.shape[1]))
+            if not os.path.exists(files[f]):
+                _write_level(files[f], clat, clon, total, count)
+    return files
+
+
+@lru_cache(maxsize=64)
+def open_level(paths: tuple, factor: int, cache_dir: str = TEMPO_CACHE_DIR) -> xr.Dataset:
+    """Level ``factor`` (no2 block means + valid-pixel counts), lazily opened; built on first use."""
+    if factor not in FACTORS:
+        raise ValueError(f"No pyramid level x{factor} (levels: {FACTORS})")
+    import xarray as xr
+
+    path = _level_path(paths, factor, cache_dir)
+    if not os.path.exists(path):
+        build_pyramid(paths, cache_dir)
+    return xr.open_dataset(path, chunks={"latitude": CHUNK, "longitude": CHUNK})
+
+
+def native_step(paths: tuple) -> float:
+    """Full-resolution cell size in degrees."""
+    lon = open_level(paths, 1)["longitude"].values
+    return float(abs(lon[1] - lon[0]))
+
+
+def pick_factor(native: float, step: float) -> int:
+    """Largest level factor whose cells are no bigger than ``step`` degrees."""
+    usable = [f for f in FACTORS if native * f <= step * (1 + 1e-9)]
+    return max(usable) if usable else 1
+
+
+def level_for(paths: tuple, step: float) -> xr.Dataset:
+    """Coarsest level that still resolves ``step`` degree cells."""
+    return open_level(paths, pick_factor(native_step(paths), step))
+
+
+def weighted_coarsen(level: xr.Dataset, factor: int) -> xr.Dataset:
+    """Further block-mean a level by ``factor``, weighting cells by their pixel counts."""
+    import xarray as xr
+
+    if factor <= 1:
+        return level
+    weighted = (level["no2"].fillna(0) * level["count"]).coarsen(
+        latitude=factor, longitude=factor, boundary="trim").sum()
+    count = level["count"].coarsen(latitude=factor, longitude=factor, boundary="trim").sum()
+    return xr.Dataset({"no2": (weighted / count.where(count > 0)).astype("float32"), "count": count})
+
+
+def coarse_grid(paths: tuple, bbox, max_points: int) -> xr.DataArray:
+    """NO2 block means inside ``bbox`` with at most ``max_points`` cells (0 = full resolution)."""
+    full = subset_bbox(open_level(paths, 1), bbox)
+    size = full.sizes["latitude"] * full.sizes["longitude"]
+    factor = math.ceil(math.sqrt(size / max_points)) if max_points and size > max_points else 1
+    # start from the level whose cells tile the requested block size most closely
+    level = min((f for f in FACTORS if f <= factor), key=lambda f: (f * math.ceil(factor / f), -f))
+    return weighted_coarsen(subset_bbox(open_level(paths, level), bbox), math.ceil(factor / level))["no2"]
+
+
+def grid_table(paths: tuple, bbox, max_points: int) -> pd.DataFrame:
+    """coarse_grid as a latitude/longitude/no2 table without empty cells."""
+    grid = coarse_grid(paths, bbox, max_points)
+    df = grid.rename("no2").to_dataframe().reset_index()[["latitude", "longitude", "no2"]]
+    return df.dropna(subset=["no2"]).reset_index(drop=True)
+
+
+def warm_up(paths: tuple) -> dict:
+    """Hash the granules, cache their partial aggregates and build the pyramid, so first requests don't."""
+    stats = region_stats(list(paths), CANADA_BBOX)
+    open_level(paths, 1)
+    return {"granules": len(paths), "pixel_count": stats["count"]}
+
+
+if __name__ == "__main__":
+    paths = tuple(granule_paths())
+    for factor, path in build_pyramid(paths).items():
+        ds = open_level(paths, factor)
+        print(f"x{factor:<3} {ds.sizes['latitude']:>5} x {ds.sizes['longitude']:<5} {os.path.getsize(path) / 2**20:7.1f} MB  {path}")
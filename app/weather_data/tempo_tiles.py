@@ -0,0 +1,197 @@
+# tempo_tiles.py
+# XYZ (web mercator) PNG tiles and a cached full-map render for TEMPO NO2.
+#
+# Tiles are rendered lazily: only the grid window under the tile is read,
+# sampled nearest-neighbour onto 256x256 pixels and colour-mapped. Results
+# are kept in an in-process LRU and on disk under TEMPO_CACHE_DIR, keyed by
+# the granule set (content hashes) and colormap, so a tile is rendered at
+# most once per granule set. matplotlib (and cartopy, for the full map) is
+# imported by the render functions, i.e. in the render workers.
+import io
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from tempo_aggregates import TEMPO_CACHE_DIR, granule_set_key, region_stats
+from tempo_loader import CANADA_BBOX
+from tempo_pyramid import level_for
+import perf
+
+TILE_SIZE = 256
+MAX_ZOOM = 12
+_render_locks = {}
+_locks_guard = threading.Lock()
+
+
+# ---------------------------
+# Colour range + render cache
+# ---------------------------
+def color_range(paths) -> tuple:
+    """(vmin, vmax) shared by every tile of a granule set."""
+    s = region_stats(list(paths), CANADA_BBOX)
+    return s["min"], s["max"]
+
+
+def _key_lock(key):
+    with _locks_guard:
+        return _render_locks.setdefault(key, threading.Lock())
+
+
+def _cached(path: str, render) -> bytes:
+    """Bytes from ``path`` if present, else ``render()`` written atomically to it."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    with _key_lock(path):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return f.read()
+        data = render()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return data
+
+
+# ---------------------------
+# Tile math
+# ---------------------------
+def tile_pixel_centers(z: int, x: int, y: int, size: int = TILE_SIZE):
+    """Latitudes (rows, north to south) and longitudes (cols) of a tile's pixel centres."""
+    n = 2 ** z
+    frac = (np.arange(size) + 0.5) / size
+    lon = (x + frac) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + frac) / n))))
+    return lat, lon
+
+
+def pixel_step(lat_c: np.ndarray, lon_c: np.ndarray) -> float:
+    """Grid cell size (degrees) that still gives a tile one cell per pixel.
+
+    Mercator pixels are shorter in latitude than in longitude by cos(lat),
+    taken at the tile centre clamped to the Canada box.
+    """
+    (lat_min, lat_max), _ = CANADA_BBOX
+    lat = np.clip(np.median(lat_c), lat_min, lat_max)
+    return float((lon_c[1] - lon_c[0]) * np.cos(np.radians(lat)))
+
+
+def _nearest_index(coords: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Index of the nearest cell on a regular axis, -1 outside the grid."""
+    step = coords[1] - coords[0]
+    idx = np.rint((values - coords[0]) / step).astype(np.int64)
+    idx[(idx < 0) | (idx >= len(coords))] = -1
+    return idx
+
+
+def colorize(values: np.ndarray, cmap: str, vmin: float, vmax: float) -> np.ndarray:
+    """RGBA uint8 image; NaN becomes fully transparent."""
+    import matplotlib
+    from matplotlib.colors import Normalize
+
+    rgba = matplotlib.colormaps[cmap](Normalize(vmin, vmax)(values), bytes=True)
+    rgba[np.isnan(values)] = 0
+    return rgba
+
+
+@perf.timed("png_encode")
+def encode_png(rgba: np.ndarray) -> bytes:
+    import matplotlib.image
+
+    buf = io.BytesIO()
+    matplotlib.image.imsave(buf, rgba, format="png")
+    return buf.getvalue()
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+@perf.timed("tile_render")
+def render_tile(paths: tuple, z: int, x: int, y: int, cmap: str, vmin: float, vmax: float) -> bytes:
+    lat_c, lon_c = tile_pixel_centers(z, x, y)
+    grid = level_for(paths, pixel_step(lat_c, lon_c))["no2"]
+    lats, lons = grid["latitude"].values, grid["longitude"].values
+    rows, cols = _nearest_index(lats, lat_c), _nearest_index(lons, lon_c)
+    values = np.full((TILE_SIZE, TILE_SIZE), np.nan, dtype="float32")
+    r_ok, c_ok = rows >= 0, cols >= 0
+    if r_ok.any() and c_ok.any():
+        # read only the grid window under this tile
+        r0, r1 = rows[r_ok].min(), rows[r_ok].max() + 1
+        c0, c1 = cols[c_ok].min(), cols[c_ok].max() + 1
+        window = np.asarray(grid.isel(latitude=slice(r0, r1), longitude=slice(c0, c1)).values)
+        sub = window[np.ix_(rows[r_ok] - r0, cols[c_ok] - c0)]
+        values[np.ix_(r_ok, c_ok)] = sub
+    return encode_png(colorize(values, cmap, vmin, vmax))
+
+
+def check_cmap(cmap: str):
+    """KeyError for an unknown colormap, raised before anything touches the cache."""
+    import matplotlib
+
+    matplotlib.colormaps[cmap]
+
+
+def tile_path(paths: tuple, z: int, x: int, y: int, cmap: str = "viridis",
+              cache_dir: str = TEMPO_CACHE_DIR) -> str:
+    """Disk cache file of tile z/x/y; ValueError / KeyError for a bad tile or colormap."""
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise ValueError(f"tile {z}/{x}/{y} out of range")
+    check_cmap(cmap)
+    return os.path.join(cache_dir, "tiles", granule_set_key(paths), cmap, str(z), str(x), f"{y}.png")
+
+
+@lru_cache(maxsize=2048)
+def get_tile(paths: tuple, z: int, x: int, y: int, cmap: str = "viridis",
+             cache_dir: str = TEMPO_CACHE_DIR) -> bytes:
+    """PNG bytes for tile z/x/y, from memory, disk or a fresh render."""
+    path = tile_path(paths, z, x, y, cmap, cache_dir)
+    return _cached(path, lambda: render_tile(paths, z, x, y, cmap, *color_range(paths)))
+
+
+@perf.timed("map_render")
+def render_map(paths: tuple, cmap: str = "viridis", dpi: int = 150) -> bytes:
+    """Full Canada map with coastlines/borders, drawn with the OO Figure API."""
+    # cartopy is only needed here, not for tiles
+    import cartopy.crs as ccrs
+    import cartopy.feature as cfeature
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    (lat_min, lat_max), (lon_min, lon_max) = CANADA_BBOX
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(projection=ccrs.PlateCarree())
+    # no point drawing more cells than the figure has pixels across
+    grid = level_for(paths, (lon_max - lon_min) / (12 * dpi))["no2"]
+    grid.plot(ax=ax, cmap=cmap, cbar_kwargs={"label": "NO₂ (molecules/cm²)"})
+    ax.coastlines()
+    ax.add_feature(cfeature.BORDERS, linestyle=":")
+    ax.set_title(f"TEMPO NO₂ over Canada (Average of {len(paths)} granules)")
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def map_path(paths: tuple, cmap: str = "viridis", dpi: int = 150, cache_dir: str = TEMPO_CACHE_DIR) -> str:
+    """Disk cache file of the full map; KeyError for an unknown colormap."""
+    check_cmap(cmap)
+    return os.path.join(cache_dir, "maps", granule_set_key(paths), f"{cmap}_{dpi}.png")
+
+
+@lru_cache(maxsize=16)
+def get_map(paths: tuple, cmap: str = "viridis", dpi: int = 150, cache_dir: str = TEMPO_CACHE_DIR) -> bytes:
+    """Cached full-map PNG keyed by granule set, colormap and dpi."""
+    return _cached(map_path(paths, cmap, dpi, cache_dir), lambda: render_map(paths, cmap, dpi))
+
+
+def read_cached(path: str):
+    """Bytes of an already rendered tile/map, or None."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
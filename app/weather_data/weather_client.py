@@ -0,0 +1,143 @@
+# weather_client.py
+# Open-Meteo hourly weather for many locations at once.
+#
+# Replaces the one-city weather.py / weather_fetch.py scripts. Locations
+# are sent in batches using Open-Meteo's multi-coordinate requests
+# (comma separated latitude/longitude lists), batches go through a small
+# thread pool sharing one pooled session, and every response is
+# normalized to one schema:
+#   location, latitude, longitude, time (UTC), temperature_C, humidity_%,
+#   wind_speed_m/s, precipitation_mm
+#
+#   python weather_client.py --locations Ottawa:45.4215:-75.6972 --csv weather_data.csv
+#   python weather_client.py --locations Toronto:43.7:-79.42 Ottawa:45.4215:-75.6972 --store
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import app_path  # noqa: F401  (openaq_client lives next to app.py)
+from openaq_client import get_json, make_session
+
+OPEN_METEO_URL = os.environ.get("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+BATCH_SIZE = 100  # coordinates per request, keeps URLs well under server limits
+
+# Open-Meteo hourly variable -> column in the unified schema
+HOURLY = {
+    "temperature_2m": "temperature_C",
+    "relative_humidity_2m": "humidity_%",
+    "wind_speed_10m": "wind_speed_m/s",
+    "precipitation": "precipitation_mm",
+}
+COLUMNS = ["location", "latitude", "longitude", "time", *HOURLY.values()]
+
+DEFAULT_LOCATIONS = [("Ottawa", 45.4215, -75.6972)]
+
+
+def parse_locations(values) -> list:
+    """``["Toronto:43.7:-79.42", ...]`` -> [(name, lat, lon)]."""
+    if isinstance(values, str):
+        values = values.split(",")
+    locations = []
+    for v in values:
+        if v.strip():
+            name, lat, lon = v.strip().rsplit(":", 2)
+            locations.append((name, float(lat), float(lon)))
+    return locations
+
+
+def normalize_weather(payloads: list, locations: list) -> pd.DataFrame:
+    """Open-Meteo responses (one per location, same order) -> unified long DataFrame."""
+    names, times = [], []
+    values = {col: [] for col in HOURLY.values()}
+    for (name, _, _), payload in zip(locations, payloads):
+        hourly = payload.get("hourly") or {}
+        t = hourly.get("time") or []
+        names.append(np.full(len(t), name, dtype=object))
+        times.append(np.asarray(t, dtype="int64"))
+        for var, col in HOURLY.items():
+            values[col].append(np.asarray(hourly.get(var, [np.nan] * len(t)), dtype="float64"))
+    if not times or not sum(len(t) for t in times):
+        return pd.DataFrame(columns=COLUMNS)
+    counts = [len(t) for t in times]
+    coords = np.array([(lat, lon) for _, lat, lon in locations[:len(payloads)]], dtype="float64")
+    df = pd.DataFrame({
+        "location": np.concatenate(names),
+        "latitude": np.repeat(coords[:, 0], counts),
+        "longitude": np.repeat(coords[:, 1], counts),
+        "time": pd.to_datetime(np.concatenate(times), unit="s", utc=True),
+        **{col: np.concatenate(v) for col, v in values.items()},
+    })
+    return df.sort_values(["location", "time"], kind="stable", ignore_index=True)
+
+
+def fetch_weather(locations, past_days: int = 0, forecast_days: int = 7, batch_size: int = BATCH_SIZE,
+                  max_workers: int = 4, session=None, base_url: str = OPEN_METEO_URL) -> pd.DataFrame:
+    """Hourly weather for every (name, lat, lon) in ``locations``.
+
+    ``ceil(len(locations) / batch_size)`` requests are made, at most
+    ``max_workers`` at a time, all in UTC with unix timestamps.
+    """
+    locations = list(locations)
+    if not locations:
+        return pd.DataFrame(columns=COLUMNS)
+    own_session = session is None
+    if own_session:
+        session = make_session(max_workers)
+    batches = [locations[i:i + batch_size] for i in range(0, len(locations), batch_size)]
+
+    def fetch_batch(batch):
+        params = {
+            "latitude": ",".join(f"{lat:g}" for _, lat, _ in batch),
+            "longitude": ",".join(f"{lon:g}" for _, _, lon in batch),
+            "hourly": ",".join(HOURLY),
+            "timezone": "GMT",
+            "timeformat": "unixtime",
+            "past_days": past_days,
+            "forecast_days": forecast_days,
+        }
+        payload = get_json(session, base_url, params)
+        # a single coordinate comes back as an object, several as a list
+        return normalize_weather(payload if isinstance(payload, list) else [payload], batch)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+            frames = list(pool.map(fetch_batch, batches))
+    finally:
+        if own_session:
+            session.close()
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_csv(df: pd.DataFrame, path: str):
+    """Single-location CSV in the layout weather_plots.py reads (naive UTC ``time``)."""
+    out = df.drop(columns=["location", "latitude", "longitude"])
+    out["time"] = out["time"].dt.strftime("%Y-%m-%dT%H:%M")
+    out.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    from weather_store import WeatherStore
+
+    ap = argparse.ArgumentParser(description="Fetch Open-Meteo hourly weather for many locations.")
+    ap.add_argument("--locations", nargs="+", default=DEFAULT_LOCATIONS,
+                    type=lambda v: parse_locations([v])[0], help="name:lat:lon entries")
+    ap.add_argument("--past-days", type=int, default=0)
+    ap.add_argument("--forecast-days", type=int, default=7)
+    ap.add_argument("--csv", help="write the first location to this CSV (e.g. weather_data.csv)")
+    ap.add_argument("--store", action="store_true", help="append observed hours to the weather store")
+    args = ap.parse_args()
+
+    df = fetch_weather(args.locations, past_days=args.past_days, forecast_days=args.forecast_days)
+    print(df.head(10))
+    if args.csv:
+        to_csv(df[df["location"] == args.locations[0][0]], args.csv)
+        print(f"Weather data saved to {args.csv}")
+    if args.store:
+        n = WeatherStore().append(df)
+        print(f"{n} new rows stored")
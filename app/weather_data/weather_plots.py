@@ -0,0 +1,117 @@
+# weather_plots.py
+# Weather charts for the FastAPI service, rendered in memory.
+#
+# Uses matplotlib's object-oriented Figure API (no pyplot global state),
+# so renders are safe across uvicorn worker threads. PNGs are cached by
+# (variable, time range, size, dpi, data version) and each one gets a
+# stable ETag, so unchanged charts can be answered with 304.
+import hashlib
+import io
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+import perf
+
+WEATHER_CSV = os.environ.get(
+    "WEATHER_CSV", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_data.csv")
+)
+
+VARIABLES = {
+    "temperature": {"column": "temperature_C", "label": "Temperature (°C)", "color": "red",
+                    "title": "Temperature Over Time", "kind": "line", "filename": "temperature_over_time.png"},
+    "humidity": {"column": "humidity_%", "label": "Humidity (%)", "color": "blue",
+                 "title": "Humidity Over Time", "kind": "line", "filename": "humidity_over_time.png"},
+    "wind": {"column": "wind_speed_m/s", "label": "Wind Speed (m/s)", "color": "purple",
+             "title": "Wind Speed Over Time", "kind": "line", "filename": "wind_speed_over_time.png"},
+    "precipitation": {"column": "precipitation_mm", "label": "Precipitation (mm)", "color": "green",
+                      "title": "Precipitation Over Time", "kind": "bar", "filename": "precipitation_over_time.png"},
+}
+
+
+# ---------------------------
+# Data
+# ---------------------------
+def data_version(path: str = WEATHER_CSV):
+    """Changes whenever the CSV is rewritten; None if it doesn't exist."""
+    if not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+@lru_cache(maxsize=4)
+def _read_csv(path: str, version: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df["time"] = pd.to_datetime(df["time"])
+    return df.sort_values("time", ignore_index=True)
+
+
+def load_weather(path: str = WEATHER_CSV):
+    """Weather DataFrame (re-read only when the file changes), or None."""
+    version = data_version(path)
+    return _read_csv(path, version) if version else None
+
+
+def naive_utc(ts) -> pd.Timestamp:
+    """``ts`` as a Timestamp comparable with the CSV's naive UTC times."""
+    ts = pd.Timestamp(ts)
+    return ts if ts.tzinfo is None else ts.tz_convert(None)
+
+
+def time_slice(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """Rows with ``start <= time <= end`` (``df`` is sorted by time).
+
+    Timezone-aware bounds are converted to UTC first.
+    """
+    times = df["time"]
+    lo = times.searchsorted(naive_utc(start), "left") if start else 0
+    hi = times.searchsorted(naive_utc(end), "right") if end else len(df)
+    return df.iloc[lo:hi]
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+@perf.timed("plot_render")
+def render_plot(df: pd.DataFrame, variable: str, width: float = 10, height: float = 5, dpi: int = 150) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    spec = VARIABLES[variable]
+    fig = Figure(figsize=(width, height))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if spec["kind"] == "bar":
+        ax.bar(df["time"], df[spec["column"]], label=spec["label"], color=spec["color"])
+    else:
+        ax.plot(df["time"], df[spec["column"]], label=spec["label"], color=spec["color"])
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_xlabel("Time")
+    ax.set_ylabel(spec["label"])
+    ax.set_title(spec["title"])
+    ax.legend()
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def plot_etag(variable, start, end, width, height, dpi, version) -> str:
+    """ETag derived from the cache key, so it is known without rendering."""
+    key = f"{variable}|{start}|{end}|{width}|{height}|{dpi}|{version}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+@lru_cache(maxsize=256)
+def _cached_plot(variable, start, end, width, height, dpi, version, path) -> bytes:
+    df = time_slice(_read_csv(path, version), start, end)
+    return render_plot(df, variable, width, height, dpi)
+
+
+def get_plot(variable: str, start=None, end=None, width: float = 10, height: float = 5,
+             dpi: int = 150, version=None, path: str = WEATHER_CSV) -> bytes:
+    """PNG bytes for a chart of the given data version (rendered once per key)."""
+    version = version or data_version(path)
+    return _cached_plot(variable, start, end, width, height, dpi, version, path)
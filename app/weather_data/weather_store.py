@@ -0,0 +1,106 @@
+# weather_store.py
+# Columnar (Parquet) history of hourly weather, keyed by (location, time).
+#
+# Every append writes one new part file holding only hours newer than
+# what is already stored for each location, and only hours that have
+# already happened: forecast hours are refetched on every refresh rather
+# than stored, so a stored row never needs revising. Parts are compacted
+# into one sorted file once there are more than ``max_parts`` of them.
+# Needs pyarrow.
+import glob
+import os
+import threading
+import time
+
+import pandas as pd
+
+from weather_client import COLUMNS
+
+DEFAULT_STORE = os.environ.get(
+    "WEATHER_STORE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "weather_store")
+)
+
+
+def _utc(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+class WeatherStore:
+    """Directory of Parquet parts with unique (location, time) rows."""
+
+    def __init__(self, path: str = DEFAULT_STORE, max_parts: int = 32):
+        self.path = path
+        self.max_parts = max_parts
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._latest = None
+
+    def _parts(self) -> list:
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def _write(self, df: pd.DataFrame, name: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tmp = os.path.join(self.path, f".{name}.tmp")
+        pq.write_table(pa.Table.from_pandas(df[COLUMNS], preserve_index=False), tmp)
+        os.replace(tmp, os.path.join(self.path, name))
+
+    def _load_latest(self) -> pd.Series:
+        if self._latest is None:
+            if self._parts():
+                keys = pd.read_parquet(self.path, columns=["location", "time"])
+                self._latest = keys.groupby("location")["time"].max()
+            else:
+                self._latest = pd.Series(dtype="datetime64[ns, UTC]", name="time")
+        return self._latest
+
+    def latest_times(self) -> pd.Series:
+        """Newest stored ``time`` per location (only the key columns are read)."""
+        with self._lock:
+            return self._load_latest().copy()
+
+    def append(self, df: pd.DataFrame, now=None) -> int:
+        """Store hours up to ``now`` that are newer than each location's latest; returns rows written."""
+        if df.empty:
+            return 0
+        now = _utc(now) if now is not None else pd.Timestamp.now(tz="UTC")
+        with self._lock:
+            since = df["location"].map(self._load_latest())
+            new = df[(df["time"] <= now) & (since.isna() | (df["time"] > since))]
+            new = new.drop_duplicates(["location", "time"], keep="last")
+            if new.empty:
+                return 0
+            self._write(new, f"part-{time.time_ns():020d}-{os.getpid()}.parquet")
+            newest = new.groupby("location")["time"].max()
+            self._latest = pd.concat([self._latest, newest]).groupby(level=0).max()
+            if len(self._parts()) > self.max_parts:
+                self._compact()
+        return len(new)
+
+    def _compact(self):
+        parts = self._parts()
+        df = pd.read_parquet(self.path).sort_values(["location", "time"], ignore_index=True)
+        self._write(df, f"part-{time.time_ns():020d}-{os.getpid()}.parquet")
+        for p in parts:
+            os.remove(p)
+
+    def compact(self):
+        with self._lock:
+            if len(self._parts()) > 1:
+                self._compact()
+
+    def read(self, locations=None, start=None, end=None) -> pd.DataFrame:
+        """Stored rows, filtered by location list and ``start <= time <= end``, sorted by location/time."""
+        if not self._parts():
+            return pd.DataFrame(columns=COLUMNS)
+        filters = []
+        if locations is not None:
+            filters.append(("location", "in", list(locations)))
+        if start is not None:
+            filters.append(("time", ">=", _utc(start)))
+        if end is not None:
+            filters.append(("time", "<=", _utc(end)))
+        df = pd.read_parquet(self.path, filters=filters or None)
+        return df.sort_values(["location", "time"], kind="stable", ignore_index=True)